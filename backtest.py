@@ -1,39 +1,183 @@
-# Declare the components with respective parameters.
+import queue
+import time
 
-bars = DataHandler()
-strategy = Strategy()
-port = Portfolio()
-broker = ExecutionHandler()
+from event import EventType
 
 
-while True:
-    # Update the bars ( specific backtest code, as opposed to live trading.
-    if bars.continue_backtest == True:
-       bar.update_bars()
-    else:
-       break
+class Backtest(object):
+    """
+    Encapsulates the settings and components for carrying out
+    an event-driven backtest.
 
+    The price handler streams one market event at a time, then
+    every event on the queue is handled before the next one is
+    streamed: market events go to the strategy, the portfolio and
+    the execution handler (to match resting orders), signals to the
+    portfolio, orders to the execution handler and fills back to
+    the portfolio, corporate actions to the portfolio and the
+    execution handler (to adjust resting orders). With a Scheduler,
+    the timers due at or before a market event fire before the event
+    is handled.
+    """
 
-    # Handle the events
-    While True:
-       try:
-           event = events.get(False)
-       except Queue.Empty:
-           break
-       else:
-           if event is not None:
-               if event.type == 'MARKET':
-                   strategy.calculate_signals(event)
-                   port.update_timeindex(event)
+    # Not changing the results, left out of their cache keys
+    unkeyed_attributes = ('checkpointer', 'instrumentation', 'handlers')
 
-               elif event.type == 'SIGNAL':
-                   port.update_signal(event)
+    def __init__(
+            self, price_handler, strategy, portfolio,
+            execution_handler, events_queue,
+            heartbeat=0.0, checkpointer=None, instrumentation=None,
+            scheduler=None
+    ):
+        """
+        Initialises the backtest.
 
-               elif event.type == 'ORDER':
-                   broker.execute_order(event)
+        :param price_handler: The PriceHandler streaming market events.
+        :param strategy: The Strategy (or Strategies) generating signals.
+        :param portfolio: The Portfolio generating orders from signals.
+        :param execution_handler: The ExecutionHandler filling orders.
+        :param events_queue: The Event Queue shared by the components.
+        :param float heartbeat: Seconds to sleep between market events,
+                        e.g. 10*60 for a 10-minute heartbeat.
+        :param checkpointer: An optional Checkpointer saving the state
+                        of the backtest periodically.
+        :param instrumentation: An optional Instrumentation recording
+                        the latencies of the handlers.
+        :param scheduler: An optional Scheduler firing the timers
+                        of the components.
+        """
+        self.price_handler = price_handler
+        self.strategy = strategy
+        self.portfolio = portfolio
+        self.execution_handler = execution_handler
+        self.events_queue = events_queue
+        self.heartbeat = heartbeat
+        self.checkpointer = checkpointer
+        self.instrumentation = instrumentation
+        self.scheduler = scheduler
+        self.handlers = None
 
-               elif event.type == 'FILL':
-                   port.update_fill(event)
+    def _dispatch_table(self):
+        """
+        Returns the handlers of each event type, in calling order,
+        wrapped by the instrumentation if any.
+        :return:
+        """
+        market = (
+            self.strategy.calculate_signals,
+            self.portfolio.update_timeindex,
+            self.execution_handler.update_market
+        )
+        if self.scheduler is not None:
+            market = (self.scheduler.update_market,) + market
+        handlers = {
+            EventType.TICK: market,
+            EventType.BAR: market,
+            EventType.SIGNAL: (self.portfolio.update_signal,),
+            EventType.ORDER: (self.execution_handler.execute_order,),
+            EventType.FILL: (self.portfolio.update_fill,),
+            EventType.CORPORATE_ACTION: (
+                self.portfolio.update_corporate_action,
+                self.execution_handler.update_corporate_action
+            ),
+            EventType.SENTIMENT: (self.strategy.calculate_signals,)
+        }
+        if self.instrumentation is not None:
+            handlers = self.instrumentation.instrument(handlers)
+        return handlers
 
-    # 10-Minute hearbeat
-    time.sleep(10*60)
\ No newline at end of file
+    def _handle_event(self, event):
+        """
+        Dispatches an event to the components handling its type.
+        :param event:
+        :return:
+        """
+        if self.handlers is None:
+            self.handlers = self._dispatch_table()
+        for handler in self.handlers.get(event.type, ()):
+            handler(event)
+
+    def _run_backtest(self):
+        """
+        Carries out an infinite while loop that polls the
+        events queue and directs each event to either the
+        strategy component, the portfolio or the execution
+        handler. The loop ends once the price handler has
+        no more data to stream.
+        :return:
+        """
+        self.handlers = self._dispatch_table()
+        instrumentation = self.instrumentation
+        while True:
+            # Update the bars (specific backtest code, as opposed to live trading)
+            if self.price_handler.continue_backtest:
+                self.price_handler.stream_next()
+            else:
+                break
+            if instrumentation is not None:
+                instrumentation.sample_queue(self.events_queue.qsize())
+            if self.scheduler is not None:
+                self.scheduler.poll()
+
+            # Handle the events
+            while True:
+                try:
+                    event = self.events_queue.get(False)
+                except queue.Empty:
+                    # Send the orders held back by the execution
+                    # handler, then handle their fills if any
+                    self.execution_handler.flush()
+                    if self.events_queue.empty():
+                        break
+                else:
+                    if event is not None:
+                        self._handle_event(event)
+
+            if self.checkpointer is not None:
+                self.checkpointer.update(self)
+
+            if self.heartbeat:
+                time.sleep(self.heartbeat)
+
+    def simulate_trading(self):
+        """
+        Simulates the backtest and returns the equity curve
+        of the portfolio.
+        :return:
+        """
+        self._run_backtest()
+        self.portfolio.create_equity_curve_dataframe()
+        return self.portfolio.equity_curve
+
+    def get_state(self):
+        """
+        Returns the state of every component of the backtest,
+        along with the events still pending on the queue.
+        :return:
+        """
+        return {
+            'price_handler': self.price_handler.get_state(),
+            'strategy': self.strategy.get_state(),
+            'portfolio': self.portfolio.get_state(),
+            'execution_handler': self.execution_handler.get_state(),
+            'events': list(self.events_queue.queue)
+        }
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state() into the
+        components of a freshly constructed backtest.
+        :param state:
+        :return:
+        """
+        self.price_handler.set_state(state['price_handler'])
+        self.strategy.set_state(state['strategy'])
+        self.portfolio.set_state(state['portfolio'])
+        self.execution_handler.set_state(state['execution_handler'])
+        while True:
+            try:
+                self.events_queue.get(False)
+            except queue.Empty:
+                break
+        for event in state['events']:
+            self.events_queue.put(event)
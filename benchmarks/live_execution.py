@@ -0,0 +1,81 @@
+"""
+Throughput and latency benchmark of the AsyncLiveExecutionHandler
+against a local MockBroker.
+
+Run from the root of the repository, e.g.:
+
+    python -m benchmarks.live_execution --orders 20000 --connections 4 --latency 0.005
+"""
+import argparse
+import json
+import queue
+import time
+
+import numpy as np
+
+from event import OrderEvent
+from live_execution import AsyncLiveExecutionHandler
+from mock_broker import MockBroker
+
+
+def run(orders, connections, latency, fill_chunks):
+    broker = MockBroker(latency=latency, fill_chunks=fill_chunks)
+    port = broker.start()
+    events_queue = queue.Queue()
+    handler = AsyncLiveExecutionHandler(
+        events_queue, '127.0.0.1', port, connections=connections
+    )
+    handler.connect()
+    try:
+        start = time.perf_counter()
+        for i in range(orders):
+            handler.execute_order(
+                OrderEvent('T%d' % (i % 100), 'BUY' if i % 2 else 'SELL', 100, 'MKT')
+            )
+        submitted = time.perf_counter() - start
+        handler.wait_until_filled(timeout=600)
+        elapsed = time.perf_counter() - start
+    finally:
+        handler.disconnect()
+        broker.stop()
+
+    ack = np.array(handler.ack_latencies) * 1e3
+    fill = np.array(handler.fill_latencies) * 1e3
+    return {
+        'orders': orders,
+        'connections': connections,
+        'broker_latency_ms': latency * 1e3,
+        'fill_events': events_queue.qsize(),
+        'submit_us_per_order': submitted / orders * 1e6,
+        'orders_per_sec': orders / elapsed,
+        'ack_latency_ms': {
+            'p50': float(np.percentile(ack, 50)),
+            'p99': float(np.percentile(ack, 99))
+        },
+        'fill_latency_ms': {
+            'p50': float(np.percentile(fill, 50)),
+            'p99': float(np.percentile(fill, 99))
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='Broker fill latency in seconds')
+    parser.add_argument('--fill-chunks', type=int, default=1)
+    parser.add_argument('--output', default=None,
+                        help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = run(args.orders, args.connections, args.latency, args.fill_chunks)
+    print(json.dumps(results, indent=2))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""
+Throughput benchmark of each stage of the event-driven backtest
+pipeline, on synthetic data.
+
+Run from the root of the repository, e.g.:
+
+    python -m benchmarks.pipeline --size medium --output BENCH.json
+    python -m benchmarks.pipeline --size medium --baseline BENCH.json
+
+Every stage reports its events per second, its startup time (until
+its first event is processed) and its peak RSS. The results are
+written as JSON, along with the commit and library versions, and
+can be compared with the results of another commit.
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import SIZES, generate_bars, generate_ticks
+from event import EventType, FillEvent
+from portfolio import NaivePortfolio
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from price_parser import PriceParser
+from strategy import AbstractStrategy, Strategies
+
+
+class NoopStrategy(AbstractStrategy):
+    """
+    Subscribes to the bars of a ticker, without generating signals.
+    """
+    def __init__(self, ticker):
+        self.subscribed_tickers = [ticker]
+        self.subscribed_events = [EventType.BAR]
+
+    def calculate_signals(self, event):
+        pass
+
+
+def reset_peak_rss():
+    """
+    Resets the peak RSS of the process, where supported (Linux).
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """
+    Returns the peak RSS of the process since the last reset, or
+    since its start where it cannot be reset.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+class StageTimer(object):
+    """
+    Times a stage, marking when its first event is processed.
+    """
+    def __init__(self, results, name):
+        self.results = results
+        self.name = name
+        self.events = 0
+        self.first = None
+
+    def __enter__(self):
+        reset_peak_rss()
+        self.start = time.perf_counter()
+        return self
+
+    def started(self):
+        self.first = time.perf_counter()
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self.start
+        startup = elapsed if self.first is None else self.first - self.start
+        self.results[self.name] = {
+            'events': self.events,
+            'seconds': elapsed,
+            'events_per_sec': self.events / elapsed if elapsed > 0 else None,
+            'startup_sec': startup,
+            'peak_rss_mb': peak_rss_mb()
+        }
+
+
+def run_bars(csv_dir, tickers, max_events):
+    stages = {}
+    events_queue = queue.Queue()
+
+    with StageTimer(stages, 'csv_load') as stage:
+        handler = YahooDailyCsvBarPriceHandler(csv_dir, events_queue, tickers[:1])
+        stage.started()
+        for ticker in tickers[1:]:
+            handler.subscribe_ticker(ticker)
+        stage.events = sum(len(data) for data in handler.tickers_data.values())
+
+    with StageTimer(stages, 'merge') as stage:
+        handler.bar_data = handler._merge_sort_ticker_data()
+        handler.bar_stream = handler._iter_bar_data()
+        stage.events = len(handler.bar_data)
+
+    events = min(max_events, len(handler.bar_data))
+    with StageTimer(stages, 'stream_next') as stage:
+        handler.stream_next()
+        stage.started()
+        for _ in range(events - 1):
+            handler.stream_next()
+        stage.events = events
+    bars = list(events_queue.queue)
+
+    strategies = Strategies(*[NoopStrategy(ticker) for ticker in tickers])
+    with StageTimer(stages, 'dispatch') as stage:
+        strategies.calculate_signals(bars[0])
+        stage.started()
+        for bar in bars[1:]:
+            strategies.calculate_signals(bar)
+        stage.events = len(bars)
+
+    portfolio = NaivePortfolio(handler, events_queue, None)
+    with StageTimer(stages, 'update_timeindex') as stage:
+        portfolio.update_timeindex(bars[0])
+        stage.started()
+        for bar in bars[1:]:
+            portfolio.update_timeindex(bar)
+        stage.events = len(bars)
+
+    fills = [
+        FillEvent(
+            bar.time, bar.ticker, 'ARCA', 100, 'BUY' if i % 2 == 0 else 'SELL',
+            bar.close_price / float(PriceParser.PRICE_MULTIPLIER)
+        ) for i, bar in enumerate(bars)
+    ]
+    with StageTimer(stages, 'update_fill') as stage:
+        portfolio.update_fill(fills[0])
+        stage.started()
+        for fill in fills[1:]:
+            portfolio.update_fill(fill)
+        stage.events = len(fills)
+
+    with StageTimer(stages, 'equity_curve') as stage:
+        portfolio.create_equity_curve_dataframe()
+        stage.events = len(portfolio.equity_curve)
+    return stages
+
+
+def run_ticks(path, max_events):
+    stages = {}
+    try:
+        from price_handler.oanda_streaming import OANDAStreamingPriceHandler
+    except ImportError as e:
+        stages['oanda_on_success'] = {'skipped': str(e)}
+        return stages
+
+    with open(path) as f:
+        lines = [line for _, line in zip(range(max_events), f)]
+    instruments = sorted(set(json.loads(line)['tick']['instrument'] for line in lines[:1000]))
+    handler = OANDAStreamingPriceHandler(
+        'practice', 'token', 'account', instruments, queue.Queue()
+    )
+    with StageTimer(stages, 'oanda_on_success') as stage:
+        handler.on_success(json.loads(lines[0]))
+        stage.started()
+        for line in lines[1:]:
+            handler.on_success(json.loads(line))
+        stage.events = len(lines)
+    return stages
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(tickers, years, ticks, max_events, seed=0):
+    data_dir = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        names = generate_bars(data_dir, tickers, years, seed)
+        ticks_path = os.path.join(data_dir, 'ticks.jsonl')
+        generate_ticks(ticks_path, min(tickers, 100), ticks, seed)
+        generation = time.perf_counter() - start
+
+        stages = run_bars(data_dir, names, max_events)
+        stages.update(run_ticks(ticks_path, max_events))
+    finally:
+        shutil.rmtree(data_dir)
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'tickers': tickers,
+        'years': years,
+        'ticks': ticks,
+        'max_events': max_events,
+        'seed': seed,
+        'generation_sec': generation,
+        'stages': stages
+    }
+
+
+def compare(baseline, results, tolerance=0.1):
+    """
+    Returns the events per second of each stage relative to a
+    baseline, flagging the stages slower by more than 'tolerance'.
+    """
+    comparison = {}
+    for name, stage in results['stages'].items():
+        before = baseline['stages'].get(name, {}).get('events_per_sec')
+        after = stage.get('events_per_sec')
+        if not before or not after:
+            continue
+        ratio = after / before
+        comparison[name] = {'ratio': ratio, 'regression': ratio < 1.0 - tolerance}
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--tickers', type=int, default=None,
+                        help='Overrides the number of tickers of the size')
+    parser.add_argument('--years', type=int, default=None,
+                        help='Overrides the number of years of the size')
+    parser.add_argument('--ticks', type=int, default=100000)
+    parser.add_argument('--max-events', type=int, default=1000000,
+                        help='Caps the events of the streaming stages')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None,
+                        help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', default=None,
+                        help='Compare with the JSON results of another run')
+    args = parser.parse_args()
+
+    tickers, years = SIZES[args.size]
+    results = run(
+        args.tickers or tickers, args.years or years, args.ticks,
+        args.max_events, args.seed
+    )
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            results['comparison'] = compare(json.load(f), results)
+    print(json.dumps(results, indent=2))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Deterministic synthetic market data for the benchmarks: Yahoo daily
+OHLCV CSV files and OANDA streaming tick lines.
+
+The data of each ticker only depends on the seed, the number of
+years and the index of the ticker, so that a smaller universe is
+a subset of a larger one generated over the same years.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# (tickers, years) of the benchmark sizes
+SIZES = {
+    'small': (10, 1),
+    'medium': (100, 5),
+    'large': (1000, 10),
+    'xlarge': (5000, 20)
+}
+
+TRADING_DAYS = 252
+
+
+def ticker_names(count):
+    return ['T%04d' % i for i in range(count)]
+
+
+def generate_bars(csv_dir, tickers=10, years=1, seed=0, start='2000-01-03'):
+    """
+    Writes one Yahoo daily CSV file per ticker into 'csv_dir', with
+    prices following a geometric Brownian motion.
+
+    :param str csv_dir: The directory of the CSV files.
+    :param int tickers: The number of tickers.
+    :param int years: The number of years of trading days.
+    :param int seed: The seed of the data.
+    :param start: The first date.
+    :return: The list of ticker symbols.
+    """
+    names = ticker_names(tickers)
+    dates = pd.bdate_range(start, periods=years * TRADING_DAYS)
+    for i, name in enumerate(names):
+        rng = np.random.default_rng([seed, i])
+        n = len(dates)
+        close = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n)))
+        previous = np.concatenate([[close[0]], close[:-1]])
+        open_price = previous * np.exp(rng.normal(0.0, 0.005, n))
+        high = np.maximum(open_price, close) * (1.0 + np.abs(rng.normal(0.0, 0.01, n)))
+        low = np.minimum(open_price, close) * (1.0 - np.abs(rng.normal(0.0, 0.01, n)))
+        pd.DataFrame({
+            'Date': dates, 'Open': open_price, 'High': high, 'Low': low,
+            'Close': close, 'Adj Close': close,
+            'Volume': rng.integers(100000, 10000000, n)
+        }).to_csv(
+            os.path.join(csv_dir, '%s.csv' % name), index=False, float_format='%.4f'
+        )
+    return names
+
+
+def generate_ticks(path, instruments=10, ticks=100000, seed=0, start='2014-03-07'):
+    """
+    Writes OANDA streaming tick lines, e.g.
+
+        {"tick": {"instrument": "I000_USD", "time": "2014-03-07T00:00:00.461445Z",
+                  "bid": 1.38701, "ask": 1.38712}}
+
+    interleaving the instruments at random times.
+
+    :param str path: The file of the lines.
+    :param int instruments: The number of instruments.
+    :param int ticks: The total number of ticks.
+    :param int seed: The seed of the data.
+    :param start: The time of the first tick.
+    :return: The list of instruments.
+    """
+    rng = np.random.default_rng([seed, instruments])
+    names = ['I%03d_USD' % i for i in range(instruments)]
+    which = rng.integers(0, instruments, ticks)
+    times = pd.Timestamp(start) + pd.to_timedelta(
+        np.cumsum(rng.integers(1, 500000, ticks)), unit='us'
+    )
+    mids = np.ones(instruments)
+    steps = rng.normal(0.0, 0.0001, ticks)
+    spreads = rng.uniform(0.00005, 0.0002, ticks)
+    with open(path, 'w') as f:
+        for i in range(ticks):
+            mids[which[i]] *= 1.0 + steps[i]
+            mid = mids[which[i]]
+            f.write(json.dumps({'tick': {
+                'instrument': names[which[i]],
+                'time': times[i].strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                'bid': round(mid - spreads[i] / 2, 5),
+                'ask': round(mid + spreads[i] / 2, 5)
+            }}) + '\n')
+    return names
@@ -0,0 +1,177 @@
+import os
+import pickle
+import struct
+import zlib
+
+
+class Checkpointer(object):
+    """
+    The Checkpointer periodically saves the state of a Backtest
+    (price handler cursor, portfolio, pending events, strategy
+    and execution state) so that a crashed session can be resumed
+    and give results identical to an uninterrupted run.
+
+    Checkpoints are written to a single binary file as a sequence
+    of zlib-compressed pickled records, each prefixed by its length
+    and CRC32. The first record is a full snapshot, the following
+    ones are incremental: as the positions and holdings matrices of
+    the portfolio are append-only, each record only carries the rows
+    appended since the previous checkpoint, along with the (small)
+    current state of the components. Every 'compact_every' records
+    the file is atomically rewritten as a single full snapshot, which
+    bounds the time needed to resume.
+
+    A record truncated by a crash during a write fails its length
+    or CRC check and is ignored, the previous checkpoint being used.
+
+    The tables of the ResultWriter of the portfolio, if any, are
+    flushed at each checkpoint and truncated back to it on restore,
+    the writer of the resumed backtest being built with 'resume'.
+    """
+
+    MAGIC = b'ADEVCKPT'
+    RECORD_HEADER = struct.Struct('<II')
+
+    def __init__(self, path, frequency=1000, compact_every=100, compression=6):
+        """
+        Initialises the checkpointer.
+
+        :param str path: The path of the checkpoint file.
+        :param int frequency: The number of market events streamed
+                        between two checkpoints.
+        :param int compact_every: The number of incremental records
+                        written before the file is compacted.
+        :param int compression: The zlib compression level.
+        """
+        self.path = path
+        self.frequency = frequency
+        self.compact_every = compact_every
+        self.compression = compression
+        self.iterations = 0
+        self.records = 0
+        self.positions_rows = 0
+        self.holdings_rows = 0
+
+    def update(self, backtest):
+        """
+        Counts one more market event and saves a checkpoint every
+        'frequency' events. Called by the Backtest event loop.
+
+        :param backtest: The Backtest object to checkpoint.
+        :return:
+        """
+        self.iterations += 1
+        if self.iterations % self.frequency == 0:
+            self.save(backtest)
+
+    def _encode(self, record):
+        payload = zlib.compress(
+            pickle.dumps(record, pickle.HIGHEST_PROTOCOL), self.compression
+        )
+        return self.RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def save(self, backtest):
+        """
+        Writes a checkpoint of the backtest, as a full snapshot if
+        the file is empty or due for compaction, incrementally
+        otherwise.
+
+        :param backtest: The Backtest object to checkpoint.
+        :return:
+        """
+        portfolio = backtest.portfolio
+        full = self.records == 0 or self.records >= self.compact_every
+        if full:
+            self.positions_rows = 0
+            self.holdings_rows = 0
+
+        record = {
+            'iterations': self.iterations,
+            'state': backtest.get_state(),
+            'positions_start': self.positions_rows,
+            'positions': portfolio.all_positions[self.positions_rows:],
+            'holdings_start': self.holdings_rows,
+            'holdings': portfolio.all_holdings[self.holdings_rows:]
+        }
+        data = self._encode(record)
+
+        if full:
+            tmp_path = '%s.tmp' % self.path
+            with open(tmp_path, 'wb') as f:
+                f.write(self.MAGIC)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.records = 1
+        else:
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.records += 1
+
+        self.positions_rows = len(portfolio.all_positions)
+        self.holdings_rows = len(portfolio.all_holdings)
+
+    def _read_records(self):
+        """
+        Yields the valid records of the checkpoint file in order,
+        along with the file offset at their end, stopping at the
+        first truncated or corrupted one.
+        """
+        with open(self.path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                return
+            while True:
+                header = f.read(self.RECORD_HEADER.size)
+                if len(header) < self.RECORD_HEADER.size:
+                    return
+                length, crc = self.RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if not length or len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                yield pickle.loads(zlib.decompress(payload)), f.tell()
+
+    def restore(self, backtest):
+        """
+        Restores the last valid checkpoint into a freshly
+        constructed Backtest, built with the same components and
+        parameters as the checkpointed one. Subsequent checkpoints
+        are appended to the same file.
+
+        :param backtest: The Backtest object to restore.
+        :return: True if a checkpoint was restored, False otherwise.
+        """
+        if not os.path.exists(self.path):
+            return False
+
+        positions = []
+        holdings = []
+        last = None
+        records = 0
+        end = 0
+        for record, end in self._read_records():
+            del positions[record['positions_start']:]
+            positions.extend(record['positions'])
+            del holdings[record['holdings_start']:]
+            holdings.extend(record['holdings'])
+            last = record
+            records += 1
+        if last is None:
+            return False
+
+        # Drop a record truncated by the crash, so that the next
+        # checkpoints are appended after the last valid one.
+        with open(self.path, 'r+b') as f:
+            f.truncate(end)
+
+        backtest.set_state(last['state'])
+        backtest.portfolio.all_positions = positions
+        backtest.portfolio.all_holdings = holdings
+
+        self.iterations = last['iterations']
+        self.records = records
+        self.positions_rows = len(positions)
+        self.holdings_rows = len(holdings)
+        return True
@@ -0,0 +1,152 @@
+import queue
+import time
+from collections import deque
+
+from event import EventType
+
+
+class _Pending(object):
+    """
+    The entry of the market event of a ticker waiting in the
+    queue, updated in place when the event is conflated.
+    """
+
+    __slots__ = ('event',)
+
+    def __init__(self, event):
+        self.event = event
+
+
+class ConflatingQueue(queue.Queue):
+    """
+    ConflatingQueue is an events queue which keeps only the latest
+    pending market event per ticker: when a tick arrives for a ticker
+    whose previous tick is still waiting, the waiting tick is replaced
+    in place (keeping its position in the queue), so that a burst of
+    ticks never leaves the strategies working through stale prices.
+    Signal, order and fill events, and any other event type not
+    conflated, are queued in order and never merged or dropped.
+
+    The queue is bounded by 'maxsize' entries, and the 'overflow'
+    policy decides what happens to a market event for a new ticker
+    when it is full:
+
+    * 'block': the producer waits for an entry to be freed (the
+      behaviour of a queue.Queue),
+    * 'drop_oldest': the oldest waiting market event is dropped,
+    * 'drop_newest': the incoming market event is dropped.
+
+    Control events are always accepted, even beyond the bound: they
+    are put by the consumer of the queue itself (e.g. the signals of
+    the strategy), which would otherwise wait for itself. The queue
+    counts the events put, conflated and dropped, along with its
+    highest size.
+    """
+
+    POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+    def __init__(self, maxsize=0, overflow='block', conflate=(EventType.TICK,)):
+        """
+        :param int maxsize: The maximum number of entries, 0 for
+                        an unbounded queue.
+        :param str overflow: The overflow policy, see above.
+        :param conflate: The event types conflated per ticker.
+        """
+        if overflow not in self.POLICIES:
+            raise ValueError(
+                'Unknown overflow policy %s, not in %s' % (overflow, self.POLICIES)
+            )
+        self.overflow = overflow
+        self.conflate = frozenset(conflate)
+        self.puts = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.high_water = 0
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        self.entries = deque()
+        self.pending = {}
+
+    def _qsize(self):
+        return len(self.entries)
+
+    def _put(self, item):
+        if getattr(item, 'type', None) in self.conflate:
+            entry = self.pending[item.ticker] = _Pending(item)
+            self.entries.append(entry)
+        else:
+            self.entries.append(item)
+        if len(self.entries) > self.high_water:
+            self.high_water = len(self.entries)
+
+    def _get(self):
+        entry = self.entries.popleft()
+        if isinstance(entry, _Pending):
+            del self.pending[entry.event.ticker]
+            return entry.event
+        return entry
+
+    @property
+    def queue(self):
+        """
+        The events waiting in the queue, in order.
+        """
+        with self.mutex:
+            return deque(
+                entry.event if isinstance(entry, _Pending) else entry
+                for entry in self.entries
+            )
+
+    def _drop_oldest(self):
+        for index, entry in enumerate(self.entries):
+            if isinstance(entry, _Pending):
+                del self.entries[index]
+                del self.pending[entry.event.ticker]
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+                return True
+        return False
+
+    def put(self, item, block=True, timeout=None):
+        """
+        Puts an event into the queue, conflating it with the waiting
+        event of its ticker if any, or applying the overflow policy
+        if the queue is full.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.not_full:
+            self.puts += 1
+            market = getattr(item, 'type', None) in self.conflate
+            while True:
+                if market:
+                    entry = self.pending.get(item.ticker)
+                    if entry is not None:
+                        entry.event = item
+                        self.conflated += 1
+                        return
+                if not market or self.maxsize <= 0 or self._qsize() < self.maxsize:
+                    break
+                if self.overflow == 'block':
+                    # Wait for a free entry, then check again whether
+                    # a tick of the ticker was queued in the meantime
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if not block or remaining is not None and remaining <= 0:
+                        raise queue.Full
+                    self.not_full.wait(remaining)
+                elif self.overflow == 'drop_newest' or not self._drop_oldest():
+                    self.dropped += 1
+                    return
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def metrics(self):
+        with self.mutex:
+            return {
+                'size': self._qsize(),
+                'high_water': self.high_water,
+                'puts': self.puts,
+                'conflated': self.conflated,
+                'dropped': self.dropped
+            }
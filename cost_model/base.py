@@ -0,0 +1,67 @@
+from abc import ABCMeta, abstractmethod
+
+
+class AbstractSlippageModel(object):
+    """
+    The AbstractSlippageModel abstract class adjusts the prices of
+    a batch of fills for the costs of crossing the market.
+
+    Models work on whole NumPy arrays so that a batch of fills is
+    evaluated in a single call, rather than one call per fill.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def fill_prices(self, directions, quantities, prices, volumes):
+        """
+        Returns the fill prices, adjusted for slippage.
+
+        :param directions: Array of +1 for buys and -1 for sells.
+        :param quantities: Array of filled quantities.
+        :param prices: Array of unadjusted fill prices in dollars.
+        :param volumes: Array of traded volumes of the bars the fills
+                    occurred in, NaN where unknown (e.g. ticks).
+        :return: Array of adjusted fill prices in dollars.
+        """
+        raise NotImplementedError("Should implement fill_prices()")
+
+
+class AbstractCommissionModel(object):
+    """
+    The AbstractCommissionModel abstract class computes the
+    commissions of a batch of fills, as NumPy arrays.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def commissions(self, quantities, prices):
+        """
+        Returns the commission of each fill in dollars.
+
+        :param quantities: Array of filled quantities.
+        :param prices: Array of fill prices in dollars.
+        :return: Array of commissions in dollars.
+        """
+        raise NotImplementedError("Should implement commissions()")
+
+
+class AbstractLatencyModel(object):
+    """
+    The AbstractLatencyModel abstract class draws the delays
+    between an order being sent and it reaching the (simulated)
+    broker, as NumPy arrays.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def delays(self, n):
+        """
+        Returns the delays of 'n' orders in seconds.
+
+        :param int n: The number of orders.
+        :return: Array of delays in seconds.
+        """
+        raise NotImplementedError("Should implement delays()")
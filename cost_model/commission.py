@@ -0,0 +1,87 @@
+import numpy as np
+
+from cost_model.base import AbstractCommissionModel
+
+
+class IBCommissionModel(AbstractCommissionModel):
+    """
+    The IBCommissionModel applies, to a whole batch of fills, the
+    same Interactive Brokers fixed fee structure as
+    FillEvent.calculate_ib_commission().
+    """
+
+    def commissions(self, quantities, prices):
+        quantities = np.asarray(quantities, dtype=np.float64)
+        rates = np.where(quantities <= 500, 0.013, 0.008)
+        full_cost = np.maximum(1.3, rates * quantities)
+        return np.minimum(full_cost, 0.5 / 100 * quantities * prices)
+
+
+class FixedCommissionModel(AbstractCommissionModel):
+    """
+    The FixedCommissionModel charges a fixed fee per fill plus
+    a fixed fee per unit traded.
+    """
+
+    def __init__(self, per_fill=1.0, per_unit=0.0):
+        """
+        Initialises the model.
+
+        :param float per_fill: The fee charged on every fill.
+        :param float per_unit: The fee charged per unit traded.
+        """
+        self.per_fill = per_fill
+        self.per_unit = per_unit
+
+    def commissions(self, quantities, prices):
+        quantities = np.asarray(quantities, dtype=np.float64)
+        return self.per_fill + self.per_unit * quantities
+
+
+class TieredCommissionModel(AbstractCommissionModel):
+    """
+    The TieredCommissionModel charges a per-unit rate which
+    decreases with the cumulative volume traded, e.g. the monthly
+    volume tiers of Interactive Brokers, within a minimum fee per
+    fill and a maximum fee as a fraction of the trade value.
+
+    The cumulative volume is kept across batches, and can be
+    reset at the start of each billing period with reset().
+    """
+
+    def __init__(
+            self, tiers=((0, 0.0035), (300000, 0.002), (3000000, 0.0015),
+                         (20000000, 0.001), (100000000, 0.0005)),
+            minimum=0.35, maximum_pct=1.0
+    ):
+        """
+        Initialises the model.
+
+        :param tiers: A sequence of (cumulative volume threshold,
+                        per-unit rate) pairs, sorted by threshold and
+                        starting at zero.
+        :param float minimum: The minimum fee per fill.
+        :param float maximum_pct: The maximum fee per fill, in percent
+                        of the trade value.
+        """
+        self.thresholds = np.array([t[0] for t in tiers], dtype=np.float64)
+        self.rates = np.array([t[1] for t in tiers], dtype=np.float64)
+        self.minimum = minimum
+        self.maximum_pct = maximum_pct
+        self.volume = 0.0
+
+    def reset(self):
+        """
+        Resets the cumulative volume, e.g. at the start of a month.
+        """
+        self.volume = 0.0
+
+    def commissions(self, quantities, prices):
+        quantities = np.asarray(quantities, dtype=np.float64)
+        cumulative = np.cumsum(quantities)
+        previous = self.volume + cumulative - quantities
+        tiers = np.searchsorted(self.thresholds, previous, side='right') - 1
+        full_cost = np.maximum(self.minimum, self.rates[tiers] * quantities)
+        if len(quantities):
+            self.volume += cumulative[-1]
+        return np.minimum(full_cost, self.maximum_pct / 100 * quantities * prices)
@@ -0,0 +1,29 @@
+import numpy as np
+
+from cost_model.base import AbstractLatencyModel
+
+
+class RandomLatencyModel(AbstractLatencyModel):
+    """
+    The RandomLatencyModel draws delays as a fixed minimum
+    (e.g. the network round trip) plus an exponentially
+    distributed random part (e.g. the broker queueing time).
+
+    The generator is seeded, and checkpointed along with the
+    execution handler, so that backtests are reproducible.
+    """
+
+    def __init__(self, minimum=0.001, mean_jitter=0.004, seed=None):
+        """
+        Initialises the model.
+
+        :param float minimum: The minimum delay in seconds.
+        :param float mean_jitter: The mean of the random part in seconds.
+        :param int seed: The seed of the random number generator.
+        """
+        self.minimum = minimum
+        self.mean_jitter = mean_jitter
+        self.random_state = np.random.RandomState(seed)
+
+    def delays(self, n):
+        return self.minimum + self.random_state.exponential(self.mean_jitter, n)
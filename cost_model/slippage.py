@@ -0,0 +1,72 @@
+import numpy as np
+
+from cost_model.base import AbstractSlippageModel
+
+
+class SpreadSlippageModel(AbstractSlippageModel):
+    """
+    The SpreadSlippageModel fills buys half a (constant) bid/ask
+    spread above the reference price and sells half a spread below,
+    e.g. to account for the spread when filling at bar prices.
+    """
+
+    def __init__(self, spread_bps=5.0):
+        """
+        Initialises the model.
+
+        :param float spread_bps: The full bid/ask spread in basis points.
+        """
+        self.spread_bps = spread_bps
+
+    def fill_prices(self, directions, quantities, prices, volumes):
+        half_spread = self.spread_bps / 20000.0
+        return prices * (1.0 + directions * half_spread)
+
+
+class SquareRootImpactModel(AbstractSlippageModel):
+    """
+    The SquareRootImpactModel moves the fill price against the
+    order by the square-root market impact law:
+
+        impact = coefficient * volatility * sqrt(quantity / volume)
+
+    as a fraction of the price. Fills whose volume is unknown are
+    priced with 'default_volume', if provided, or without impact.
+    """
+
+    def __init__(self, coefficient=1.0, volatility=0.02, default_volume=None):
+        """
+        Initialises the model.
+
+        :param float coefficient: The impact coefficient, of order one.
+        :param float volatility: The daily volatility of the returns.
+        :param float default_volume: The volume used for fills whose
+                        volume is unknown.
+        """
+        self.coefficient = coefficient
+        self.volatility = volatility
+        self.default_volume = default_volume
+
+    def fill_prices(self, directions, quantities, prices, volumes):
+        volumes = np.asarray(volumes, dtype=np.float64)
+        if self.default_volume is not None:
+            volumes = np.where(np.isnan(volumes), self.default_volume, volumes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            impact = self.coefficient * self.volatility * np.sqrt(quantities / volumes)
+        impact = np.where(np.isfinite(impact), impact, 0.0)
+        return prices * (1.0 + directions * impact)
+
+
+class CompositeSlippageModel(AbstractSlippageModel):
+    """
+    The CompositeSlippageModel applies several slippage models
+    one after the other, e.g. the spread and then the impact.
+    """
+
+    def __init__(self, *models):
+        self.models = models
+
+    def fill_prices(self, directions, quantities, prices, volumes):
+        for model in self.models:
+            prices = model.fill_prices(directions, quantities, prices, volumes)
+        return prices
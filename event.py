@@ -1,6 +1,8 @@
 from enum import Enum
 
-EventType = Enum('EventType', 'TICK BAR SIGNAL ORDER FILL SENTIMENT')
+from symbols import symbol_id
+
+EventType = Enum('EventType', 'TICK BAR SIGNAL ORDER FILL SENTIMENT TIMER CORPORATE_ACTION')
 
 
 class Event(object):
@@ -8,11 +10,23 @@ class Event(object):
     Event is base class providing an interface for all subsequent
     (inherited) event, that will trigger further events in the
     trading infrastructure.
+
+    The events of a ticker carry the 'symbol_id' of the ticker in the
+    SymbolRegistry of the process, which is interned again by name
+    when an event is unpickled (e.g. in another process).
     """
+
+    symbol_attr = 'ticker'
+
     @property
     def typename(self):
         return self.type.name
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'symbol_id' in state:
+            self.symbol_id = symbol_id(getattr(self, self.symbol_attr))
+
 
 class TickEvent(Event):
     """
@@ -31,6 +45,7 @@ class TickEvent(Event):
         """
         self.type = EventType.TICK
         self.ticker = ticker
+        self.symbol_id = symbol_id(ticker)
         self.time = time
         self.bid = bid
         self.ask = ask
@@ -76,6 +91,7 @@ class BarEvent(Event):
         """
         self.type = EventType.BAR
         self.ticker = ticker
+        self.symbol_id = symbol_id(ticker)
         self.time = time
         self.period = period
         self.open_price = open_price
@@ -139,13 +155,110 @@ class BarEvent(Event):
         return str(self)
 
 
+class SentimentEvent(Event):
+    """
+    Handles the event of a new sentiment score of a ticker, e.g.
+    from news or social media analytics, streamed along with the
+    market events.
+    """
+
+    def __init__(self, ticker, time, sentiment):
+        """
+        Initialises the SentimentEvent.
+
+        :param str ticker: The ticker symbol, e.g. 'GOOG'.
+        :param time: The timestamp of the sentiment score.
+        :param float sentiment: The sentiment score.
+        """
+        self.type = EventType.SENTIMENT
+        self.ticker = ticker
+        self.symbol_id = symbol_id(ticker)
+        self.time = time
+        self.sentiment = sentiment
+
+    def __str__(self):
+        return 'Type: %s, Ticker: %s, Time: %s, Sentiment: %s' % (
+            str(self.type), str(self.ticker), str(self.time), str(self.sentiment)
+        )
+
+    def __repr__(self):
+        return str(self)
+
+
+class TimerEvent(Event):
+    """
+    Handles the event of a timer of the Scheduler firing, which
+    is passed to the callback the timer was registered with.
+    """
+
+    def __init__(self, time, name=None, timer=None):
+        """
+        Initialises the TimerEvent.
+
+        :param time: The deadline of the timer.
+        :param name: The name the timer was registered with, if any.
+        :param timer: The Timer, e.g. to cancel a periodic timer.
+        """
+        self.type = EventType.TIMER
+        self.time = time
+        self.name = name
+        self.timer = timer
+
+    def __str__(self):
+        return 'Type: %s, Time: %s, Name: %s' % (
+            str(self.type), str(self.time), str(self.name)
+        )
+
+    def __repr__(self):
+        return str(self)
+
+
+class CorporateActionEvent(Event):
+    """
+    Handles the event of a corporate action of a ticker on its
+    ex-date, streamed by a price handler ahead of the first bar of
+    the ticker on that date, so that the portfolio adjusts its
+    share counts (splits) and cash (dividends) instead of prices.
+    """
+
+    def __init__(self, ticker, time, action, value):
+        """
+        Initialises the CorporateActionEvent.
+
+        :param str ticker: The ticker symbol, e.g. 'AAPL'.
+        :param time: The ex-date of the action.
+        :param str action: 'split' or 'dividend'.
+        :param float value: The ratio of a split (2.0 for a 2-for-1
+                        split) or the cash amount per share of a
+                        dividend, in dollars.
+        """
+        self.type = EventType.CORPORATE_ACTION
+        self.ticker = ticker
+        self.symbol_id = symbol_id(ticker)
+        self.time = time
+        self.action = action
+        self.value = value
+
+    def __str__(self):
+        return 'Type: %s, Ticker: %s, Time: %s, Action: %s, Value: %s' % (
+            str(self.type), str(self.ticker), str(self.time),
+            str(self.action), str(self.value)
+        )
+
+    def __repr__(self):
+        return str(self)
+
+
 class SignalEvent(Event):
     """
     Handles the event of sending a Signal from a Strategy object.
     This is received by a Portfolio object and acted upon.
     """
 
-    def __init__(self, ticker, buy_sell, suggested_quantity=None, datetime=None):
+    def __init__(
+            self, ticker, buy_sell, suggested_quantity=None, datetime=None,
+            order_type='MKT', price=None, strategy_id=None
+    ):
         """
         Initialises the SignalEvent.
 
@@ -156,13 +269,23 @@ class SignalEvent(Event):
                         of an asset to transact in, which is used by the
                         PositionSizer and RiskManger.
         :param timestamp datetime: The timestamp at which the signal was generated.
+        :param str order_type: 'MKT', 'LMT' or 'STP' for the order to be
+                        generated from the signal.
+        :param int price: The limit or stop price of the order, in
+                        the units of the PriceParser.
+        :param strategy_id: The identifier of the strategy which
+                        generated the signal, carried to its fills.
         """
 
         self.type = EventType.SIGNAL
         self.ticker = ticker
+        self.symbol_id = symbol_id(ticker)
         self.buy_sell = buy_sell
         self.suggested_quantity = suggested_quantity
         self.datetime = datetime
+        self.order_type = order_type
+        self.price = price
+        self.strategy_id = strategy_id
 
 
 class OrderEvent(Event):
@@ -172,32 +295,44 @@ class OrderEvent(Event):
     quantity and a direction
     """
 
-    def __init__(self, ticker, buy_sell, quantity, order_type):
+    def __init__(
+            self, ticker, buy_sell, quantity, order_type, price=None,
+            strategy_id=None
+    ):
         """
         Initialises the order type, setting whether it is
-        a Market order ('MKT') or Limit order('LMT'), has
-        a quantity (integral) and its direction ('BUY' or
-        'SELL').
+        a Market order ('MKT'), Limit order('LMT') or Stop
+        order ('STP'), has a quantity (integral) and its
+        direction ('BUY' or 'SELL').
 
         :param str ticker: The ticker symbol, e.g. 'GOOG'.
         :param str buy_sell: 'Buy' or 'Sell'.
         :param int quantity: Non-negative integer for quantity.
-        :param str order_type: 'MKT' or 'LMT' for Market or Limit.
+        :param str order_type: 'MKT', 'LMT' or 'STP' for Market,
+                        Limit or Stop.
+        :param int price: The limit or stop price, in the units
+                        of the PriceParser. Unused for Market orders.
+        :param strategy_id: The identifier of the strategy the order
+                        originates from, if any.
         """
 
         self.type = EventType.ORDER
         self.ticker = ticker
+        self.symbol_id = symbol_id(ticker)
         self.buy_sell = buy_sell
         self.quantity = quantity
         self.order_type = order_type
+        self.price = price
+        self.strategy_id = strategy_id
 
     def print_order(self):
         """
          Outputs the values within the OrderEvent.
          """
         print(
-            "Order: Ticker=%s, BuySell=%s, Quantity=%s, OrderType=%s" % (
-                self.ticker, self.buy_sell, self.quantity, self.order_type
+            "Order: Ticker=%s, BuySell=%s, Quantity=%s, OrderType=%s, Price=%s" % (
+                self.ticker, self.buy_sell, self.quantity, self.order_type,
+                self.price
             )
         )
 
@@ -210,8 +345,10 @@ class FillEvent(Event):
     the commission of the trade from the brokerage.
     """
 
+    symbol_attr = 'symbol'
+
     def __init__(self, timeindex, symbol, exchange, quantity,
-                 direction, fill_cost, commission=None):
+                 direction, fill_cost, commission=None, strategy_id=None):
         """
         Initialises the FillEvent objects. Sets the symbol, exchange,
         quantity, direction, cost of fill and an optimal
@@ -228,15 +365,19 @@ class FillEvent(Event):
         :param direction: The direction of fill ("BUY" or "SELL")
         :param fill_cost: The holdings value in dollars.
         :param commission: An optional commission sent from IB.
+        :param strategy_id: The identifier of the strategy the filled
+                        order originates from, if any.
         """
 
-        self.type = 'FILL'
+        self.type = EventType.FILL
         self.timeindex = timeindex
         self.symbol = symbol
+        self.symbol_id = symbol_id(symbol)
         self.exchange = exchange
         self.quantity = quantity
         self.direction = direction
         self.fill_cost = fill_cost
+        self.strategy_id = strategy_id
 
         # Calculate commission
         if commission is None:
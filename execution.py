@@ -1,9 +1,15 @@
 import datetime
+import heapq
 import queue
 
 from abc import ABCMeta, abstractmethod
+from math import floor
 
-from event import FillEvent, OrderEvent
+import numpy as np
+
+from event import EventType, FillEvent, OrderEvent
+from order_book import OrderBook, RestingOrder
+from price_parser import PriceParser
 
 class ExecutionHandler(object):
     """
@@ -31,35 +37,330 @@ class ExecutionHandler(object):
         """
         raise NotImplementedError("Should implement execute_order()")
 
+    def update_market(self, event):
+        """
+        Takes a market (Bar or Tick) event, e.g. to match the
+        orders resting at the broker against the new prices.
+        By default handlers do not act on market events.
+
+        :param event: Contains an Event object with market information.
+        :return:
+        """
+        pass
+
+    def flush(self):
+        """
+        Sends the orders held back by the handler, if any, e.g.
+        to be netted within a time slice. Called by the events
+        loop once the events queue is empty.
+        :return:
+        """
+        pass
+
+    def update_corporate_action(self, event):
+        """
+        Takes a CorporateActionEvent, e.g. to adjust the orders
+        resting at a simulated broker to a split. By default handlers
+        do not act on corporate actions, brokers adjusting the orders
+        they hold.
+
+        :param event: The CorporateActionEvent.
+        :return:
+        """
+        pass
+
+    def get_state(self):
+        """
+        Returns the state of the handler needed to resume a session,
+        e.g. resting orders. By default handlers do not hold any.
+        :return:
+        """
+        return {}
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state().
+        :param state:
+        :return:
+        """
+        pass
+
 class SimulatedExecutionHandler(ExecutionHandler):
     """
-    The simulated execution handler simply converts all order
-    objects into their equivalent fill objects automatically
+    The simulated execution handler simply converts all market
+    order objects into their equivalent fill objects automatically
     without latency, slippage or fill-ratio issues.
 
+    Limit ('LMT') and stop ('STP') orders rest in a per-ticker
+    OrderBook and are matched against the high/low of each
+    following bar, or the bid/ask of each following tick. With a
+    volume participation rate, the total quantity filled on a bar
+    is capped to that fraction of its volume, the remainder of
+    the orders resting until the next bars (partial fills).
+
+    Costs can be made realistic with optional models: a slippage
+    model adjusting the fill prices, a commission model replacing
+    the Interactive Brokers fees computed by each FillEvent, and a
+    latency model delaying the orders on the simulated clock given
+    by the market event timestamps. The fills of a market event are
+    evaluated by each model as a single batch of arrays.
+
     This allows a straightforward "first-go" test of any strategy,
     before implementation with a more sophisticated execution
     handler.
     """
 
-    def __init__(self, event):
+    def __init__(
+            self, events_queue, price_handler, volume_participation=None,
+            slippage_model=None, commission_model=None, latency_model=None,
+            risk_manager=None
+    ):
         """
         Initialises the handler, setting the event queues
         up internally.
 
-        :param event: The Queue of Event objects.
+        :param events_queue: The Queue of Event objects.
+        :param price_handler: The PriceHandler providing the fill prices.
+        :param float volume_participation: The maximum fraction of the
+                        volume of a bar that resting orders can fill,
+                        or None for no cap.
+        :param slippage_model: An optional SlippageModel.
+        :param commission_model: An optional CommissionModel, the
+                        FillEvent computing the commission otherwise.
+        :param latency_model: An optional LatencyModel.
+        :param risk_manager: The RiskManager of the portfolio, if any,
+                        told of the unfilled quantity of cancelled
+                        orders.
+        """
+        self.events = events_queue
+        self.price_handler = price_handler
+        self.volume_participation = volume_participation
+        self.slippage_model = slippage_model
+        self.commission_model = commission_model
+        self.latency_model = latency_model
+        self.risk_manager = risk_manager
+        self.books = {}
+        self.clock = None
+        self.sending = []
+        self.in_flight = []
+        self.sequence = 0
+
+    def _fill_price(self, ticker, buy_sell):
+        """
+        Returns the price at which a market order is filled: the
+        ask (bid) for buys (sells) with tick data, the last close
+        with bar data.
+        """
+        if self.price_handler.istick():
+            bid, ask = self.price_handler.get_best_bid_ask(ticker)
+            return ask if buy_sell == 'BUY' else bid
+        return self.price_handler.get_last_close(ticker)
+
+    def _fill_batch(self, timeindex, fills, volume):
+        """
+        Applies the cost models to a batch of fills and places the
+        resulting Fill events onto the queue.
+
+        :param timeindex: The timestamp of the fills.
+        :param fills: A list of (OrderEvent, quantity, price) tuples,
+                    with prices in the units of the PriceParser.
+        :param volume: The volume of the bar the fills occurred in,
+                    NaN if unknown.
+        """
+        if not fills:
+            return
+        quantities = np.array([f[1] for f in fills], dtype=np.float64)
+        prices = np.array([f[2] for f in fills], dtype=np.float64)
+        prices /= PriceParser.PRICE_MULTIPLIER
+        if self.slippage_model is not None:
+            directions = np.array(
+                [1.0 if f[0].buy_sell == 'BUY' else -1.0 for f in fills]
+            )
+            volumes = np.full(len(fills), volume, dtype=np.float64)
+            prices = self.slippage_model.fill_prices(
+                directions, quantities, prices, volumes
+            )
+        if self.commission_model is not None:
+            commissions = self.commission_model.commissions(quantities, prices).tolist()
+        else:
+            commissions = [None] * len(fills)
+
+        for (order, quantity, _), price, commission in zip(
+                fills, prices.tolist(), commissions
+        ):
+            fill_event = FillEvent(timeindex, order.ticker, 'ARCA',
+                                   quantity, order.buy_sell, price, commission,
+                                   order.strategy_id)
+            self.events.put(fill_event)
+
+    def _submit_order(self, event, resting=None):
+        """
+        Fills a market order at once, or adds a limit or stop order
+        to the book of its ticker, along with its RestingOrder if
+        already handed out while in flight.
         """
-        self.events = events
+        if event.order_type == 'MKT':
+            quantity = event.quantity if resting is None else resting.remaining
+            timeindex = self.price_handler.get_last_timestamp(event.ticker)
+            price = self._fill_price(event.ticker, event.buy_sell)
+            self._fill_batch(timeindex, [(event, quantity, price)], np.nan)
+            if resting is not None:
+                resting.remaining = 0
+        else:
+            book = self.books.get(event.ticker)
+            if book is None:
+                book = self.books[event.ticker] = OrderBook()
+            return book.add_order(event, resting)
+
+    def _send_orders(self):
+        """
+        Puts the orders sent since the last market event in flight,
+        drawing their delays from the latency model at once.
+        """
+        if not self.sending:
+            return
+        delays = self.latency_model.delays(len(self.sending)).tolist()
+        for resting, delay in zip(self.sending, delays):
+            arrival = self.clock + datetime.timedelta(seconds=delay)
+            heapq.heappush(self.in_flight, (arrival, self.sequence, resting))
+            self.sequence += 1
+        self.sending = []
 
     def execute_order(self, event):
         """
-        Simply converts Order objects into Fill objects naively,
+        Simply converts market Order objects into Fill objects naively,
         i.e. without any latency, slippage or fill ratio problems.
+        Limit and stop orders are added to the book of their ticker.
+
+        With a latency model, orders only reach the simulated broker
+        once the market event timestamps have passed their arrival
+        time, the delays of the orders sent within a step being drawn
+        together by flush() (or the next market event).
 
         :param event: Contains an Event object with order information.
+        :return: The RestingOrder for limit and stop orders, and for
+                    any order in flight, which can be passed to
+                    cancel_order().
+        """
+        if event.type == EventType.ORDER:
+            if self.latency_model is not None and self.clock is not None:
+                resting = RestingOrder(event)
+                self.sending.append(resting)
+                return resting
+            return self._submit_order(event)
+
+    def flush(self):
+        """
+        Puts the orders sent within the step in flight.
+        :return:
+        """
+        self._send_orders()
+
+    def update_market(self, event):
+        """
+        Advances the simulated clock, submits the orders which have
+        reached the broker, then matches the orders resting in the
+        book of the event ticker against the new bar or tick, placing
+        a Fill event onto the queue for every (possibly partial) fill.
+
+        :param event: Contains an Event object with market information.
+        :return:
+        """
+        self._send_orders()
+        self.clock = event.time
+        while self.in_flight and self.in_flight[0][0] <= self.clock:
+            resting = heapq.heappop(self.in_flight)[2]
+            if not resting.cancelled:
+                self._submit_order(resting.order, resting)
+
+        book = self.books.get(event.ticker)
+        if not book:
+            return
+        if event.type == EventType.BAR:
+            budget = None
+            if self.volume_participation is not None:
+                budget = int(floor(event.volume * self.volume_participation))
+            fills = book.match_bar(
+                event.open_price, event.high_price, event.low_price, budget
+            )
+            self._fill_batch(event.time, fills, event.volume)
+        else:
+            fills = book.match_tick(event.bid, event.ask)
+            self._fill_batch(event.time, fills, np.nan)
+
+    def update_corporate_action(self, event):
+        """
+        Adjusts the orders of the ticker of a split, resting in its
+        book or in flight, to the ratio of the split: the quantities
+        are multiplied by the ratio (truncated, as the positions of
+        the portfolio) and the prices divided by it.
+
+        :param event: The CorporateActionEvent.
+        :return:
+        """
+        if event.action != 'split':
+            return
+        book = self.books.get(event.ticker)
+        if book is not None:
+            book.split(event.value)
+        sent = self.sending + [resting for _, _, resting in self.in_flight]
+        for resting in sent:
+            order = resting.order
+            if order.ticker == event.ticker:
+                order.quantity = int(order.quantity * event.value)
+                resting.remaining = int(resting.remaining * event.value)
+                if order.price is not None:
+                    order.price = int(round(order.price / event.value))
+
+    def cancel_order(self, resting):
+        """
+        Cancels a resting order, releasing its unfilled quantity
+        from the RiskManager.
+
+        :param resting: The RestingOrder returned by execute_order().
+        :return: The quantity which was left unfilled.
+        """
+        if not resting.cancelled and resting.remaining and self.risk_manager is not None:
+            self.risk_manager.cancel_order(resting.order, resting.remaining)
+        in_flight = any(resting is sent for sent in self.sending) or any(
+            resting is sent for _, _, sent in self.in_flight
+        )
+        book = self.books.get(resting.order.ticker)
+        if in_flight or book is None:
+            # Orders in flight are dropped on arrival
+            resting.cancelled = True
+            return resting.remaining
+        return book.cancel_order(resting)
+
+    def get_state(self):
+        """
+        Returns the books of resting orders, the orders in flight
+        and the cost models, whose state (e.g. random generators or
+        cumulative volumes) evolves along the session.
+        :return:
+        """
+        return {
+            'books': self.books,
+            'clock': self.clock,
+            'sending': self.sending,
+            'in_flight': self.in_flight,
+            'sequence': self.sequence,
+            'slippage_model': self.slippage_model,
+            'commission_model': self.commission_model,
+            'latency_model': self.latency_model
+        }
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state().
+        :param state:
         :return:
         """
-        if event.type == 'ORDER':
-            fill_event = FillEvent(datetime.datetime.utcnow(), event.symbol,
-                                   'ARCA', event.quantity, event.direction, None)
-            self.events.put(fill_event)
\ No newline at end of file
+        self.books = state['books']
+        self.clock = state['clock']
+        self.sending = state['sending']
+        self.in_flight = state['in_flight']
+        self.sequence = state['sequence']
+        self.slippage_model = state['slippage_model']
+        self.commission_model = state['commission_model']
+        self.latency_model = state['latency_model']
@@ -0,0 +1,134 @@
+from abc import ABCMeta, abstractmethod
+
+from event import EventType
+from price_parser import PriceParser
+
+
+class AbstractIndicator(object):
+    """
+    AbstractIndicator is an abstract base class providing an interface
+    for all subsequent (inherited) technical indicators.
+
+    Indicators are updated incrementally from each new value, in O(1)
+    (or amortised O(1)) time and constant memory, rather than being
+    recomputed from a window of history on every bar. Until enough
+    values have been seen, the value of an indicator is NaN.
+    """
+
+    __metaclass__ = ABCMeta
+
+    def __init__(self, field='close'):
+        """
+        :param str field: The price of the events the indicator is
+                        computed from: 'open', 'high', 'low', 'close'
+                        or 'adj_close' for bars, 'bid', 'ask' or 'mid'
+                        for ticks. Bars always fall back to 'close'
+                        and ticks to 'mid' for other fields.
+        """
+        self.field = field
+        self.value = float('nan')
+
+    @property
+    def ready(self):
+        return self.value == self.value
+
+    def event_price(self, event):
+        """
+        Returns the price selected by 'field' from a Bar or Tick
+        event, in dollars.
+        """
+        if event.type == EventType.BAR:
+            price = getattr(event, '%s_price' % self.field, None)
+            if price is None:
+                price = event.close_price
+        elif self.field in ('bid', 'ask'):
+            price = getattr(event, self.field)
+        else:
+            price = (event.bid + event.ask) / 2.0
+        return price / float(PriceParser.PRICE_MULTIPLIER)
+
+    def update_event(self, event):
+        """
+        Updates the indicator from a Bar or Tick event.
+
+        :param event: The market event.
+        :return: The new value of the indicator.
+        """
+        return self.update(self.event_price(event))
+
+    @abstractmethod
+    def update(self, x):
+        """
+        Updates the indicator with a new value.
+
+        :param float x: The new value.
+        :return: The new value of the indicator.
+        """
+        raise NotImplementedError("Should implement update()")
+
+
+class TickerIndicators(object):
+    """
+    TickerIndicators holds the indicators subscribed by a strategy,
+    per ticker, and updates those of the ticker of each market event.
+
+    For instance, within a strategy:
+
+        self.indicators = TickerIndicators()
+        self.indicators.subscribe('SPY', 'fast', ExponentialMovingAverage(10))
+        self.indicators.subscribe('SPY', 'slow', SimpleMovingAverage(50))
+
+        def calculate_signals(self, event):
+            self.indicators.update(event)
+            if self.indicators.value('SPY', 'fast') > ...
+    """
+
+    def __init__(self):
+        self.tickers = {}
+
+    def subscribe(self, ticker, name, indicator):
+        """
+        Subscribes an indicator to the events of a ticker.
+
+        :param str ticker: The ticker symbol, e.g. 'GOOG'.
+        :param str name: The name the indicator is looked up with.
+        :param indicator: The Indicator object.
+        :return: The Indicator object.
+        """
+        self.tickers.setdefault(ticker, {})[name] = indicator
+        return indicator
+
+    def unsubscribe(self, ticker, name):
+        """
+        Unsubscribes an indicator from the events of a ticker.
+        """
+        indicators = self.tickers.get(ticker)
+        if indicators is not None:
+            indicators.pop(name, None)
+
+    def update(self, event):
+        """
+        Updates every indicator subscribed to the ticker of a Bar
+        or Tick event. Other events are ignored.
+
+        :param event: The market event.
+        :return:
+        """
+        if event.type not in (EventType.BAR, EventType.TICK):
+            return
+        indicators = self.tickers.get(event.ticker)
+        if indicators:
+            for indicator in indicators.values():
+                indicator.update_event(event)
+
+    def get(self, ticker, name):
+        """
+        Returns the Indicator object subscribed under a name.
+        """
+        return self.tickers[ticker][name]
+
+    def value(self, ticker, name):
+        """
+        Returns the current value of an indicator.
+        """
+        return self.tickers[ticker][name].value
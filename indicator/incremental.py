@@ -0,0 +1,191 @@
+from array import array
+from collections import deque
+from math import sqrt
+
+from event import EventType
+from indicator.base import AbstractIndicator
+from price_parser import PriceParser
+
+
+class SimpleMovingAverage(AbstractIndicator):
+    """
+    Mean of the last 'window' values, kept as a running sum
+    over a fixed-size ring buffer. The sum is recomputed from the
+    buffer once per cycle of the ring, which keeps the rounding
+    errors bounded for amortised O(1) cost.
+    """
+
+    def __init__(self, window, field='close'):
+        super(SimpleMovingAverage, self).__init__(field)
+        self.window = window
+        self.buffer = array('d', bytes(8 * window))
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, x):
+        i = self.count % self.window
+        if self.count >= self.window:
+            self.total -= self.buffer[i]
+        self.buffer[i] = x
+        self.total += x
+        self.count += 1
+        if self.count >= self.window:
+            if i == self.window - 1:
+                self.total = sum(self.buffer)
+            self.value = self.total / self.window
+        return self.value
+
+
+class ExponentialMovingAverage(AbstractIndicator):
+    """
+    Exponential moving average with a smoothing factor of
+    2 / (window + 1), seeded with the first value and ready
+    once 'window' values have been seen.
+    """
+
+    def __init__(self, window, field='close'):
+        super(ExponentialMovingAverage, self).__init__(field)
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self.count = 0
+        self.average = 0.0
+
+    def update(self, x):
+        if self.count == 0:
+            self.average = x
+        else:
+            self.average += self.alpha * (x - self.average)
+        self.count += 1
+        if self.count >= self.window:
+            self.value = self.average
+        return self.value
+
+
+class RollingStandardDeviation(AbstractIndicator):
+    """
+    Standard deviation of the last 'window' values, kept with
+    Welford's algorithm adapted to a sliding window, which avoids
+    the cancellation errors of a running sum of squares.
+    """
+
+    def __init__(self, window, field='close', ddof=1):
+        super(RollingStandardDeviation, self).__init__(field)
+        self.window = window
+        self.ddof = ddof
+        self.buffer = array('d', bytes(8 * window))
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        i = self.count % self.window
+        if self.count < self.window:
+            n = self.count + 1
+            delta = x - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.buffer[i]
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+            if self.m2 < 0.0:
+                self.m2 = 0.0
+        self.buffer[i] = x
+        self.count += 1
+        if self.count >= self.window:
+            self.value = sqrt(self.m2 / (self.window - self.ddof))
+        return self.value
+
+
+class RollingMaximum(AbstractIndicator):
+    """
+    Maximum of the last 'window' values, kept in a monotonic deque
+    of (index, value) pairs with decreasing values, so that each
+    update is amortised O(1).
+    """
+
+    def __init__(self, window, field='close'):
+        super(RollingMaximum, self).__init__(field)
+        self.window = window
+        self.count = 0
+        self.candidates = deque()
+
+    def _dominates(self, x, candidate):
+        return x >= candidate
+
+    def update(self, x):
+        candidates = self.candidates
+        while candidates and self._dominates(x, candidates[-1][1]):
+            candidates.pop()
+        candidates.append((self.count, x))
+        if candidates[0][0] <= self.count - self.window:
+            candidates.popleft()
+        self.count += 1
+        if self.count >= self.window:
+            self.value = candidates[0][1]
+        return self.value
+
+
+class RollingMinimum(RollingMaximum):
+    """
+    Minimum of the last 'window' values, kept in a monotonic deque
+    of (index, value) pairs with increasing values.
+    """
+
+    def _dominates(self, x, candidate):
+        return x <= candidate
+
+
+class AverageTrueRange(AbstractIndicator):
+    """
+    Average true range with Wilder's smoothing: the mean of the
+    first 'window' true ranges, then
+
+        atr = (atr * (window - 1) + true_range) / window
+
+    Bars provide their high and low, ticks are treated as bars
+    whose high, low and close are all the tick price.
+    """
+
+    def __init__(self, window):
+        super(AverageTrueRange, self).__init__('close')
+        self.window = window
+        self.count = 0
+        self.previous_close = None
+        self.average = 0.0
+
+    def update_event(self, event):
+        if event.type == EventType.BAR:
+            multiplier = float(PriceParser.PRICE_MULTIPLIER)
+            return self.update_bar(
+                event.high_price / multiplier, event.low_price / multiplier,
+                event.close_price / multiplier
+            )
+        return self.update(self.event_price(event))
+
+    def update(self, x):
+        return self.update_bar(x, x, x)
+
+    def update_bar(self, high, low, close):
+        """
+        Updates the indicator with a new bar.
+
+        :return: The new value of the indicator.
+        """
+        true_range = high - low
+        if self.previous_close is not None:
+            true_range = max(
+                true_range, abs(high - self.previous_close),
+                abs(low - self.previous_close)
+            )
+        self.previous_close = close
+        self.count += 1
+        if self.count <= self.window:
+            self.average += (true_range - self.average) / self.count
+            if self.count == self.window:
+                self.value = self.average
+        else:
+            self.average += (true_range - self.average) / self.window
+            self.value = self.average
+        return self.value
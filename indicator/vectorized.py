@@ -0,0 +1,149 @@
+import numpy as np
+
+
+class CrossSectionalIndicator(object):
+    """
+    CrossSectionalIndicator is the base class of the vectorized
+    indicators, which hold the state of a whole universe of tickers
+    in NumPy arrays and update it at once from a cross-sectional
+    batch, e.g. the closes of every ticker for a given bar.
+
+    Tickers are identified by their position within the arrays.
+    A NaN input leaves the state of its ticker untouched, e.g. for
+    a ticker not trading on that bar.
+    """
+
+    def __init__(self, window, n_tickers):
+        self.window = window
+        self.n_tickers = n_tickers
+        self.count = np.zeros(n_tickers, dtype=np.int64)
+        self.value = np.full(n_tickers, np.nan)
+
+    @staticmethod
+    def _updated(x):
+        """
+        Returns the positions of the tickers with a value.
+        """
+        return np.flatnonzero(~np.isnan(x))
+
+
+class VectorSimpleMovingAverage(CrossSectionalIndicator):
+    """
+    Vectorized SimpleMovingAverage over a (window, n_tickers)
+    ring buffer.
+    """
+
+    def __init__(self, window, n_tickers):
+        super(VectorSimpleMovingAverage, self).__init__(window, n_tickers)
+        self.buffer = np.zeros((window, n_tickers))
+        self.total = np.zeros(n_tickers)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        idx = self._updated(x)
+        x = x[idx]
+        count = self.count[idx]
+        pos = count % self.window
+        self.total[idx] += x - np.where(count >= self.window, self.buffer[pos, idx], 0.0)
+        self.buffer[pos, idx] = x
+        count += 1
+        self.count[idx] = count
+        self.value[idx] = np.where(
+            count >= self.window, self.total[idx] / self.window, np.nan
+        )
+        return self.value
+
+
+class VectorExponentialMovingAverage(CrossSectionalIndicator):
+    """
+    Vectorized ExponentialMovingAverage.
+    """
+
+    def __init__(self, window, n_tickers):
+        super(VectorExponentialMovingAverage, self).__init__(window, n_tickers)
+        self.alpha = 2.0 / (window + 1)
+        self.average = np.zeros(n_tickers)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        idx = self._updated(x)
+        x = x[idx]
+        count = self.count[idx]
+        average = self.average[idx]
+        average = np.where(count == 0, x, average + self.alpha * (x - average))
+        self.average[idx] = average
+        count += 1
+        self.count[idx] = count
+        self.value[idx] = np.where(count >= self.window, average, np.nan)
+        return self.value
+
+
+class VectorRollingStandardDeviation(CrossSectionalIndicator):
+    """
+    Vectorized RollingStandardDeviation, with the same sliding
+    window Welford updates.
+    """
+
+    def __init__(self, window, n_tickers, ddof=1):
+        super(VectorRollingStandardDeviation, self).__init__(window, n_tickers)
+        self.ddof = ddof
+        self.buffer = np.zeros((window, n_tickers))
+        self.mean = np.zeros(n_tickers)
+        self.m2 = np.zeros(n_tickers)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        idx = self._updated(x)
+        x = x[idx]
+        count = self.count[idx]
+        pos = count % self.window
+        full = count >= self.window
+        old = np.where(full, self.buffer[pos, idx], 0.0)
+        n = np.where(full, self.window, count + 1)
+        mean = self.mean[idx]
+        # Growing windows add x, full windows replace old by x
+        new_mean = mean + np.where(full, x - old, x - mean) / n
+        m2 = self.m2[idx] + np.where(
+            full, (x - old) * (x - new_mean + old - mean), (x - mean) * (x - new_mean)
+        )
+        self.mean[idx] = new_mean
+        self.m2[idx] = np.maximum(m2, 0.0)
+        self.buffer[pos, idx] = x
+        count += 1
+        self.count[idx] = count
+        self.value[idx] = np.where(
+            count >= self.window,
+            np.sqrt(self.m2[idx] / (self.window - self.ddof)), np.nan
+        )
+        return self.value
+
+
+class VectorAverageTrueRange(CrossSectionalIndicator):
+    """
+    Vectorized AverageTrueRange, with Wilder's smoothing.
+    """
+
+    def __init__(self, window, n_tickers):
+        super(VectorAverageTrueRange, self).__init__(window, n_tickers)
+        self.previous_close = np.full(n_tickers, np.nan)
+        self.average = np.zeros(n_tickers)
+
+    def update(self, high, low, close):
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        idx = self._updated(close)
+        high, low, close = high[idx], low[idx], close[idx]
+        previous = self.previous_close[idx]
+        true_range = np.fmax(
+            high - low,
+            np.fmax(np.abs(high - previous), np.abs(low - previous))
+        )
+        self.previous_close[idx] = close
+        count = self.count[idx] + 1
+        self.count[idx] = count
+        average = self.average[idx]
+        average += (true_range - average) / np.minimum(count, self.window)
+        self.average[idx] = average
+        self.value[idx] = np.where(count >= self.window, average, np.nan)
+        return self.value
@@ -0,0 +1,367 @@
+import json
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, deque
+
+import pandas as pd
+
+from event import EventType
+
+
+class LatencyHistogram(object):
+    """
+    LatencyHistogram counts latencies in nanoseconds in log-linear
+    buckets, in the manner of an HDR histogram: values below
+    2**sub_bucket_bits are counted exactly, and larger values within
+    a relative error of 2**-(sub_bucket_bits - 1), whatever their
+    magnitude. Recording a value is a few integer operations.
+    """
+
+    def __init__(self, sub_bucket_bits=8):
+        """
+        :param int sub_bucket_bits: The precision of the buckets,
+                        8 giving a relative error below 1%.
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.half = 1 << (sub_bucket_bits - 1)
+        self.counts = [0] * (2 * self.half)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        shift = value.bit_length() - self.sub_bucket_bits
+        if shift <= 0:
+            return value
+        return shift * self.half + (value >> shift)
+
+    def _lowest(self, index):
+        if index < 2 * self.half:
+            return index
+        shift = index // self.half - 1
+        return (index - shift * self.half) << shift
+
+    def record(self, value):
+        """
+        Counts a latency.
+
+        :param int value: The latency in nanoseconds.
+        """
+        if value < 0:
+            value = 0
+        index = self._index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """
+        Returns the lowest value of the bucket holding the q-th
+        percentile, within the precision of the buckets.
+
+        :param float q: The percentile, between 0 and 100.
+        """
+        if self.count == 0:
+            return None
+        rank = max(1, int(round(q / 100.0 * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(self._lowest(index), self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / float(self.count) if self.count else None
+
+    def merge(self, other):
+        """
+        Adds the counts of another histogram of the same precision.
+        """
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def summary(self):
+        """
+        Returns the count, mean and percentiles in microseconds.
+        """
+        def us(value):
+            return None if value is None else value / 1000.0
+        return {
+            'count': self.count,
+            'mean_us': us(self.mean()),
+            'p50_us': us(self.percentile(50)),
+            'p90_us': us(self.percentile(90)),
+            'p99_us': us(self.percentile(99)),
+            'max_us': us(self.max)
+        }
+
+
+class SamplingProfiler(object):
+    """
+    SamplingProfiler samples the stack of a thread at a fixed
+    interval from a background thread, counting the collapsed stacks
+    (outermost frame first), e.g. to be rendered as a flame graph.
+    The profiled thread is not slowed down beyond the sampling itself.
+    """
+
+    def __init__(self, thread_id=None, interval=0.001, max_depth=64):
+        """
+        :param thread_id: The identifier of the profiled thread, by
+                        default the thread creating the profiler.
+        :param float interval: The sampling interval in seconds.
+        :param int max_depth: The maximum number of frames per stack.
+        """
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, duration=None):
+        """
+        Starts sampling, for 'duration' seconds or until stop().
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(duration,), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops sampling and waits for the sampling thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, duration):
+        end = None if duration is None else time.monotonic() + duration
+        while not self._stop.wait(self.interval):
+            if end is not None and time.monotonic() >= end:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append('%s (%s:%d)' % (code.co_name, code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top(self, n=20):
+        """
+        Returns the n functions sampled the most often at the top of
+        the stack, as (function, samples) pairs.
+        """
+        functions = Counter()
+        for stack, count in self.stacks.items():
+            functions[stack.rsplit(';', 1)[-1]] += count
+        return functions.most_common(n)
+
+    def dump(self, path):
+        """
+        Writes the collapsed stacks, one 'stack count' per line.
+        """
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write('%s %d\n' % (stack, count))
+
+
+class Instrumentation(object):
+    """
+    Instrumentation records, for a Backtest, the number of calls and
+    a latency histogram per event type and handler, the depth of the
+    events queue each time market data is streamed, and the latencies
+    from a market event to the signals it triggers (tick-to-signal)
+    and from a signal to the complete fill of its order
+    (signal-to-fill), which are meaningful with live handlers.
+
+    It is opt-in: a Backtest created without instrumentation calls
+    its handlers directly, and only pays for a None check per market
+    event. With instrumentation, each handler is wrapped in a timing
+    closure when the backtest starts.
+    """
+
+    def __init__(
+            self, sub_bucket_bits=8, clock=time.perf_counter_ns,
+            max_queue_samples=4096
+    ):
+        """
+        :param int sub_bucket_bits: The precision of the histograms.
+        :param clock: The clock of the latencies, in nanoseconds.
+        :param int max_queue_samples: The maximum (even) number of
+                        queue depths kept, see sample_queue().
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.clock = clock
+        self.handlers = {}
+        self.queue_depth = LatencyHistogram(sub_bucket_bits)
+        self.max_queue_samples = max_queue_samples
+        self.queue_depths = array('l')
+        self.queue_depth_stride = 1
+        self._queue_samples = 0
+        self.tick_to_signal = LatencyHistogram(sub_bucket_bits)
+        self.signal_to_fill = LatencyHistogram(sub_bucket_bits)
+        self.profiler = None
+        self._market_time = None
+        self._signal_time = None
+        self._orders = {}
+
+    def histogram(self, event_type, name):
+        key = (event_type, name)
+        histogram = self.handlers.get(key)
+        if histogram is None:
+            histogram = self.handlers[key] = LatencyHistogram(self.sub_bucket_bits)
+        return histogram
+
+    def _timed(self, event_type, handler):
+        histogram = self.histogram(event_type, getattr(handler, '__qualname__', repr(handler)))
+        clock = self.clock
+
+        def call(event):
+            start = clock()
+            handler(event)
+            histogram.record(clock() - start)
+        return call
+
+    def instrument(self, handlers):
+        """
+        Wraps a dispatch table of event type to handlers, timing
+        every handler and observing the events for the live latencies.
+
+        :param handlers: A dict of EventType to a tuple of handlers.
+        :return: The instrumented dispatch table.
+        """
+        return dict(
+            (event_type, (self.observe,) + tuple(
+                self._timed(event_type, handler) for handler in calls
+            ))
+            for event_type, calls in handlers.items()
+        )
+
+    def observe(self, event):
+        """
+        Timestamps the events for the tick-to-signal and the
+        signal-to-fill latencies. Orders are matched to their fills
+        per ticker and direction, first in first out.
+        """
+        now = self.clock()
+        if event.type in (EventType.TICK, EventType.BAR):
+            self._market_time = now
+        elif event.type == EventType.SIGNAL:
+            if self._market_time is not None:
+                self.tick_to_signal.record(now - self._market_time)
+            self._signal_time = now
+        elif event.type == EventType.ORDER:
+            if self._signal_time is not None:
+                self._orders.setdefault(
+                    (event.ticker, event.buy_sell), deque()
+                ).append([self._signal_time, event.quantity])
+        elif event.type == EventType.FILL:
+            orders = self._orders.get((event.symbol, event.direction))
+            if orders:
+                order = orders[0]
+                order[1] -= event.quantity
+                if order[1] <= 0:
+                    orders.popleft()
+                    self.signal_to_fill.record(now - order[0])
+
+    def sample_queue(self, depth):
+        """
+        Records the depth of the events queue in the histogram, and
+        in the series of queue_depths, one sample every
+        'queue_depth_stride' market events. Once the series is full,
+        every other sample is dropped and the stride doubled, so that
+        it covers the whole run within 'max_queue_samples'.
+        """
+        self.queue_depth.record(depth)
+        sample = self._queue_samples
+        self._queue_samples += 1
+        if sample % self.queue_depth_stride:
+            return
+        if len(self.queue_depths) >= self.max_queue_samples:
+            del self.queue_depths[1::2]
+            self.queue_depth_stride *= 2
+            if sample % self.queue_depth_stride:
+                return
+        self.queue_depths.append(depth)
+
+    def start_profiler(self, duration=None, interval=0.001, thread_id=None):
+        """
+        Starts a SamplingProfiler of the events loop thread (by
+        default the calling thread) for 'duration' seconds, or until
+        stop_profiler() is called.
+        """
+        self.stop_profiler()
+        self.profiler = SamplingProfiler(thread_id, interval)
+        self.profiler.start(duration)
+        return self.profiler
+
+    def stop_profiler(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    def report(self):
+        """
+        Returns a DataFrame of the calls and latencies per event type
+        and handler, along with the live latencies.
+        """
+        rows = []
+        for (event_type, name), histogram in sorted(
+                self.handlers.items(), key=lambda item: (item[0][0].value, item[0][1])
+        ):
+            if histogram.count:
+                rows.append(dict(
+                    event_type=event_type.name, handler=name, **histogram.summary()
+                ))
+        for name, histogram in (
+                ('tick_to_signal', self.tick_to_signal),
+                ('signal_to_fill', self.signal_to_fill)
+        ):
+            if histogram.count:
+                rows.append(dict(event_type=None, handler=name, **histogram.summary()))
+        return pd.DataFrame(rows)
+
+    def dump(self, path):
+        """
+        Writes the report, the queue depths and the profile, if any,
+        as JSON.
+        """
+        report = {
+            'handlers': self.report().to_dict('records'),
+            'queue_depth': {
+                'samples': self.queue_depth.count,
+                'mean': self.queue_depth.mean(),
+                'max': self.queue_depth.max,
+                'stride': self.queue_depth_stride,
+                'series': self.queue_depths.tolist()
+            }
+        }
+        if self.profiler is not None:
+            report['profile'] = self.profiler.top()
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,317 @@
+import queue
+import threading
+import time
+
+from event import EventType
+
+
+def _backoff(ready, timeout):
+    """
+    Waits until ready() is true, spinning first then sleeping
+    increasingly longer (up to 1ms), so that a busy stage hands
+    over in microseconds while an idle one does not burn a core.
+
+    :return: True if ready() became true before the timeout.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    spins = 0
+    delay = 0.00005
+    while not ready():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        if spins < 100:
+            spins += 1
+            time.sleep(0)
+        else:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.001)
+    return True
+
+
+class SPSCRingBuffer(object):
+    """
+    A bounded ring buffer between a single producer thread and a
+    single consumer thread, with the put/get interface of a
+    queue.Queue so that it can be given to the components as their
+    events queue.
+
+    The producer only writes the tail counter and the consumer only
+    the head counter, each publishing its slot before moving its
+    counter, so no lock is taken on either side. A full buffer
+    blocks the producer (back-pressure) and an empty one the
+    consumer, both waiting with a spin-then-sleep backoff.
+
+    The producer counts the items put, the times it found the buffer
+    full and the highest backlog; the consumer counts the items got.
+    """
+
+    def __init__(self, capacity=4096):
+        """
+        :param int capacity: The maximum number of items buffered.
+        """
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.head = 0
+        self.tail = 0
+        self.puts = 0
+        self.gets = 0
+        self.full = 0
+        self.high_water = 0
+
+    def qsize(self):
+        return self.tail - self.head
+
+    def empty(self):
+        return self.tail == self.head
+
+    def put(self, item, block=True, timeout=None):
+        tail = self.tail
+        if tail - self.head >= self.capacity:
+            self.full += 1
+            if not block or not _backoff(
+                    lambda: tail - self.head < self.capacity, timeout
+            ):
+                raise queue.Full
+        self.slots[tail % self.capacity] = item
+        self.tail = tail + 1
+        self.puts += 1
+        backlog = tail + 1 - self.head
+        if backlog > self.high_water:
+            self.high_water = backlog
+
+    def get(self, block=True, timeout=None):
+        head = self.head
+        if head == self.tail:
+            if not block or not _backoff(lambda: head != self.tail, timeout):
+                raise queue.Empty
+        index = head % self.capacity
+        item = self.slots[index]
+        self.slots[index] = None
+        self.head = head + 1
+        self.gets += 1
+        return item
+
+    def put_nowait(self, item):
+        self.put(item, False)
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def metrics(self):
+        return {
+            'capacity': self.capacity,
+            'backlog': self.qsize(),
+            'high_water': self.high_water,
+            'puts': self.puts,
+            'gets': self.gets,
+            'full': self.full
+        }
+
+
+class LivePipeline(object):
+    """
+    LivePipeline runs a live trading session as three stages, each
+    on its own thread and connected by SPSCRingBuffers:
+
+    * ingestion: the streaming price handler (e.g. the
+      OANDAStreamingPriceHandler) reads and decodes the market data,
+      placing market events onto the market buffer,
+    * strategy: market events go to the strategy and the portfolio,
+      whose signals are turned into orders on the events queue given
+      to them (only used by this thread). Orders, along with the
+      market events, are handed to the execution buffer, and fills
+      coming back on the fills buffer go to the portfolio,
+    * execution: the execution handler executes the orders, matches
+      its resting orders against the market events, and places its
+      fills onto the fills buffer.
+
+    A slow calculate_signals() thus only delays the strategy stage,
+    the market buffer absorbing the stream up to its capacity.
+
+    stop() disconnects the price handler; the ingestion stage then
+    ends its stream with a sentinel, which every stage handles after
+    the events before it, so that the pending events are drained
+    before the threads end. An exception in a stage stops the
+    pipeline and is raised again by join().
+
+    The execution handler must place its fills from a single thread,
+    either the execution stage itself or its own (e.g. the event
+    loop of the AsyncLiveExecutionHandler).
+    """
+
+    def __init__(
+            self, price_handler, strategy, portfolio, execution_handler,
+            events_queue, capacity=4096, stream=None
+    ):
+        """
+        Initialises the pipeline, swapping the events queues of the
+        price handler and the execution handler for the buffers.
+
+        :param price_handler: The streaming price handler, providing
+                        disconnect().
+        :param strategy: The Strategy (or Strategies).
+        :param portfolio: The Portfolio.
+        :param execution_handler: The ExecutionHandler.
+        :param events_queue: The events queue of the strategy and the
+                        portfolio.
+        :param int capacity: The capacity of each buffer.
+        :param stream: The callable streaming the market data on the
+                        ingestion thread, by default the rates() of
+                        the OANDA account and tickers of the handler.
+        """
+        self.price_handler = price_handler
+        self.strategy = strategy
+        self.portfolio = portfolio
+        self.execution_handler = execution_handler
+        self.events_queue = events_queue
+        self.stream = stream or (lambda: price_handler.rates(
+            price_handler.account_id, instruments=','.join(price_handler.tickers_list)
+        ))
+
+        self.market = SPSCRingBuffer(capacity)
+        self.orders = SPSCRingBuffer(capacity)
+        self.fills = SPSCRingBuffer(capacity)
+        price_handler.events_queue = self.market
+        execution_handler.events = self.fills
+
+        self.processed = {'ingestion': 0, 'strategy': 0, 'execution': 0}
+        self.errors = []
+        self.threads = []
+        self._stopping = threading.Event()
+        self._executed = threading.Event()
+
+    def start(self):
+        """
+        Starts the execution, strategy and ingestion threads.
+        """
+        for name, target, source in (
+                ('execution', self._run_execution, self.orders),
+                ('strategy', self._run_strategy, self.market),
+                ('ingestion', self._run_ingestion, None)
+        ):
+            thread = threading.Thread(
+                target=self._run_stage, args=(target, source),
+                name='live-%s' % name, daemon=True
+            )
+            self.threads.append(thread)
+            thread.start()
+
+    def stop(self):
+        """
+        Disconnects the price handler, the stages draining the
+        pending events before they end.
+        """
+        if not self._stopping.is_set():
+            self._stopping.set()
+            self.price_handler.disconnect()
+
+    def join(self, timeout=None):
+        """
+        Waits for the threads, raising the first error of a stage.
+
+        :return: True if every thread has ended.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if self.errors:
+            raise self.errors[0]
+        return not any(thread.is_alive() for thread in self.threads)
+
+    def _run_stage(self, target, source):
+        try:
+            target()
+        except Exception as e:
+            self.errors.append(e)
+            self.stop()
+            # Keep consuming the input of the failed stage until the
+            # end of the stream, so that its producer never blocks
+            while source is not None and source.get() is not None:
+                pass
+
+    def _run_ingestion(self):
+        try:
+            self.stream()
+        finally:
+            self.processed['ingestion'] = self.market.puts
+            self.market.put(None)
+
+    def _handle(self, event):
+        if event.type in (EventType.TICK, EventType.BAR):
+            self.strategy.calculate_signals(event)
+            self.portfolio.update_timeindex(event)
+            self.orders.put(event)
+        elif event.type == EventType.SENTIMENT:
+            self.strategy.calculate_signals(event)
+        elif event.type == EventType.SIGNAL:
+            self.portfolio.update_signal(event)
+        elif event.type == EventType.ORDER:
+            self.orders.put(event)
+        elif event.type == EventType.FILL:
+            self.portfolio.update_fill(event)
+        elif event.type == EventType.CORPORATE_ACTION:
+            self.portfolio.update_corporate_action(event)
+        while True:
+            try:
+                event = self.events_queue.get(False)
+            except queue.Empty:
+                break
+            self._handle(event)
+
+    def _drain_fills(self):
+        while True:
+            try:
+                fill = self.fills.get_nowait()
+            except queue.Empty:
+                return
+            self._handle(fill)
+
+    def _run_strategy(self):
+        while True:
+            self._drain_fills()
+            try:
+                event = self.market.get(timeout=0.01)
+            except queue.Empty:
+                continue
+            if event is None:
+                break
+            self._handle(event)
+            self.processed['strategy'] += 1
+        self.orders.put(None)
+        while not self._executed.wait(0.001):
+            self._drain_fills()
+        self._drain_fills()
+
+    def _run_execution(self):
+        try:
+            while True:
+                try:
+                    event = self.orders.get(timeout=0.01)
+                except queue.Empty:
+                    if self.errors:
+                        return
+                    continue
+                if event is None:
+                    break
+                if event.type == EventType.ORDER:
+                    self.execution_handler.execute_order(event)
+                else:
+                    self.execution_handler.update_market(event)
+                self.processed['execution'] += 1
+                if self.orders.empty():
+                    self.execution_handler.flush()
+            self.execution_handler.flush()
+        finally:
+            self._executed.set()
+
+    def metrics(self):
+        """
+        Returns the backlog metrics of the buffers along with the
+        number of events processed by each stage.
+        """
+        return {
+            'processed': dict(self.processed),
+            'market': self.market.metrics(),
+            'orders': self.orders.metrics(),
+            'fills': self.fills.metrics()
+        }
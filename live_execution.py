@@ -0,0 +1,232 @@
+import asyncio
+import datetime
+import itertools
+import json
+import threading
+import time
+
+from event import EventType, FillEvent
+from execution import ExecutionHandler
+from price_parser import PriceParser
+
+
+class LiveOrder(object):
+    """
+    The book-keeping of an order sent to the broker and not yet
+    completely filled.
+    """
+
+    __slots__ = ('order', 'sent', 'acked', 'broker_id', 'filled')
+
+    def __init__(self, order, sent):
+        self.order = order
+        self.sent = sent
+        self.acked = None
+        self.broker_id = None
+        self.filled = 0
+
+
+class AsyncLiveExecutionHandler(ExecutionHandler):
+    """
+    The AsyncLiveExecutionHandler sends orders to a brokerage over
+    a pool of TCP connections, speaking the newline-delimited JSON
+    protocol of the MockBroker.
+
+    The connections are driven by an asyncio event loop running in
+    a background thread, so that execute_order() only hands the
+    order over to the loop and returns at once: a slow broker round
+    trip never stalls the events loop, and many orders are in
+    flight at the same time (pipelining). Each order is tagged with
+    a unique client id, which acknowledgements and (partial) fills
+    are matched back to, and every fill is placed onto the events
+    queue as a FillEvent.
+
+    Latencies from send to acknowledgement and from send to the
+    complete fill are recorded for every order. The orders in flight
+    are shared by the caller and the event loop thread, thus only
+    accessed under a lock.
+    """
+
+    def __init__(
+            self, events_queue, host, port, connections=4,
+            client_prefix='c', exchange='BROKER'
+    ):
+        """
+        Initialises the handler, without connecting.
+
+        :param events_queue: The Queue of Event objects.
+        :param str host: The host of the broker.
+        :param int port: The port of the broker.
+        :param int connections: The size of the connection pool.
+        :param str client_prefix: The prefix of the client order ids.
+        :param str exchange: The exchange set on the Fill events.
+        """
+        self.events = events_queue
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.client_prefix = client_prefix
+        self.exchange = exchange
+
+        self.orders = {}
+        self.ack_latencies = []
+        self.fill_latencies = []
+        self.rejected = []
+        self.loop = None
+        self.thread = None
+        self._ids = itertools.count(1)
+        self._outboxes = []
+        self._tasks = []
+        self._next_connection = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def connect(self):
+        """
+        Starts the event loop thread and opens the connection pool.
+        """
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._open(), self.loop).result()
+
+    async def _open(self):
+        for _ in range(self.connections):
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            outbox = asyncio.Queue()
+            self._outboxes.append(outbox)
+            self._tasks.append(asyncio.ensure_future(self._write(writer, outbox)))
+            self._tasks.append(asyncio.ensure_future(self._read(reader)))
+
+    def disconnect(self):
+        """
+        Closes the connection pool and stops the event loop thread.
+        Orders still in flight are abandoned.
+        """
+        async def close():
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self._outboxes = []
+        self._tasks = []
+
+    async def _write(self, writer, outbox):
+        """
+        Writes the orders of a connection, coalescing all the orders
+        queued since the last write before waiting for the socket.
+        """
+        try:
+            while True:
+                lines = [await outbox.get()]
+                while not outbox.empty():
+                    lines.append(outbox.get_nowait())
+                writer.write(b''.join(lines))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _read(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                print(
+                    "Connection to the broker %s:%s was closed." % (
+                        self.host, self.port
+                    )
+                )
+                break
+            self._on_message(json.loads(line.decode('utf-8')))
+
+    def _on_message(self, message):
+        """
+        Matches an acknowledgement, fill or rejection back to its
+        order by client id. The fill events are put onto the queue
+        outside the lock, as the queue may block the loop thread
+        until the caller consumes it.
+        """
+        client_id = message['client_id']
+        now = time.perf_counter()
+        with self._lock:
+            live_order = self.orders.get(client_id)
+            if live_order is None:
+                return
+            if message['type'] == 'ack':
+                live_order.acked = now
+                live_order.broker_id = message['broker_id']
+                self.ack_latencies.append(now - live_order.sent)
+                return
+            if message['type'] == 'reject':
+                self.rejected.append((live_order.order, message.get('reason')))
+                self._complete(client_id)
+                return
+            if message['type'] != 'fill':
+                return
+            order = live_order.order
+            live_order.filled += message['quantity']
+            completed = live_order.filled >= order.quantity
+
+        fill_event = FillEvent(
+            datetime.datetime.fromtimestamp(
+                message['time'], datetime.timezone.utc
+            ),
+            order.ticker, self.exchange, message['quantity'],
+            order.buy_sell, message['price'], message.get('commission'),
+            order.strategy_id
+        )
+        self.events.put(fill_event)
+        if completed:
+            with self._lock:
+                self.fill_latencies.append(now - live_order.sent)
+                self._complete(client_id)
+
+    def _complete(self, client_id):
+        # Called with the lock held
+        del self.orders[client_id]
+        if not self.orders:
+            self._idle.notify_all()
+
+    def _send(self, line):
+        # Runs on the event loop thread
+        outbox = self._outboxes[self._next_connection]
+        self._next_connection = (self._next_connection + 1) % len(self._outboxes)
+        outbox.put_nowait(line)
+
+    def execute_order(self, event):
+        """
+        Tags an Order event with a new client id and hands it over
+        to the event loop, without waiting for the broker.
+
+        :param event: Contains an Event object with order information.
+        :return: The client id of the order.
+        """
+        if event.type == EventType.ORDER:
+            client_id = '%s-%d' % (self.client_prefix, next(self._ids))
+            price = None
+            if event.price is not None:
+                price = event.price / float(PriceParser.PRICE_MULTIPLIER)
+            line = json.dumps({
+                'type': 'order', 'client_id': client_id,
+                'ticker': event.ticker, 'buy_sell': event.buy_sell,
+                'quantity': event.quantity, 'order_type': event.order_type,
+                'price': price
+            }).encode('utf-8') + b'\n'
+            with self._lock:
+                self.orders[client_id] = LiveOrder(event, time.perf_counter())
+            self.loop.call_soon_threadsafe(self._send, line)
+            return client_id
+
+    def wait_until_filled(self, timeout=None):
+        """
+        Blocks until every order sent has been completely filled
+        or rejected.
+
+        :param float timeout: The maximum time to wait in seconds.
+        :return: True if no order is left in flight.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self.orders, timeout)
@@ -0,0 +1,281 @@
+import asyncio
+import http.server
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+
+class MockBroker(object):
+    """
+    MockBroker is a local brokerage server used to test and
+    benchmark live execution handlers without a real account.
+
+    It speaks newline-delimited JSON over TCP. Each order message:
+
+        {"type": "order", "client_id": "c-1", "ticker": "SPY",
+         "buy_sell": "BUY", "quantity": 100, "order_type": "MKT",
+         "price": null}
+
+    is acknowledged at once with an 'ack' message carrying a broker
+    id, then filled after 'latency' seconds, in 'fill_chunks' partial
+    'fill' messages. Orders are processed concurrently, so that a
+    client pipelining many orders only waits for one round trip.
+
+    Market orders are filled at the price set with set_price(), or
+    at 'default_price' for tickers without price, limit and stop
+    orders at their own price.
+    """
+
+    def __init__(
+            self, host='127.0.0.1', port=0, latency=0.0,
+            fill_chunks=1, default_price=100.0, commission=1.0
+    ):
+        """
+        Initialises the broker.
+
+        :param str host: The interface to listen on.
+        :param int port: The port to listen on, 0 for any free port.
+        :param float latency: The delay between an order and its fill.
+        :param int fill_chunks: The number of partial fills per order.
+        :param float default_price: The fill price of market orders
+                        for tickers without price.
+        :param float commission: The commission charged per order,
+                        split across its partial fills.
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.fill_chunks = fill_chunks
+        self.default_price = default_price
+        self.commission = commission
+        self.prices = {}
+        self.orders_received = 0
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._broker_ids = 0
+
+    def set_price(self, ticker, price):
+        """
+        Sets the price at which market orders on 'ticker' are filled.
+        """
+        self.prices[ticker] = price
+
+    @staticmethod
+    def _send(writer, message):
+        writer.write(json.dumps(message).encode('utf-8') + b'\n')
+
+    async def _fill(self, writer, order, broker_id):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        price = order.get('price')
+        if order.get('order_type', 'MKT') == 'MKT' or price is None:
+            price = self.prices.get(order['ticker'], self.default_price)
+        quantity = order['quantity']
+        chunks = max(1, min(self.fill_chunks, quantity))
+        for i in range(chunks):
+            chunk = quantity // chunks + (1 if i < quantity % chunks else 0)
+            self._send(writer, {
+                'type': 'fill', 'client_id': order['client_id'],
+                'broker_id': broker_id, 'quantity': chunk,
+                'price': price, 'commission': self.commission / chunks,
+                'time': time.time()
+            })
+        await writer.drain()
+
+    async def _handle_client(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                order = json.loads(line.decode('utf-8'))
+                if order.get('type') != 'order':
+                    continue
+                self.orders_received += 1
+                self._broker_ids += 1
+                broker_id = self._broker_ids
+                self._send(writer, {
+                    'type': 'ack', 'client_id': order['client_id'],
+                    'broker_id': broker_id
+                })
+                task = asyncio.ensure_future(self._fill(writer, order, broker_id))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    def start(self):
+        """
+        Starts the server on its own event loop in a background
+        thread and returns the port it is listening on.
+        """
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(asyncio.start_server(
+                self._handle_client, self.host, self.port
+            ))
+            self.port = self.server.sockets[0].getsockname()[1]
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        started.wait()
+        return self.port
+
+    def stop(self):
+        """
+        Stops the server and its event loop.
+        """
+        async def close():
+            self.server.close()
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class MockOandaCandleServer(object):
+    """
+    MockOandaCandleServer is a local HTTP server answering the
+    candles requests of the OANDA v1 API, used to test the
+    OandaCandleBackfill without an account.
+
+    GET /v1/candles returns the midpoint candles of every multiple
+    of the granularity from 'start' included to 'end' excluded,
+    with deterministic prices, and a 400 error beyond 5000 candles,
+    as OANDA does. The first 'failures' requests are answered with
+    'failure_status' instead, and every request is recorded.
+    """
+
+    SECONDS = {'S5': 5, 'M1': 60, 'M5': 300, 'H1': 3600, 'D': 86400}
+
+    def __init__(
+            self, host='127.0.0.1', port=0, failures=0,
+            failure_status=503, retry_after=None
+    ):
+        """
+        :param str host: The interface to listen on.
+        :param int port: The port to listen on, 0 for any free port.
+        :param int failures: The number of requests failed first.
+        :param int failure_status: The status of the failed requests.
+        :param retry_after: The Retry-After header of the failed
+                        requests, if any.
+        """
+        self.host = host
+        self.port = port
+        self.failures = failures
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % (self.host, self.port)
+
+    @staticmethod
+    def candle(time, seconds):
+        """
+        Returns the candle starting at a time, in epoch seconds.
+        """
+        step = time // seconds
+        price = 1.1 + (step % 100) * 0.0001
+        return {
+            'time': pd.Timestamp(time, unit='s', tz='UTC').strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'openMid': round(price, 5),
+            'highMid': round(price + 0.0002, 5),
+            'lowMid': round(price - 0.0001, 5),
+            'closeMid': round(price + 0.0001, 5),
+            'volume': int(step % 50 + 1),
+            'complete': True
+        }
+
+    def _respond(self, handler):
+        url = urlsplit(handler.path)
+        params = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+        with self.lock:
+            self.requests.append(params)
+            self.connections.add(handler.client_address)
+            failed = len(self.requests) <= self.failures
+        headers = {}
+        if failed:
+            status, body = self.failure_status, {'code': 0, 'message': 'Mock failure'}
+            if self.retry_after is not None:
+                headers['Retry-After'] = str(self.retry_after)
+        elif url.path != '/v1/candles':
+            status, body = 404, {'code': 0, 'message': 'Not found'}
+        else:
+            seconds = self.SECONDS[params['granularity']]
+            start = pd.Timestamp(params['start']).value // 10 ** 9
+            end = pd.Timestamp(params['end']).value // 10 ** 9
+            first = -(-start // seconds) * seconds
+            times = range(first, end, seconds)
+            if len(times) > 5000:
+                status, body = 400, {
+                    'code': 36, 'message': "Maximum value for 'count' exceeded"
+                }
+            else:
+                status, body = 200, {
+                    'instrument': params['instrument'],
+                    'granularity': params['granularity'],
+                    'candles': [self.candle(time, seconds) for time in times]
+                }
+        content = json.dumps(body).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def start(self):
+        """
+        Starts the server in a background thread and returns the
+        port it is listening on.
+        """
+        mock = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                mock._respond(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        )
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        """
+        Stops the server.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
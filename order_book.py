@@ -0,0 +1,248 @@
+import heapq
+from collections import deque
+
+
+class RestingOrder(object):
+    """
+    A limit or stop OrderEvent resting in an OrderBook, along with
+    the quantity still to be filled.
+    """
+
+    __slots__ = ('order', 'remaining', 'cancelled')
+
+    def __init__(self, order):
+        self.order = order
+        self.remaining = order.quantity
+        self.cancelled = False
+
+
+class PriceLevels(object):
+    """
+    PriceLevels holds resting orders grouped by price, each level
+    being a FIFO queue (time priority). The prices of the levels are
+    kept in a heap ordered from the first price to be triggered, so
+    that finding whether any order is triggered is O(1) and adding a
+    level is O(log n), whatever the number of resting orders.
+
+    :param bool descending: True if the highest price is the first
+                    one to be triggered, e.g. buy limit orders.
+    """
+
+    def __init__(self, descending):
+        self.descending = descending
+        self.heap = []
+        self.levels = {}
+
+    def __len__(self):
+        return len(self.levels)
+
+    def add(self, price, resting):
+        """
+        Appends a resting order at the back of its price level.
+        """
+        level = self.levels.get(price)
+        if level is None:
+            level = self.levels[price] = deque()
+            heapq.heappush(self.heap, -price if self.descending else price)
+        level.append(resting)
+
+    def best(self):
+        """
+        Returns the price of the first level to be triggered,
+        or None if there are no resting orders.
+        """
+        if not self.heap:
+            return None
+        key = self.heap[0]
+        return -key if self.descending else key
+
+    def best_level(self):
+        """
+        Returns the FIFO queue of the first level to be triggered.
+        """
+        return self.levels[self.best()]
+
+    def pop_best(self):
+        """
+        Removes the first level to be triggered, once empty.
+        """
+        key = heapq.heappop(self.heap)
+        del self.levels[-key if self.descending else key]
+
+
+class OrderBook(object):
+    """
+    The OrderBook keeps the resting limit and stop orders of a single
+    ticker and matches them against each new bar or tick.
+
+    Buy limits are triggered from the highest price down and sell
+    limits from the lowest up, while buy stops are triggered from the
+    lowest price up and sell stops from the highest down. Matching
+    only ever visits the triggered levels, plus one check per side.
+
+    All prices are in the integer units of the PriceParser.
+    Cancelled orders are only flagged, and dropped from their level
+    once reached by the matching.
+    """
+
+    def __init__(self):
+        self.buy_limits = PriceLevels(descending=True)
+        self.sell_limits = PriceLevels(descending=False)
+        self.buy_stops = PriceLevels(descending=False)
+        self.sell_stops = PriceLevels(descending=True)
+        self.live = 0
+
+    def __len__(self):
+        """
+        Returns the number of live resting orders, i.e. neither
+        filled nor cancelled.
+        """
+        return self.live
+
+    def _levels(self, order):
+        if order.order_type == 'LMT':
+            return self.buy_limits if order.buy_sell == 'BUY' else self.sell_limits
+        return self.buy_stops if order.buy_sell == 'BUY' else self.sell_stops
+
+    def add_order(self, order, resting=None):
+        """
+        Adds a limit ('LMT') or stop ('STP') order to the book.
+
+        :param order: The OrderEvent, with its price in PriceParser units.
+        :param resting: The RestingOrder of the order, if already
+                    handed out, e.g. while the order was in flight.
+        :return: The RestingOrder, which can be used to cancel it.
+        """
+        if resting is None:
+            resting = RestingOrder(order)
+        self._levels(order).add(order.price, resting)
+        self.live += 1
+        return resting
+
+    def cancel_order(self, resting):
+        """
+        Cancels a resting order of the book.
+
+        :param resting: The RestingOrder returned by add_order().
+        :return: The quantity which was left unfilled.
+        """
+        if not resting.cancelled and resting.remaining:
+            self.live -= 1
+        resting.cancelled = True
+        return resting.remaining
+
+    def split(self, ratio):
+        """
+        Adjusts the resting orders to a split of 'ratio' shares for
+        one: their quantities are multiplied by the ratio (truncated)
+        and their prices divided by it, in time priority within the
+        merged levels. Cancelled orders, and those left without any
+        share, are dropped.
+
+        :param float ratio: The ratio of the split, e.g. 2.0.
+        """
+        for name in ('buy_limits', 'sell_limits', 'buy_stops', 'sell_stops'):
+            old = getattr(self, name)
+            levels = PriceLevels(old.descending)
+            while old.heap:
+                for resting in old.best_level():
+                    if resting.cancelled:
+                        continue
+                    remaining = int(resting.remaining * ratio)
+                    if not remaining:
+                        resting.remaining = 0
+                        self.live -= 1
+                        continue
+                    order = resting.order
+                    order.quantity = int(order.quantity * ratio)
+                    order.price = int(round(order.price / ratio))
+                    resting.remaining = remaining
+                    levels.add(order.price, resting)
+                old.pop_best()
+            setattr(self, name, levels)
+
+    def _match_levels(self, levels, triggered, fill_price, budget, fills):
+        """
+        Fills the resting orders of the triggered levels in price
+        then time priority, within the remaining volume budget.
+        Returns the remaining budget.
+        """
+        while budget != 0:
+            price = levels.best()
+            if price is None or not triggered(price):
+                break
+            level = levels.best_level()
+            while level and budget != 0:
+                resting = level[0]
+                if resting.cancelled:
+                    level.popleft()
+                    continue
+                quantity = resting.remaining
+                if budget is not None:
+                    quantity = min(quantity, budget)
+                    budget -= quantity
+                resting.remaining -= quantity
+                fills.append((resting.order, quantity, fill_price(price)))
+                if resting.remaining == 0:
+                    level.popleft()
+                    self.live -= 1
+            if not level:
+                levels.pop_best()
+        return budget
+
+    def match_bar(self, open_price, high_price, low_price, budget=None):
+        """
+        Matches the resting orders against a bar. Stops are
+        triggered first, then filled at their price or at the open
+        if the bar gapped through it. Limits are filled at their
+        price or at the open if it was better.
+
+        :param open_price: The opening price of the bar.
+        :param high_price: The high price of the bar.
+        :param low_price: The low price of the bar.
+        :param budget: The maximum total quantity which can be
+                    filled on this bar, or None for no cap.
+        :return: A list of (OrderEvent, quantity, fill price) tuples.
+        """
+        fills = []
+        budget = self._match_levels(
+            self.buy_stops, lambda p: high_price >= p,
+            lambda p: max(p, open_price), budget, fills
+        )
+        budget = self._match_levels(
+            self.sell_stops, lambda p: low_price <= p,
+            lambda p: min(p, open_price), budget, fills
+        )
+        budget = self._match_levels(
+            self.buy_limits, lambda p: low_price <= p,
+            lambda p: min(p, open_price), budget, fills
+        )
+        self._match_levels(
+            self.sell_limits, lambda p: high_price >= p,
+            lambda p: max(p, open_price), budget, fills
+        )
+        return fills
+
+    def match_tick(self, bid, ask):
+        """
+        Matches the resting orders against a tick. Buy orders are
+        filled at the ask and sell orders at the bid.
+
+        :param bid: The best bid price of the tick.
+        :param ask: The best ask price of the tick.
+        :return: A list of (OrderEvent, quantity, fill price) tuples.
+        """
+        fills = []
+        self._match_levels(
+            self.buy_stops, lambda p: ask >= p, lambda p: ask, None, fills
+        )
+        self._match_levels(
+            self.sell_stops, lambda p: bid <= p, lambda p: bid, None, fills
+        )
+        self._match_levels(
+            self.buy_limits, lambda p: ask <= p, lambda p: ask, None, fills
+        )
+        self._match_levels(
+            self.sell_limits, lambda p: bid >= p, lambda p: bid, None, fills
+        )
+        return fills
@@ -0,0 +1,209 @@
+import threading
+from collections import deque
+
+from event import EventType, FillEvent, OrderEvent
+from execution import ExecutionHandler
+from price_parser import PriceParser
+
+
+class NettingExecutionHandler(ExecutionHandler):
+    """
+    The NettingExecutionHandler sits between the portfolio and
+    another ExecutionHandler, and nets the market orders of several
+    strategies before they are executed.
+
+    Market orders are held back until flush() is called, i.e. until
+    the end of the current time slice: the events loop flushes once
+    the events queue is empty, hence after every strategy has reacted
+    to the same market event. The orders of each ticker are then:
+
+    * crossed internally, buys against sells, at the current price
+      and without commission, and
+    * netted into a single order for the remaining quantity, which
+      is the only one sent to the wrapped execution handler.
+
+    The fills of the net order are split back, in arrival order of
+    the original orders, into Fill events tagged with the strategy_id
+    of the orders they fill, the commission being shared pro rata.
+    Limit and stop orders cannot be netted and are passed through.
+
+    The allocations of the net orders are guarded by a lock, as the
+    wrapped handler may put its fills from another thread, e.g. the
+    event loop of an AsyncLiveExecutionHandler.
+    """
+
+    def __init__(self, execution_handler, events_queue, price_handler):
+        """
+        Initialises the handler around the wrapped execution handler,
+        whose events are routed through this handler from now on.
+
+        :param execution_handler: The ExecutionHandler executing the
+                        net orders.
+        :param events_queue: The Queue of Event objects.
+        :param price_handler: The PriceHandler providing the price at
+                        which orders are crossed.
+        """
+        self.execution_handler = execution_handler
+        self.execution_handler.events = self
+        self.events = events_queue
+        self.price_handler = price_handler
+
+        self.pending = {}
+        self.allocations = {}
+        self.allocations_lock = threading.Lock()
+        self.net_orders = 0
+        self.orders_received = 0
+        self.orders_sent = 0
+        self.quantity_crossed = 0
+
+    def _cross_price(self, ticker):
+        """
+        Returns the price in dollars at which orders are crossed:
+        the mid with tick data, the last close with bar data.
+        """
+        if self.price_handler.istick():
+            bid, ask = self.price_handler.get_best_bid_ask(ticker)
+            price = (bid + ask) / 2.0
+        else:
+            price = self.price_handler.get_last_close(ticker)
+        return price / float(PriceParser.PRICE_MULTIPLIER)
+
+    def execute_order(self, event):
+        """
+        Holds back market orders until the next flush(), passing
+        limit and stop orders through.
+
+        :param event: Contains an Event object with order information.
+        :return:
+        """
+        if event.type == EventType.ORDER:
+            self.orders_received += 1
+            if event.order_type != 'MKT':
+                self.orders_sent += 1
+                return self.execution_handler.execute_order(event)
+            self.pending.setdefault(event.ticker, []).append(event)
+
+    @staticmethod
+    def _allocate(allocation, quantity):
+        """
+        Consumes 'quantity' from a deque of [strategy_id, remaining]
+        entries in FIFO order, returning (strategy_id, quantity) pairs.
+        """
+        split = []
+        while quantity > 0 and allocation:
+            entry = allocation[0]
+            allocated = min(entry[1], quantity)
+            entry[1] -= allocated
+            quantity -= allocated
+            split.append((entry[0], allocated))
+            if entry[1] == 0:
+                allocation.popleft()
+        return split
+
+    def _net_ticker(self, ticker, orders):
+        buys = deque([o.strategy_id, o.quantity] for o in orders if o.buy_sell == 'BUY')
+        sells = deque([o.strategy_id, o.quantity] for o in orders if o.buy_sell == 'SELL')
+        buy_quantity = sum(entry[1] for entry in buys)
+        sell_quantity = sum(entry[1] for entry in sells)
+
+        crossed = min(buy_quantity, sell_quantity)
+        if crossed > 0:
+            self.quantity_crossed += crossed
+            price = self._cross_price(ticker)
+            timeindex = self.price_handler.get_last_timestamp(ticker)
+            for buy_sell, allocation in (('BUY', buys), ('SELL', sells)):
+                for strategy_id, quantity in self._allocate(allocation, crossed):
+                    self.events.put(FillEvent(
+                        timeindex, ticker, 'INTERNAL', quantity, buy_sell,
+                        price, 0.0, strategy_id
+                    ))
+
+        net_quantity = buy_quantity - sell_quantity
+        if net_quantity == 0:
+            return
+        buy_sell, allocation = ('BUY', buys) if net_quantity > 0 else ('SELL', sells)
+        self.net_orders += 1
+        net_id = ('net', self.net_orders)
+        with self.allocations_lock:
+            self.allocations[net_id] = allocation
+        self.orders_sent += 1
+        self.execution_handler.execute_order(
+            OrderEvent(ticker, buy_sell, abs(net_quantity), 'MKT', strategy_id=net_id)
+        )
+
+    def flush(self):
+        """
+        Crosses and nets the market orders held back since the last
+        flush, sending one net order per ticker at most.
+        :return:
+        """
+        pending, self.pending = self.pending, {}
+        for ticker, orders in pending.items():
+            self._net_ticker(ticker, orders)
+        self.execution_handler.flush()
+
+    def put(self, event):
+        """
+        Receives the events of the wrapped execution handler, splitting
+        the fills of net orders back to the originating strategies.
+
+        :param event: The event placed by the wrapped handler.
+        :return:
+        """
+        split = None
+        if event.type == EventType.FILL:
+            with self.allocations_lock:
+                allocation = self.allocations.get(event.strategy_id)
+                if allocation is not None:
+                    split = self._allocate(allocation, event.quantity)
+                    if not allocation:
+                        del self.allocations[event.strategy_id]
+        if split is None:
+            self.events.put(event)
+            return
+
+        for strategy_id, quantity in split:
+            commission = event.commission * quantity / float(event.quantity)
+            self.events.put(FillEvent(
+                event.timeindex, event.symbol, event.exchange, quantity,
+                event.direction, event.fill_cost, commission, strategy_id
+            ))
+
+    def update_market(self, event):
+        self.execution_handler.update_market(event)
+
+    def get_state(self):
+        """
+        Returns the state of the wrapped handler along with the
+        orders held back and the allocations of the net orders.
+        :return:
+        """
+        with self.allocations_lock:
+            allocations = dict(
+                (net_id, deque([list(entry) for entry in allocation]))
+                for net_id, allocation in self.allocations.items()
+            )
+        return {
+            'execution_handler': self.execution_handler.get_state(),
+            'pending': self.pending,
+            'allocations': allocations,
+            'net_orders': self.net_orders,
+            'orders_received': self.orders_received,
+            'orders_sent': self.orders_sent,
+            'quantity_crossed': self.quantity_crossed
+        }
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state().
+        :param state:
+        :return:
+        """
+        self.execution_handler.set_state(state['execution_handler'])
+        self.pending = state['pending']
+        with self.allocations_lock:
+            self.allocations = state['allocations']
+        self.net_orders = state['net_orders']
+        self.orders_received = state['orders_received']
+        self.orders_sent = state['orders_sent']
+        self.quantity_crossed = state['quantity_crossed']
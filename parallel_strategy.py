@@ -0,0 +1,363 @@
+import multiprocessing
+import os
+import queue
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from event import BarEvent, EventType, TickEvent
+from strategy import Strategies, StrategyQueue, queue_attributes
+
+
+MARKET_RECORD = np.dtype([
+    ('type', np.int8),
+    ('ticker', 'S32'),
+    ('time', np.int64),
+    ('tz', np.int8),
+    ('period', np.int64),
+    ('open', np.int64),
+    ('high', np.int64),
+    ('low', np.int64),
+    ('close', np.int64),
+    ('adj_close', np.int64),
+    ('volume', np.int64),
+])
+
+NO_TIME, NAIVE_TIME, UTC_TIME = 0, 1, 2
+
+# The adjusted close of a bar without one
+NO_PRICE = np.iinfo(np.int64).min
+
+
+class MarketDataRing(object):
+    """
+    MarketDataRing is a ring buffer of Bar and Tick events held in
+    shared memory, as fixed-size records of integer fields (prices
+    being in PriceParser units). The process creating the ring
+    publishes each event once, and any process attached to the ring
+    by name reads it back by sequence number, without pickling.
+
+    Timestamps are kept as UTC nanoseconds, and are read back as
+    naive or UTC pandas Timestamps. A missing adjusted close is kept
+    as NO_PRICE, and read back as None.
+    """
+
+    def __init__(self, capacity=1024, name=None):
+        """
+        Creates a ring of 'capacity' records, or attaches to the
+        ring created under 'name'.
+
+        :param int capacity: The number of records of the ring.
+        :param str name: The name of an existing ring to attach to.
+        """
+        self.capacity = capacity
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=capacity * MARKET_RECORD.itemsize
+            )
+        else:
+            # Worker processes share the resource tracker of their
+            # parent, so that only the creating process unlinks it
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.records = np.ndarray(
+            (capacity,), dtype=MARKET_RECORD, buffer=self.shm.buf
+        )
+        self.sequence = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, event):
+        """
+        Writes a Bar or Tick event into the next record of the ring.
+
+        :param event: The BarEvent or TickEvent.
+        :return: The sequence number of the record.
+        """
+        ticker = event.ticker.encode('utf-8')
+        if len(ticker) > MARKET_RECORD['ticker'].itemsize:
+            raise ValueError("Ticker %s is too long for the ring." % event.ticker)
+        sequence = self.sequence
+        record = self.records[sequence % self.capacity]
+        record['ticker'] = ticker
+        if event.time is None:
+            record['tz'] = NO_TIME
+        else:
+            time = pd.Timestamp(event.time)
+            record['time'] = time.value
+            record['tz'] = NAIVE_TIME if time.tzinfo is None else UTC_TIME
+        if event.type == EventType.BAR:
+            record['type'] = 0
+            record['period'] = event.period
+            record['open'] = event.open_price
+            record['high'] = event.high_price
+            record['low'] = event.low_price
+            record['close'] = event.close_price
+            record['adj_close'] = (
+                NO_PRICE if event.adj_close_price is None
+                else event.adj_close_price
+            )
+            record['volume'] = event.volume
+        else:
+            record['type'] = 1
+            record['low'] = event.bid
+            record['high'] = event.ask
+        self.sequence += 1
+        return sequence
+
+    def read(self, sequence):
+        """
+        Reads the event published under a sequence number back.
+
+        :param int sequence: The sequence number of the record.
+        :return: The BarEvent or TickEvent.
+        """
+        record = self.records[sequence % self.capacity]
+        ticker = record['ticker'].decode('utf-8')
+        time = None
+        if record['tz'] != NO_TIME:
+            time = pd.Timestamp(int(record['time']))
+            if record['tz'] == UTC_TIME:
+                time = time.tz_localize('UTC')
+        if record['type'] == 0:
+            adj_close = int(record['adj_close'])
+            return BarEvent(
+                ticker, time, int(record['period']), int(record['open']),
+                int(record['high']), int(record['low']), int(record['close']),
+                int(record['volume']), None if adj_close == NO_PRICE else adj_close
+            )
+        return TickEvent(ticker, time, int(record['low']), int(record['high']))
+
+    def close(self):
+        """
+        Detaches from the ring, and frees it in the creating process.
+        """
+        del self.records
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _run_worker(connection, ring_name, capacity, positions, strategies, strategy_queues):
+    """
+    The loop of a worker process, calling its strategies for the
+    events published in the ring and sending back their signals.
+    """
+    ring = MarketDataRing(capacity, ring_name)
+    local_events = queue.Queue()
+    # The signals are tagged as in the collection of the parent
+    for strategy, (attributes, strategy_id) in zip(strategies, strategy_queues):
+        for attribute in attributes:
+            setattr(strategy, attribute, StrategyQueue(local_events, strategy_id))
+    collection = Strategies(*strategies)
+    position_of = dict(
+        (id(strategy), position)
+        for strategy, position in zip(strategies, positions)
+    )
+    try:
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            command, argument = message
+            try:
+                if command in ('event', 'message'):
+                    # Market events are read from the ring, the other
+                    # events (e.g. sentiment) are sent over the pipe
+                    event = ring.read(argument) if command == 'event' else argument
+                    ticker = getattr(event, 'ticker', None)
+                    route = collection._routes.get((event.type, ticker))
+                    if route is None:
+                        route = collection._route(event.type, ticker)
+                    signals = []
+                    for strategy in route:
+                        strategy.calculate_signals(event)
+                        while not local_events.empty():
+                            signals.append((position_of[id(strategy)], local_events.get()))
+                    connection.send(('ok', signals))
+                elif command == 'get_state':
+                    connection.send(('ok', collection.get_state()))
+                elif command == 'set_state':
+                    collection.set_state(argument)
+                    connection.send(('ok', None))
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+    finally:
+        ring.close()
+        connection.close()
+
+
+class ProcessStrategies(Strategies):
+    """
+    ProcessStrategies runs the strategies of a collection in worker
+    processes, so that CPU-bound strategies are not limited to a
+    single core.
+
+    Each Bar or Tick event is published once into a MarketDataRing
+    and only its sequence number is sent to the workers whose
+    strategies are subscribed to it, the other events (e.g. a
+    SentimentEvent) being pickled to them over their pipes. The
+    workers call their strategies concurrently and send back the
+    signals they generated, tagged with the position of each
+    strategy in the collection. The signals are then put onto the events queue in
+    collection order, exactly as a Strategies collection would in
+    a single process, so that both produce the same results.
+
+    The strategies are copied into the workers: their state is read
+    back into the original objects by get_state() and by close(),
+    which must be called to stop the workers.
+    """
+
+    def __init__(
+            self, events_queue, strategies, processes=None,
+            capacity=1024, start_method=None
+    ):
+        """
+        Initialises the collection, without starting the workers.
+
+        :param events_queue: The Queue of Event objects, which the
+                        strategies put their signals onto.
+        :param strategies: The list of Strategy objects.
+        :param int processes: The number of worker processes, by
+                        default the number of CPUs.
+        :param int capacity: The number of records of the ring.
+        :param str start_method: The multiprocessing start method,
+                        by default the platform default.
+        """
+        super(ProcessStrategies, self).__init__(*strategies)
+        self.events_queue = events_queue
+        self.processes = min(
+            processes or os.cpu_count() or 1, max(1, len(strategies))
+        )
+        self.capacity = capacity
+        self.start_method = start_method
+        self.ring = None
+        self.workers = []
+        self.connections = []
+        self.worker_of = {}
+
+    def start(self):
+        """
+        Creates the ring and starts the worker processes, the
+        strategies being dealt round-robin across the workers.
+        """
+        context = multiprocessing.get_context(self.start_method)
+        self.ring = MarketDataRing(self.capacity)
+        strategy_queues = []
+        for strategy in self._lst_strategies:
+            attributes = queue_attributes(strategy)
+            strategy_queues.append((attributes, [getattr(strategy, k) for k in attributes]))
+            # Queues cannot be sent to the workers, which use their own
+            for attribute in attributes:
+                setattr(strategy, attribute, None)
+        try:
+            for worker in range(self.processes):
+                positions = list(range(worker, len(self._lst_strategies), self.processes))
+                for position in positions:
+                    self.worker_of[id(self._lst_strategies[position])] = worker
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=_run_worker, daemon=True, args=(
+                        child, self.ring.name, self.capacity, positions,
+                        [self._lst_strategies[p] for p in positions],
+                        [(strategy_queues[p][0], self._strategy_ids[p]) for p in positions]
+                    )
+                )
+                process.start()
+                child.close()
+                self.workers.append(process)
+                self.connections.append(parent)
+        finally:
+            for strategy, (attributes, queues) in zip(self._lst_strategies, strategy_queues):
+                for attribute, events_queue in zip(attributes, queues):
+                    setattr(strategy, attribute, events_queue)
+
+    def _request(self, workers, command, argument=None):
+        """
+        Sends a command to some workers and returns their replies,
+        raising the exception of a failed worker.
+        """
+        for worker in workers:
+            self.connections[worker].send((command, argument))
+        replies = []
+        for worker in workers:
+            status, reply = self.connections[worker].recv()
+            if status == 'error':
+                raise RuntimeError("Strategy worker %d failed:\n%s" % (worker, reply))
+            replies.append(reply)
+        return replies
+
+    def calculate_signals(self, event):
+        if self.ring is None:
+            self.start()
+        ticker = getattr(event, 'ticker', None)
+        route = self._routes.get((event.type, ticker))
+        if route is None:
+            route = self._route(event.type, ticker)
+        if not route:
+            return
+        workers = sorted(set(self.worker_of[id(strategy)] for strategy in route))
+        if event.type in (EventType.BAR, EventType.TICK):
+            command, argument = 'event', self.ring.publish(event)
+        else:
+            command, argument = 'message', event
+        signals = []
+        for reply in self._request(workers, command, argument):
+            signals.extend(reply)
+        # Stable sort: the signals of a strategy keep their order
+        signals.sort(key=lambda signal: signal[0])
+        for _, signal in signals:
+            self.events_queue.put(signal)
+
+    def _worker_positions(self, worker):
+        return range(worker, len(self._lst_strategies), self.processes)
+
+    def get_state(self):
+        """
+        Returns the states of the strategies in collection order,
+        read from the workers if they are running.
+        :return:
+        """
+        if self.ring is not None:
+            workers = list(range(self.processes))
+            for worker, states in zip(workers, self._request(workers, 'get_state')):
+                for position, state in zip(self._worker_positions(worker), states):
+                    self._lst_strategies[position].set_state(state)
+        return super(ProcessStrategies, self).get_state()
+
+    def set_state(self, state):
+        """
+        Restores the states returned by get_state(), into the
+        workers if they are running.
+        :param state:
+        :return:
+        """
+        super(ProcessStrategies, self).set_state(state)
+        if self.ring is not None:
+            for worker in range(self.processes):
+                self._request([worker], 'set_state', [
+                    state[position] for position in self._worker_positions(worker)
+                ])
+
+    def close(self):
+        """
+        Reads the final states of the strategies back, then stops
+        the workers and frees the ring.
+        """
+        if self.ring is None:
+            return
+        self.get_state()
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.workers:
+            process.join()
+        self.ring.close()
+        self.ring = None
+        self.workers = []
+        self.connections = []
+        self.worker_of = {}
@@ -6,7 +6,11 @@ import queue
 from abc import ABCMeta, abstractmethod
 from math import floor
 
-from event import FillEvent, OrderEvent
+from event import EventType, FillEvent, OrderEvent
+from price_parser import PriceParser
+from position_sizer.fixed import FixedPositionSizer
+from risk_manager.base import NaiveRiskManager
+from symbols import SYMBOLS, SymbolArray
 
 class Portfolio(object):
     """
@@ -37,15 +41,45 @@ class Portfolio(object):
         """
         raise NotImplementedError("Should implement update_fill()")
 
+    def update_corporate_action(self, event):
+        """
+        Adjusts the portfolio for a CorporateActionEvent, when the
+        price handler streams the actions instead of adjusting the
+        prices.
+        :param event:
+        :return:
+        """
+        raise NotImplementedError("Should implement update_corporate_action()")
+
 class NaivePortfolio(Portfolio):
     """
     The NaivePortfolio object is designed to send orders to
     a brokerage object with a constant quantity size blindly,
     i.e. without any risk management or position sizing. It is
     used to test simpler strategies such as BuyAndHoldStrategy.
+
+    Sizing and risk checks can be plugged in through a
+    PositionSizer and a RiskManager, which every order goes
+    through between the SignalEvent and the events queue.
+
+    With a ResultWriter, the positions and holdings records along
+    with the signals, orders and fills are streamed to it instead
+    of being kept in the positions and holdings matrices, and the
+    equity curve is read back from it.
+
+    The positions and the marked prices are also kept in arrays
+    indexed by the symbol ids of the tickers, so that the records
+    are valued with array operations whatever the universe size.
     """
 
-    def __init__(self, bars, events, start_date, initial_capital=100000.0):
+    # Derived from the symbol ids interned in the process, left out
+    # of the cache keys of the results
+    unkeyed_attributes = ('symbol_ids', 'positions', 'marks')
+
+    def __init__(
+            self, bars, events, start_date, initial_capital=100000.0,
+            position_sizer=None, risk_manager=None, result_writer=None
+    ):
         """
         Initialises the portfolio with bars and an event queue.
         Also includes a starting datetime index and initial capital
@@ -55,18 +89,34 @@ class NaivePortfolio(Portfolio):
         :param events: The Event Queue object.
         :param start_date: The start date (bar) of the portfolio.
         :param initial_capital: The starting  capital in USD.
+        :param position_sizer: The PositionSizer sizing the orders,
+                        a FixedPositionSizer by default.
+        :param risk_manager: The RiskManager checking the orders,
+                        a NaiveRiskManager by default.
+        :param result_writer: An optional ResultWriter the results
+                        are streamed to.
         """
         self.bars = bars
         self.events = events
         self.symbol_list = self.bars.symbol_list
         self.start_date = start_date
         self.initial_capital = initial_capital
+        self.position_sizer = position_sizer or FixedPositionSizer()
+        self.risk_manager = risk_manager or NaiveRiskManager()
+        self.result_writer = result_writer
 
         self.all_positions = self.construct_all_positions()
         self.current_positions = dict((k, v) for k, v in [(s, 0) for s in self.symbol_list])
 
         self.all_holdings = self.construct_all_holdings()
         self.current_holdings = self.construct_current_holdings()
+        self.current_time = None
+        self.symbol_ids = SYMBOLS.ids(self.symbol_list)
+        self.positions = SymbolArray(np.int64, 0)
+        self.marks = SymbolArray()
+        if self.result_writer is not None:
+            self.result_writer.write('positions', self.all_positions[0])
+            self.result_writer.write('holdings', self.all_holdings[0])
 
     def construct_all_positions(self):
         """
@@ -91,45 +141,111 @@ class NaivePortfolio(Portfolio):
         d['total'] = self.initial_capital
         return [d]
 
+    def construct_current_holdings(self):
+        """
+        Constructs the dictionary which will hold the instantaneous
+        value of the portfolio across all symbols.
+        :return:
+        """
+        d = dict((k, v) for k, v in [(s, 0.0) for s in self.symbol_list])
+        d['cash'] = self.initial_capital
+        d['commission'] = 0.0
+        d['total'] = self.initial_capital
+        return d
+
+    def latest_price(self, ticker):
+        """
+        Returns the latest price of a ticker in dollars from the
+        price handler. Tick handlers are priced at mid, bar
+        handlers at the last close.
+
+        :param ticker: The ticker symbol, e.g. 'GOOG'.
+        :return: The price as a float, or None if unavailable.
+        """
+        if self.bars.istick():
+            bid, ask = self.bars.get_best_bid_ask(ticker)
+            if bid is None or ask is None:
+                return None
+            price = (bid + ask) / 2.0
+        else:
+            price = self.bars.get_last_close(ticker)
+            if price is None:
+                return None
+        return price / float(PriceParser.PRICE_MULTIPLIER)
+
     def update_timeindex(self, event):
         """
         Adds a new record to the positions matrix for the current
         market data bar. This reflects the PREVIOUS bar, i.e. all
         current market data at this stage is known (OLHCVI).
 
+        As price handlers stream one event per ticker, the record
+        of a timestamp is only appended once an event with a later
+        timestamp arrives, i.e. once every ticker has been updated.
+        The record is valued at the prices marked up to its own
+        timestamp, the price of the later event being marked after.
+
         Makes use of a MarketEvent from the events queue.
         :param event:
         :return:
         """
-        bars = {}
-        for sym in self.symbol_list:
-            bars[sym] = self.bars.get_latest_bars(sym, N=1)
+        price = None
+        last_prices = getattr(self.bars, 'last_prices', None)
+        if last_prices is not None:
+            price = float(last_prices[event.symbol_id])
+        if price is None or price != price:
+            price = self.latest_price(event.ticker)
+        if price is not None:
+            self.risk_manager.update_price(event.ticker, price)
+
+        if event.time != self.current_time:
+            if self.current_time is not None:
+                self.append_current_records()
+            self.current_time = event.time
+        if price is not None:
+            self.marks[event.symbol_id] = price
+
+    def append_current_records(self):
+        """
+        Appends the current positions and holdings, valued at the
+        marked prices, to the positions and holdings matrices.
+        :return:
+        """
+        positions = self.positions[self.symbol_ids]
+        marks = self.marks[self.symbol_ids]
 
         # Update positions
-        dp = dict((k, v) for k, v in [(s, 0) for s in self.symbol_list])
-        dp['datetime'] = bars[self.symbol_list[0]][0][1]
-
-        for s in self.symbol_list:
-            dp[s] = self.current_positions[s]
+        dp = dict(zip(self.symbol_list, positions.tolist()))
+        dp['datetime'] = self.current_time
 
         # Append the current positions
-        self.all_positions.append(dp)
-
-        # Update holdings
-        dh = dict((k, v) for k, v in [(s, 0) for s in self.symbol_list])
-        dh['datetime'] = bars[self.symbol_list[0]][0][1]
+        if self.result_writer is not None:
+            self.result_writer.write('positions', dp)
+        else:
+            self.all_positions.append(dp)
+
+        # Update holdings, valued at the marked prices as an
+        # approximation to the real value (0 until a price is marked)
+        unmarked = np.isnan(marks)
+        market_values = np.where(unmarked, 0.0, positions * marks).tolist()
+        dh = dict(zip(self.symbol_list, market_values))
+        for i in np.flatnonzero(unmarked):
+            dh[self.symbol_list[i]] = 0
+        dh['datetime'] = self.current_time
         dh['cash'] = self.current_holdings['cash']
         dh['commission'] = self.current_holdings['commission']
-        dh['total'] = self.current_holdings['cash']
 
-        for s in self.symbol_list:
-            # Approximation to the real value
-            market_value = self.current_positions[s]*bars[s][0][5]
-            dh[s] = market_value
-            dh['total'] += market_value
+        # Summed in order, as floating-point additions
+        total = self.current_holdings['cash']
+        for market_value in market_values:
+            total += market_value
+        dh['total'] = total
 
         # Append the current holdings
-        self.all_holdings.append(dh)
+        if self.result_writer is not None:
+            self.result_writer.write('holdings', dh)
+        else:
+            self.all_holdings.append(dh)
 
     def update_positions_from_fill(self, fill):
         """
@@ -147,7 +263,8 @@ class NaivePortfolio(Portfolio):
             fill_dir = -1
 
         # Updates positions list with new quantities
-        self.current_positions[fill.symbol] += fill_dir*fill_quantity
+        self.current_positions[fill.symbol] += fill_dir*fill.quantity
+        self.positions[fill.symbol_id] = self.current_positions[fill.symbol]
 
     def update_holdings_from_fill(self, fill):
         """
@@ -165,12 +282,11 @@ class NaivePortfolio(Portfolio):
             fill_dir = -1
 
         # Update holdings list with new quantities
-        fill_cost = self.bars.get_latest_bars(fill.symbol)[0][5] # Close price
-        cost = fill_dir * fill_cost * fill.quantity
+        cost = fill_dir * fill.fill_cost * fill.quantity
         self.current_holdings[fill.symbol] += cost
         self.current_holdings['commission'] += fill.commission
         self.current_holdings['cash'] -= (cost + fill.commission)
-        self.current_holdings['total'] -= (cost + fill.commission)
+        self.current_holdings['total'] -= fill.commission
 
     def update_fill(self, event):
         """
@@ -179,58 +295,170 @@ class NaivePortfolio(Portfolio):
         :param event:
         :return:
         """
-        if event.type == 'FILL':
+        if event.type == EventType.FILL:
             self.update_positions_from_fill(event)
             self.update_holdings_from_fill(event)
+            self.risk_manager.update_fill(event)
+            if self.result_writer is not None:
+                self.result_writer.write_fill(self.current_time, event)
+
+    def update_corporate_action(self, event):
+        """
+        Adjusts the position of the ticker of a split, by its ratio,
+        the fraction of a share left being paid in cash at the
+        marked price, or credits (debits for short positions) the
+        cash amount of a dividend.
+
+        The records of the previous timestamp are appended first,
+        so that they are valued with the shares held before the
+        ex-date. The RiskManager adjusts its own units.
+        :param event:
+        :return:
+        """
+        if event.type != EventType.CORPORATE_ACTION:
+            return
+        # Never moves the time backwards, e.g. for a late action
+        if self.current_time is None or event.time > self.current_time:
+            if self.current_time is not None:
+                self.append_current_records()
+            self.current_time = event.time
+
+        self.risk_manager.update_corporate_action(event)
+        quantity = self.current_positions.get(event.ticker, 0)
+        if not quantity:
+            return
+        if event.action == 'split':
+            split = quantity * event.value
+            shares = int(split)
+            price = self.marks[event.symbol_id]
+            if split != shares and price == price:
+                cash = (split - shares) * price / event.value
+                self.current_holdings['cash'] += cash
+                self.current_holdings[event.ticker] -= cash
+            self.current_positions[event.ticker] = shares
+            self.positions[event.symbol_id] = shares
+        elif event.action == 'dividend':
+            amount = quantity * event.value
+            self.current_holdings['cash'] += amount
+            self.current_holdings['total'] += amount
 
     def generate_naive_order(self, signal):
         """
         Simply transacts an OrderEvent object as a constant quantity
         sizing of the signal object, without risk mangement or
         position sizing considerations.
+
+        The quantity is left to the suggested quantity of the signal,
+        if any, and finalised by the PositionSizer.
         :param signal: The SignalEvent signal information
         :return:
         """
         order = None
 
-        symbol = signal.symbol
-        direction = signal.signal_type
-        strength  = signal.strength
+        ticker = signal.ticker
+        direction = signal.buy_sell.upper()
+        quantity = signal.suggested_quantity
 
-        mkt_quantity = floor(100*strength)
-        cur_quantity = self.current_positions[symbol]
-        order_type = 'MKT'
+        cur_quantity = self.current_positions.get(ticker, 0)
+        order_type = signal.order_type
+        price = signal.price
 
-        if direction == 'LONG' and cur_quantity == 0:
-            order = OrderEvent(symbol, order_type, mkt_quantity, 'BUY')
-        if direction == 'SHORT' and cur_quantity == 0:
-            order = OrderEvent(symbol, order_type, mkt_quantity, 'SELL')
+        if direction in ('BUY', 'BOT', 'LONG') and cur_quantity == 0:
+            order = OrderEvent(ticker, 'BUY', quantity, order_type, price)
+        if direction in ('SELL', 'SLD', 'SHORT') and cur_quantity == 0:
+            order = OrderEvent(ticker, 'SELL', quantity, order_type, price)
 
         if direction == 'EXIT' and cur_quantity > 0:
-            order = OrderEvent(symbol, order_type, abs(cur_quantity), 'SELL')
+            order = OrderEvent(ticker, 'SELL', abs(cur_quantity), order_type, price)
         if direction == 'EXIT' and cur_quantity < 0:
-            order = OrderEvent(symbol, order_type, abs(cur_quantity), 'BUY')
+            order = OrderEvent(ticker, 'BUY', abs(cur_quantity), order_type, price)
+
+        if order is not None:
+            order.strategy_id = signal.strategy_id
         return order
 
     def update_signal(self, event):
         """
         Acts on a SignalEvent to generate new orders
-        based on the portfolio logic.
+        based on the portfolio logic. The order is sized by
+        the PositionSizer, then refined by the RiskManager
+        into the orders actually placed onto the queue.
         :param event:
         :return:
         """
-        if event.type == 'SIGNAL':
-            order_event = self.generate_naive_order(event)
-            self.events.put(order_event)
+        if event.type == EventType.SIGNAL:
+            if self.result_writer is not None:
+                self.result_writer.write_signal(self.current_time, event)
+            initial_order = self.generate_naive_order(event)
+            if initial_order is None:
+                return
+            sized_order = self.position_sizer.size_order(self, initial_order)
+            for order_event in self.risk_manager.refine_orders(self, sized_order):
+                if self.result_writer is not None:
+                    self.result_writer.write_order(self.current_time, order_event)
+                self.events.put(order_event)
+
+    def get_state(self):
+        """
+        Returns the state of the portfolio needed to resume a
+        session, apart from the positions and holdings matrices
+        which are append-only and checkpointed incrementally. The
+        tables of a ResultWriter are flushed, and their row counts
+        saved.
+        :return:
+        """
+        return {
+            'current_positions': dict(self.current_positions),
+            'current_holdings': dict(self.current_holdings),
+            'current_time': self.current_time,
+            'marks': dict(
+                (s, price) for s, price in
+                zip(self.symbol_list, self.marks[self.symbol_ids].tolist())
+                if price == price
+            ),
+            'position_sizer': self.position_sizer,
+            'risk_manager': self.risk_manager.get_state(),
+            'result_writer': (
+                None if self.result_writer is None else self.result_writer.get_state()
+            )
+        }
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state().
+        :param state:
+        :return:
+        """
+        self.current_positions = dict(state['current_positions'])
+        self.current_holdings = dict(state['current_holdings'])
+        self.current_time = state['current_time']
+        self.positions = SymbolArray(np.int64, 0)
+        for s, quantity in self.current_positions.items():
+            self.positions[SYMBOLS.intern(s)] = quantity
+        self.marks = SymbolArray()
+        for s, price in state['marks'].items():
+            self.marks[SYMBOLS.intern(s)] = price
+        self.position_sizer = state['position_sizer']
+        self.risk_manager.set_state(state['risk_manager'])
+        if self.result_writer is not None and state.get('result_writer') is not None:
+            self.result_writer.set_state(state['result_writer'])
 
     def create_equity_curve_dataframe(self):
         """
         Creates a pandas DataFrame from the all_holdings
-        list of dictionaries.
+        list of dictionaries (or the holdings table of the
+        ResultWriter), once the records of the last timestamp
+        have been appended.
         :return:
         """
-        curve = pd.DataFrame(self.all_holdings)
-        curve.set_index('datetime', inplace=True)
+        if self.current_time is not None:
+            self.append_current_records()
+            self.current_time = None
+        if self.result_writer is not None:
+            curve = self.result_writer.read('holdings')
+        else:
+            curve = pd.DataFrame(self.all_holdings)
+            curve.set_index('datetime', inplace=True)
         curve['returns'] = curve['total'].pct_change()
         curve['equity_curve'] = (1.0+curve['returns']).cumprod()
         self.equity_curve = curve
\ No newline at end of file
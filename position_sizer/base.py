@@ -0,0 +1,26 @@
+from abc import ABCMeta, abstractmethod
+
+
+class AbstractPositionSizer(object):
+    """
+    The AbstractPositionSizer abstract class sizes the initial
+    OrderEvent generated by a Portfolio from a SignalEvent.
+
+    Derived classes modify the quantity of the order in place,
+    using the current state of the portfolio and any suggested
+    quantity carried by the signal, before the order is handed
+    over to the RiskManager.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def size_order(self, portfolio, initial_order):
+        """
+        Sizes an OrderEvent and returns it.
+
+        :param portfolio: The Portfolio object generating the order.
+        :param initial_order: The unsized OrderEvent.
+        :return: The sized OrderEvent.
+        """
+        raise NotImplementedError("Should implement size_order()")
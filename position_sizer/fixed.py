@@ -0,0 +1,32 @@
+from position_sizer.base import AbstractPositionSizer
+
+
+class FixedPositionSizer(AbstractPositionSizer):
+    """
+    The FixedPositionSizer keeps the quantity suggested by the
+    strategy and falls back to a constant quantity otherwise,
+    i.e. without any regard to the value of the portfolio.
+    """
+
+    def __init__(self, default_quantity=100):
+        """
+        Initialises the sizer.
+
+        :param int default_quantity: The quantity used when the
+                        signal did not suggest one.
+        """
+        self.default_quantity = default_quantity
+
+    def size_order(self, portfolio, initial_order):
+        """
+        Applies the default quantity to orders which arrive
+        without one. Exit orders are left untouched, as their
+        quantity is set from the current position.
+
+        :param portfolio: The Portfolio object generating the order.
+        :param initial_order: The unsized OrderEvent.
+        :return: The sized OrderEvent.
+        """
+        if initial_order.quantity is None:
+            initial_order.quantity = self.default_quantity
+        return initial_order
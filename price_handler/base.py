@@ -1,5 +1,8 @@
 from abc import ABCMeta
 
+from price_parser import PriceParser
+from symbols import SymbolArray
+
 
 class AbstractPriceHandler(object):
     """
@@ -17,6 +20,45 @@ class AbstractPriceHandler(object):
 
     __metaclass__ = ABCMeta
 
+    # The latest price in dollars per symbol id, see _store_price()
+    last_prices = None
+
+    # A QuoteBoard the latest prices are published to, if any
+    quote_board = None
+
+    @property
+    def symbol_list(self):
+        """
+        Returns the list of currently subscribed ticker symbols.
+        """
+        return list(self.tickers)
+
+    def get_state(self):
+        """
+        Returns a picklable copy of the latest prices per ticker,
+        used to checkpoint the handler.
+        """
+        return {'tickers': dict((k, dict(v)) for k, v in self.tickers.items())}
+
+    def set_state(self, state):
+        """
+        Restores the latest prices per ticker from get_state().
+        """
+        self.tickers = dict((k, dict(v)) for k, v in state['tickers'].items())
+
+    def _store_price(self, event, price):
+        """
+        Stores the latest price of the ticker of an event, the mid
+        price for ticks and the close for bars, into the
+        'last_prices' array indexed by symbol id, and publishes the
+        event to the quote board if any.
+        """
+        if self.last_prices is None:
+            self.last_prices = SymbolArray()
+        self.last_prices[event.symbol_id] = price / float(PriceParser.PRICE_MULTIPLIER)
+        if self.quote_board is not None:
+            self.quote_board.publish(event)
+
     def unsubscribe_ticker(self, ticker):
         """
         Unsubscribes the price handler from a current ticker symbol.
@@ -60,6 +102,7 @@ class AbstractTickPriceHandler(AbstractPriceHandler):
         self.tickers[ticker]["bid"] = event.bid
         self.tickers[ticker]["ask"] = event.ask
         self.tickers[ticker]["timestamp"] = event.time
+        self._store_price(event, (event.bid + event.ask) / 2.0)
 
     def get_best_bid_ask(self, ticker):
         """
@@ -92,6 +135,7 @@ class AbstractBarPriceHandler(AbstractPriceHandler):
         self.tickers[ticker]["close"] = event.close_price
         self.tickers[ticker]["adj_close"] = event.adj_close_price
         self.tickers[ticker]["timestamp"] = event.time
+        self._store_price(event, event.close_price)
 
     def get_last_close(self, ticker):
         """
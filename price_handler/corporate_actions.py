@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from event import CorporateActionEvent
+
+
+ACTIONS = ('split', 'dividend')
+
+
+def load_corporate_actions(path):
+    """
+    Loads a CSV file of the corporate actions of a ticker, e.g.
+
+        Date,Action,Value
+        2014-06-09,split,7.0
+        2014-08-07,dividend,0.47
+
+    where the value of a split is its ratio (7.0 for a 7-for-1 split,
+    0.5 for a 1-for-2 reverse split) and the value of a dividend its
+    cash amount per share, on their ex-date.
+
+    :param str path: The path of the CSV file.
+    :return: A DataFrame of the actions sorted by date.
+    """
+    actions = pd.read_csv(path, header=0, names=['Date', 'Action', 'Value'])
+    actions['Date'] = pd.to_datetime(actions['Date'])
+    actions['Action'] = actions['Action'].str.strip().str.lower()
+    unknown = set(actions['Action']) - set(ACTIONS)
+    if unknown:
+        raise ValueError('Unknown corporate actions %s in %s' % (sorted(unknown), path))
+    if (actions['Value'] <= 0).any():
+        raise ValueError('Corporate action values must be positive in %s' % path)
+    return actions.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def adjustment_factors(dates, closes, actions):
+    """
+    Returns the cumulative price and volume adjustment factors of
+    every bar, i.e. the products of the factors of the actions with
+    an ex-date after the bar, computed as a reverse cumulative product.
+
+    A split of ratio r has a price factor of 1/r and a volume factor
+    of r, a dividend of d a price factor of 1 - d/c, c being the
+    close before its ex-date. Actions after the last bar adjust every
+    bar, actions before the first bar none.
+
+    :param dates: The sorted DatetimeIndex of the bars.
+    :param closes: The unadjusted closes of the bars.
+    :param actions: The DataFrame of the corporate actions.
+    :return: The price and volume factors as arrays.
+    """
+    n = len(dates)
+    price = np.ones(n)
+    volume = np.ones(n)
+    if len(actions):
+        rows = dates.searchsorted(actions['Date'].values) - 1
+        valid = rows >= 0
+        rows = rows[valid]
+        kinds = actions['Action'].values[valid]
+        values = actions['Value'].values[valid].astype(float)
+        closes = np.asarray(closes, dtype=float)
+        split = kinds == 'split'
+        np.multiply.at(price, rows, np.where(
+            split, 1.0 / values, 1.0 - values / closes[rows]
+        ))
+        np.multiply.at(volume, rows[split], values[split])
+    price = np.cumprod(price[::-1])[::-1]
+    volume = np.cumprod(volume[::-1])[::-1]
+    return price, volume
+
+
+def adjust_ohlcv(bars, actions):
+    """
+    Returns a copy of Yahoo daily bars with the Open, High, Low and
+    Close adjusted for the corporate actions, the Adj Close being
+    the adjusted Close, and the Volume adjusted for the splits,
+    in one vectorized pass over the arrays.
+
+    :param bars: The DataFrame of the bars, indexed by date.
+    :param actions: The DataFrame of the corporate actions.
+    """
+    price, volume = adjustment_factors(bars.index, bars['Close'].values, actions)
+    adjusted = bars.copy()
+    columns = ['Open', 'High', 'Low', 'Close']
+    adjusted[columns] = bars[columns].values * price[:, None]
+    adjusted['Adj Close'] = adjusted['Close']
+    adjusted['Volume'] = np.round(bars['Volume'].values * volume).astype(np.int64)
+    return adjusted
+
+
+class CorporateActions(object):
+    """
+    CorporateActions loads the split and dividend tables of the
+    tickers, one '<ticker>.csv' file per ticker in 'actions_dir'
+    (a ticker without a file having no actions), for a price handler
+    to either adjust the raw OHLCV bars at load time or emit the
+    actions as CorporateActionEvents, so that the portfolio adjusts
+    its share counts and cash instead of the prices.
+
+    Adjusted bars are cached in 'cache_dir', if any, keyed by the
+    path, size and modification time of the bars and actions files,
+    so that later runs skip parsing and adjusting unchanged data.
+    """
+
+    def __init__(self, actions_dir, cache_dir=None):
+        """
+        :param str actions_dir: The directory of the actions files.
+        :param str cache_dir: An optional directory caching the
+                        adjusted bars.
+        """
+        self.actions_dir = actions_dir
+        self.cache_dir = cache_dir
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def path(self, ticker):
+        return os.path.join(self.actions_dir, '%s.csv' % ticker)
+
+    def actions(self, ticker):
+        """
+        Returns the DataFrame of the actions of a ticker.
+        """
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return pd.DataFrame({
+                'Date': pd.DatetimeIndex([]), 'Action': [], 'Value': []
+            })
+        return load_corporate_actions(path)
+
+    def _cache_path(self, ticker, bars_path):
+        files = []
+        for path in (bars_path, self.path(ticker)):
+            try:
+                stat = os.stat(path)
+                files.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+            except OSError:
+                files.append([os.path.abspath(path), None, None])
+        key = hashlib.sha1(json.dumps(files).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, '%s-%s.pkl' % (ticker, key[:16]))
+
+    def adjusted_bars(self, ticker, bars_path, load):
+        """
+        Returns the bars of a ticker adjusted for its actions, from
+        the cache if the files are unchanged.
+
+        :param str ticker: The ticker symbol.
+        :param str bars_path: The path of the file of the bars.
+        :param load: A callable returning the raw bars DataFrame.
+        """
+        cache_path = None
+        if self.cache_dir is not None:
+            cache_path = self._cache_path(ticker, bars_path)
+            if os.path.exists(cache_path):
+                return pd.read_pickle(cache_path)
+        adjusted = adjust_ohlcv(load(), self.actions(ticker))
+        if cache_path is not None:
+            tmp_path = '%s.tmp' % cache_path
+            adjusted.to_pickle(tmp_path)
+            os.replace(tmp_path, cache_path)
+        return adjusted
+
+    def events(self, ticker):
+        """
+        Returns the CorporateActionEvents of a ticker in date order.
+        """
+        return [
+            CorporateActionEvent(ticker, date, action, value)
+            for date, action, value in self.actions(ticker).itertuples(index=False)
+        ]
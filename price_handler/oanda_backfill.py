@@ -0,0 +1,455 @@
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import pandas as pd
+
+from event import BarEvent
+from price_parser import PriceParser
+
+
+# The REST endpoints of the OANDA v1 API, as used by oandapy
+API_URLS = {
+    'sandbox': 'http://api-sandbox.oanda.com',
+    'practice': 'https://api-fxpractice.oanda.com',
+    'live': 'https://api-fxtrade.oanda.com'
+}
+
+# The duration of the candles of each granularity, in seconds
+GRANULARITIES = {
+    'S5': 5, 'S10': 10, 'S15': 15, 'S30': 30,
+    'M1': 60, 'M2': 120, 'M3': 180, 'M4': 240, 'M5': 300,
+    'M10': 600, 'M15': 900, 'M30': 1800,
+    'H1': 3600, 'H2': 7200, 'H3': 10800, 'H4': 14400,
+    'H6': 21600, 'H8': 28800, 'H12': 43200,
+    'D': 86400, 'W': 604800
+}
+
+# The most candles OANDA returns per request
+MAX_CANDLES = 5000
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+class BackfillError(IOError):
+    """
+    Raised when a page of candles cannot be fetched.
+    """
+
+    def __init__(self, message, status=None):
+        super(BackfillError, self).__init__(message)
+        self.status = status
+
+
+def _utc(timestamp):
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize('UTC')
+    return timestamp.tz_convert('UTC')
+
+
+def _rfc3339(timestamp):
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def _empty_candles():
+    return pd.DataFrame(
+        {column: pd.Series(dtype='int64' if column == 'Volume' else 'float64') for column in COLUMNS},
+        index=pd.DatetimeIndex([], tz='UTC', name='Date')
+    )
+
+
+class RateLimiter(object):
+    """
+    A token bucket shared by the threads of a client: at most
+    'burst' requests at once, then 'rate' requests per second.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param float rate: The requests allowed per second.
+        :param int burst: The size of the bucket, by default
+                        one second of requests.
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Waits for a token.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                delay = (1.0 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class ConnectionPool(object):
+    """
+    A pool of keep-alive HTTP(S) connections to a host, each used
+    by one thread at a time, so that concurrent requests reuse the
+    connections instead of opening one each.
+    """
+
+    def __init__(self, url, size=4, timeout=30.0):
+        """
+        :param str url: The base URL of the host.
+        :param int size: The most idle connections kept.
+        :param float timeout: The socket timeout, in seconds.
+        """
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(size)
+        self.opened = 0
+
+    def _connect(self):
+        self.opened += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, params=None, headers=None):
+        """
+        Sends a request over an idle connection, or a new one.
+
+        :return: The status, the headers and the body of the response.
+        """
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        url = self.base_path + path
+        if params:
+            url = '%s?%s' % (url, urlencode(params))
+        try:
+            connection.request(method, url, headers=headers or {})
+            response = connection.getresponse()
+            body = response.read()
+        except Exception:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            try:
+                self.idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        return response.status, dict(response.getheaders()), body
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class OandaCandleBackfill(object):
+    """
+    OandaCandleBackfill fetches the historical midpoint candles of
+    OANDA instruments, e.g. to warm a live strategy up before
+    streaming with the OANDAStreamingPriceHandler.
+
+    A date range is split into pages of at most 'page_size' candles,
+    aligned on multiples of the page duration since the epoch, which
+    are fetched concurrently by 'workers' threads over a pool of
+    keep-alive connections, within a rate limit, retrying the
+    connection errors and the 429 and 5xx responses with an
+    exponential backoff (or as told by a Retry-After header).
+
+    With a 'cache_dir', the pages are cached as one file per page:
+
+        <cache_dir>/<instrument>/<granularity>/<page start>.pkl
+
+    so that a later backfill only requests the pages missing. Pages
+    not over yet are never cached, nor are the candles not complete
+    returned.
+
+    The candles are returned as DataFrames with the columns of the
+    Yahoo daily bars ('Open', 'High', 'Low', 'Close', 'Adj Close',
+    'Volume'), indexed by their UTC start time.
+    """
+
+    def __init__(
+            self, access_token, domain='practice', api_url=None,
+            cache_dir=None, page_size=MAX_CANDLES, workers=4, rate=20.0,
+            max_retries=5, backoff=0.5, timeout=30.0, headers=None
+    ):
+        """
+        :param str access_token: The OANDA API token.
+        :param str domain: 'sandbox', 'practice' or 'live'.
+        :param str api_url: The base URL of the API, overriding the
+                        domain, e.g. that of a local mock server.
+        :param str cache_dir: An optional directory caching the pages.
+        :param int page_size: The most candles requested at once.
+        :param int workers: The number of concurrent requests.
+        :param float rate: The most requests sent per second.
+        :param int max_retries: The retries of a page before failing.
+        :param float backoff: The delay before the first retry, in
+                        seconds, doubled on each retry.
+        :param float timeout: The socket timeout, in seconds.
+        :param dict headers: Extra headers sent with each request.
+        """
+        if not 0 < page_size <= MAX_CANDLES:
+            raise ValueError(
+                'The page size must be between 1 and %d candles.' % MAX_CANDLES
+            )
+        self.page_size = page_size
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache_dir = cache_dir
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self.headers = {
+            'Authorization': 'Bearer %s' % access_token,
+            'Accept-Datetime-Format': 'RFC3339',
+            'Connection': 'keep-alive'
+        }
+        if headers:
+            self.headers.update(headers)
+        self.pool = ConnectionPool(api_url or API_URLS[domain], workers, timeout)
+        self.limiter = RateLimiter(rate)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.cache_hits = 0
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def pages(self, granularity, start, end):
+        """
+        Returns the pages covering a range, as (start, end) pairs of
+        UTC Timestamps, the end being excluded.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError('Not supported granularity %s' % granularity)
+        duration = GRANULARITIES[granularity] * self.page_size * 10 ** 9
+        start, end = _utc(start).value, _utc(end).value
+        first = start // duration * duration
+        return [
+            (pd.Timestamp(page, tz='UTC'), pd.Timestamp(page + duration, tz='UTC'))
+            for page in range(first, end, duration)
+        ]
+
+    def _cache_path(self, instrument, granularity, page_start):
+        return os.path.join(
+            self.cache_dir, instrument, granularity,
+            '%s.pkl' % page_start.strftime('%Y%m%dT%H%M%S')
+        )
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _get(self, params):
+        """
+        Requests the candles, retrying the transient errors.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            self._count('requests')
+            delay = self.backoff * 2 ** attempt
+            try:
+                status, headers, body = self.pool.request(
+                    'GET', '/v1/candles', params, self.headers
+                )
+            except (OSError, http.client.HTTPException) as e:
+                error = BackfillError('Request of %s failed: %s' % (params['instrument'], e))
+            else:
+                if status == 200:
+                    return json.loads(body.decode('utf-8'))
+                error = BackfillError(
+                    'Request of %s failed with status %d: %s' % (
+                        params['instrument'], status, body.decode('utf-8', 'replace')
+                    ), status
+                )
+                if status not in RETRY_STATUSES:
+                    raise error
+                if 'Retry-After' in headers:
+                    delay = float(headers['Retry-After'])
+            if attempt < self.max_retries:
+                self._count('retries')
+                time.sleep(delay)
+        raise error
+
+    def _fetch(self, instrument, granularity, page_start, page_end):
+        """
+        Fetches the complete candles of a page, as a DataFrame.
+        """
+        now = pd.Timestamp.now(tz='UTC')
+        data = self._get({
+            'instrument': instrument,
+            'granularity': granularity,
+            'start': _rfc3339(page_start),
+            'end': _rfc3339(min(page_end, now)),
+            'candleFormat': 'midpoint',
+            'includeFirst': 'true'
+        })
+        candles = [
+            candle for candle in data.get('candles', [])
+            if candle.get('complete', True)
+        ]
+        if not candles:
+            return _empty_candles()
+        index = pd.DatetimeIndex(
+            pd.to_datetime([candle['time'] for candle in candles], utc=True), name='Date'
+        )
+        close = [candle['closeMid'] for candle in candles]
+        bars = pd.DataFrame({
+            'Open': [candle['openMid'] for candle in candles],
+            'High': [candle['highMid'] for candle in candles],
+            'Low': [candle['lowMid'] for candle in candles],
+            'Close': close,
+            'Adj Close': close,
+            'Volume': [int(candle['volume']) for candle in candles]
+        }, index=index)
+        bars = bars[(bars.index >= page_start) & (bars.index < page_end)]
+        return bars[~bars.index.duplicated(keep='last')].sort_index()
+
+    def _page(self, instrument, granularity, page):
+        """
+        Returns the candles of a page, fetching them if not cached.
+        """
+        page_start, page_end = page
+        path = None
+        if self.cache_dir is not None:
+            path = self._cache_path(instrument, granularity, page_start)
+            if os.path.exists(path):
+                self._count('cache_hits')
+                return pd.read_pickle(path)
+        bars = self._fetch(instrument, granularity, page_start, page_end)
+        if path is not None and page_end <= pd.Timestamp.now(tz='UTC'):
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = '%s.%d.tmp' % (path, threading.get_ident())
+            bars.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+        return bars
+
+    def history(self, instruments, granularity, start, end):
+        """
+        Returns the candles of several instruments over a range, the
+        pages of every instrument being fetched concurrently.
+
+        :param list instruments: The instruments, e.g. ['EUR_USD'].
+        :param str granularity: The granularity, e.g. 'M1'.
+        :param start: The start of the range.
+        :param end: The end of the range, excluded.
+        :return: A dict of the DataFrame of candles per instrument.
+        """
+        start, end = _utc(start), _utc(end)
+        pages = self.pages(granularity, start, end)
+        jobs = [(instrument, page) for instrument in instruments for page in pages]
+        with ThreadPoolExecutor(max(1, self.workers)) as executor:
+            results = list(executor.map(
+                lambda job: self._page(job[0], granularity, job[1]), jobs
+            ))
+        history = {}
+        for instrument in instruments:
+            frames = [
+                bars for (name, page), bars in zip(jobs, results)
+                if name == instrument and len(bars)
+            ]
+            bars = pd.concat(frames) if frames else _empty_candles()
+            history[instrument] = bars[(bars.index >= start) & (bars.index < end)]
+        return history
+
+    def candles(self, instrument, granularity, start, end):
+        """
+        Returns the candles of an instrument over a range.
+        """
+        return self.history([instrument], granularity, start, end)[instrument]
+
+    @staticmethod
+    def events(history, granularity):
+        """
+        Returns the BarEvents of candles of several instruments,
+        merged in time order.
+
+        :param dict history: The DataFrame of candles per instrument.
+        :param str granularity: The granularity of the candles.
+        """
+        period = GRANULARITIES[granularity]
+        frames = [
+            bars.assign(Ticker=instrument) for instrument, bars in history.items()
+            if len(bars)
+        ]
+        if not frames:
+            return []
+        merged = pd.concat(frames).sort_index(kind='stable')
+        prices = dict(
+            (column, [PriceParser.parse(price) for price in merged[column].values])
+            for column in ('Open', 'High', 'Low', 'Close', 'Adj Close')
+        )
+        return [
+            BarEvent(
+                ticker, timestamp, period, prices['Open'][i], prices['High'][i],
+                prices['Low'][i], prices['Close'][i], int(volume), prices['Adj Close'][i]
+            )
+            for i, (timestamp, ticker, volume) in enumerate(zip(
+                merged.index, merged['Ticker'].values, merged['Volume'].values
+            ))
+        ]
+
+    def warm_up(
+            self, price_handler, instruments, granularity, start, end,
+            indicators=None
+    ):
+        """
+        Backfills the history of instruments into a price handler:
+        the candles are stored in its 'tickers_data', and the latest
+        prices of a bar price handler set from the bars, which are
+        also streamed through the indicators of a strategy, if any.
+
+        :param price_handler: The PriceHandler.
+        :param list instruments: The instruments to backfill.
+        :param str granularity: The granularity of the candles.
+        :param start: The start of the history.
+        :param end: The end of the history, excluded.
+        :param indicators: Optional TickerIndicators to warm up.
+        :return: The BarEvents of the history, in time order.
+        """
+        history = self.history(instruments, granularity, start, end)
+        for instrument, bars in history.items():
+            price_handler.tickers_data[instrument] = bars
+        events = self.events(history, granularity)
+        isbar = getattr(price_handler, 'isbar', None)
+        store = isbar is not None and isbar()
+        for event in events:
+            if store and event.ticker in price_handler.tickers:
+                price_handler._store_event(event)
+            if indicators is not None:
+                indicators.update(event)
+        return events
@@ -3,6 +3,7 @@ import json
 import oandapy
 from price_parser import PriceParser
 from event import TickEvent
+from symbols import SymbolArray
 
 
 # Extend the exceptions to support extra cases
@@ -35,6 +36,7 @@ class OANDAStreamingPriceHandler(oandapy.Streamer):
     def __init__(
         self, domain, access_token,
         account_id, init_tickers, events_queue, headers=None,
+        quote_board=None
     ):
         # Override to provide headers, which is in the standard API interface
         super().__init__(environment=domain, access_token=access_token)
@@ -50,6 +52,9 @@ class OANDAStreamingPriceHandler(oandapy.Streamer):
             self.tickers[ticker] = {}
         self.events_queue = events_queue
         self.price_event = None
+        self.last_prices = SymbolArray()
+        # A QuoteBoard the ticks are published to, if any
+        self.quote_board = quote_board
 
         #self.rates(account_id=self.account_id, instruments=','.join(self.tickers_lst))
 
@@ -126,6 +131,11 @@ class OANDAStreamingPriceHandler(oandapy.Streamer):
         self.tickers[ticker]['timestamp'] = event.time
         self.tickers[ticker]['bid'] = event.bid
         self.tickers[ticker]['ask'] = event.ask
+        self.last_prices[event.symbol_id] = (
+            (event.bid + event.ask) / 2.0 / float(PriceParser.PRICE_MULTIPLIER)
+        )
+        if self.quote_board is not None:
+            self.quote_board.publish(event)
 
     def stream_next(self):
         if self.price_event is not None:
@@ -133,5 +143,18 @@ class OANDAStreamingPriceHandler(oandapy.Streamer):
             self.events_queue.put(self.price_event)
             self.price_event = None
 
+    def get_state(self):
+        """
+        Returns a picklable copy of the latest bid/ask per ticker,
+        used to checkpoint a live session.
+        """
+        return {'tickers': dict((k, dict(v)) for k, v in self.tickers.items())}
+
+    def set_state(self, state):
+        """
+        Restores the latest bid/ask per ticker from get_state().
+        """
+        self.tickers = dict((k, dict(v)) for k, v in state['tickers'].items())
+
     def on_error(self, data):
         self.disconnect()
\ No newline at end of file
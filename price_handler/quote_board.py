@@ -0,0 +1,295 @@
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import pandas as pd
+
+from event import EventType
+
+
+MAGIC = 0x514254424f415244
+
+# The words of the header
+HEADER_WORDS = 8
+MAGIC_WORD, CAPACITY_WORD, COUNT_WORD, TRACKER_WORD = 0, 1, 2, 3
+
+# The symbol names, as fixed-size byte strings
+NAME_SIZE = 32
+
+# The words of a quote record, padded to a 64 bytes cache line
+RECORD_WORDS = 8
+SEQUENCE, BID, ASK, LAST, TIME, FLAGS = range(6)
+
+# The flags of a quote record
+HAS_BID_ASK, HAS_LAST, NAIVE_TIME, UTC_TIME = 1, 2, 4, 8
+
+
+def _tracker_pid():
+    # The pid of the resource tracker of the process, 0 if unknown
+    return getattr(resource_tracker._resource_tracker, '_pid', None) or 0
+
+
+def _attach(name):
+    """
+    Attaches to a shared memory block without letting the resource
+    tracker of the process unlink it when the process exits.
+    """
+    try:
+        # Python 3.13+
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    words = shm.buf.cast('q')
+    try:
+        shared = words[0] == MAGIC and words[TRACKER_WORD] == _tracker_pid()
+    finally:
+        words.release()
+    # Processes forked from the creating process share its tracker,
+    # whose registration of the block must be kept
+    if not shared:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+class QuoteBoard(object):
+    """
+    QuoteBoard is a table of the latest quote of each symbol held
+    in shared memory, written by the price handlers of one process
+    and read by any local process (a risk monitor, another strategy
+    host, a dashboard) attached to the board by name, without locks,
+    sockets or a stream of its own.
+
+    The layout is fixed: a header of 8 words (magic, capacity, count
+    of symbols, resource tracker of the creating process), the names
+    of the symbols in the order they were added, then a record of 8
+    words per symbol:
+
+        sequence, bid, ask, last, time, flags, (padding)
+
+    the prices being in PriceParser units and the time in UTC
+    nanoseconds, naive or UTC as flagged.
+
+    Records are kept consistent with a seqlock: the writer makes the
+    sequence odd, writes the fields, then makes it even again, and a
+    reader copies the record and retries while the sequence copied
+    is odd or has changed since. CPython performing the loads and
+    stores in program order on aligned 8 bytes words, a reader never
+    sees a torn quote on x86-64, nor blocks the writer.
+
+    Each symbol must be written by a single thread at a time, of any
+    attached process, but only the creating process adds symbols.
+    """
+
+    def __init__(self, capacity=4096, name=None):
+        """
+        Creates a board of 'capacity' symbols, or attaches to the
+        board created under 'name'.
+
+        :param int capacity: The maximum number of symbols.
+        :param str name: The name of an existing board to attach to.
+        """
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=self._size(capacity)
+            )
+        else:
+            self.shm = _attach(name)
+        self.words = self.shm.buf.cast('q')
+        if self.owner:
+            self.words[CAPACITY_WORD] = capacity
+            self.words[COUNT_WORD] = 0
+            self.words[TRACKER_WORD] = _tracker_pid()
+            self.words[MAGIC_WORD] = MAGIC
+        elif self.words[MAGIC_WORD] != MAGIC:
+            self.close()
+            raise ValueError('Shared memory %s is not a quote board.' % name)
+        self.capacity = self.words[CAPACITY_WORD]
+        self.names_offset = HEADER_WORDS * 8
+        self.records = self._records_offset(self.capacity) // 8
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _records_offset(capacity):
+        # Records start on a cache line
+        return (HEADER_WORDS * 8 + capacity * NAME_SIZE + 63) // 64 * 64
+
+    @classmethod
+    def _size(cls, capacity):
+        return cls._records_offset(capacity) + capacity * RECORD_WORDS * 8
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        return self.words[COUNT_WORD]
+
+    def __getstate__(self):
+        return {'name': self.shm.name}
+
+    def __setstate__(self, state):
+        # Only the creating process unlinks the board, see _attach()
+        self.__init__(name=state['name'])
+
+    @property
+    def tickers(self):
+        """
+        Returns the symbols on the board, in the order they were
+        added.
+        """
+        self._refresh()
+        return sorted(self.slots, key=self.slots.get)
+
+    def _name(self, slot):
+        offset = self.names_offset + slot * NAME_SIZE
+        return bytes(self.shm.buf[offset:offset + NAME_SIZE]).rstrip(b'\0').decode('utf-8')
+
+    def _refresh(self):
+        # Learns the symbols added since the last refresh
+        for slot in range(len(self.slots), self.words[COUNT_WORD]):
+            self.slots[self._name(slot)] = slot
+
+    def _slot(self, ticker):
+        slot = self.slots.get(ticker)
+        if slot is None:
+            self._refresh()
+            slot = self.slots.get(ticker)
+        return slot
+
+    def _add(self, ticker):
+        if not self.owner:
+            raise ValueError(
+                'Symbol %s can only be added by the process creating the board.' % ticker
+            )
+        name = ticker.encode('utf-8')
+        if len(name) > NAME_SIZE:
+            raise ValueError('Ticker %s is too long for the quote board.' % ticker)
+        with self.lock:
+            slot = self.slots.get(ticker)
+            if slot is None:
+                slot = self.words[COUNT_WORD]
+                if slot >= self.capacity:
+                    raise ValueError(
+                        'The quote board is full (%d symbols).' % self.capacity
+                    )
+                offset = self.names_offset + slot * NAME_SIZE
+                self.shm.buf[offset:offset + NAME_SIZE] = name.ljust(NAME_SIZE, b'\0')
+                # The record is zeroed, so publishing the name is enough
+                self.words[COUNT_WORD] = slot + 1
+                self.slots[ticker] = slot
+        return slot
+
+    def update(self, ticker, timestamp=None, bid=None, ask=None, last=None):
+        """
+        Writes the quote of a symbol, adding the symbol on its first
+        quote. The fields not given keep their previous values.
+
+        :param str ticker: The ticker symbol.
+        :param timestamp: The time of the quote.
+        :param int bid: The bid price, in PriceParser units.
+        :param int ask: The ask price, in PriceParser units.
+        :param int last: The last (close) price, in PriceParser units.
+        """
+        slot = self.slots.get(ticker)
+        if slot is None:
+            slot = self._slot(ticker)
+            if slot is None:
+                slot = self._add(ticker)
+        base = self.records + slot * RECORD_WORDS
+        words = self.words
+        sequence = words[base + SEQUENCE]
+        flags = words[base + FLAGS]
+        words[base + SEQUENCE] = sequence + 1
+        if bid is not None:
+            words[base + BID] = bid
+            words[base + ASK] = ask
+            flags |= HAS_BID_ASK
+        if last is not None:
+            words[base + LAST] = last
+            flags |= HAS_LAST
+        if timestamp is not None:
+            timestamp = pd.Timestamp(timestamp)
+            words[base + TIME] = timestamp.value
+            flags = flags & ~(NAIVE_TIME | UTC_TIME) | (
+                NAIVE_TIME if timestamp.tzinfo is None else UTC_TIME
+            )
+        words[base + FLAGS] = flags
+        words[base + SEQUENCE] = sequence + 2
+
+    def publish(self, event):
+        """
+        Writes the bid/ask of a TickEvent, or the close of a BarEvent.
+        """
+        if event.type == EventType.TICK:
+            self.update(event.ticker, event.time, bid=event.bid, ask=event.ask)
+        elif event.type == EventType.BAR:
+            self.update(event.ticker, event.time, last=event.close_price)
+
+    def quote(self, ticker):
+        """
+        Returns a consistent copy of the record of a symbol, as the
+        list [sequence, bid, ask, last, time, flags], or None for a
+        symbol not on the board. The sequence, halved, counts the
+        updates of the symbol.
+        """
+        slot = self.slots.get(ticker)
+        if slot is None:
+            slot = self._slot(ticker)
+            if slot is None:
+                return None
+        base = self.records + slot * RECORD_WORDS
+        words = self.words
+        while True:
+            record = words[base:base + FLAGS + 1].tolist()
+            if not record[SEQUENCE] & 1 and words[base] == record[SEQUENCE]:
+                return record
+            # An update is under way, let its writer run
+            time.sleep(0)
+
+    def get_best_bid_ask(self, ticker):
+        """
+        Returns the latest bid/ask of a symbol, or (None, None).
+        """
+        record = self.quote(ticker)
+        if record is None or not record[FLAGS] & HAS_BID_ASK:
+            return None, None
+        return record[BID], record[ASK]
+
+    def get_last_close(self, ticker):
+        """
+        Returns the latest last (close) price of a symbol, or None.
+        """
+        record = self.quote(ticker)
+        if record is None or not record[FLAGS] & HAS_LAST:
+            return None
+        return record[LAST]
+
+    def get_last_timestamp(self, ticker):
+        """
+        Returns the time of the latest quote of a symbol, or None.
+        """
+        record = self.quote(ticker)
+        if record is None or not record[FLAGS] & (NAIVE_TIME | UTC_TIME):
+            return None
+        timestamp = pd.Timestamp(record[TIME])
+        if record[FLAGS] & UTC_TIME:
+            timestamp = timestamp.tz_localize('UTC')
+        return timestamp
+
+    def close(self):
+        """
+        Detaches from the board, and frees it in the creating process.
+        """
+        self.words.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,157 @@
+import os
+import queue
+
+import numpy as np
+import pandas as pd
+
+from event import EventType, SentimentEvent
+
+
+class SentimentHandler(object):
+    """
+    SentimentHandler streams the sentiment scores of the tickers
+    along with the market events of a price handler, which it wraps:
+    its stream_next() streams the next market event of the wrapped
+    handler, preceded by a SentimentEvent carrying the latest score
+    of the ticker as of the time of the event, if that score has not
+    been streamed yet. Scores newer than the previous market event of
+    the ticker but superseded by the time of the next one are not
+    streamed, the strategies only seeing the latest sentiment as of
+    each bar (an as-of join).
+
+    The scores are read from one CSV file per ticker in
+    'sentiment_dir', e.g. 'GOOG.csv':
+
+        Date,Sentiment
+        2017-01-02 08:15:00,0.42
+        2017-01-02 13:40:00,-0.10
+
+    only loading the columns needed, into a sorted array of times and
+    an array of scores per ticker. Aligning a market event, or
+    looking up the latest score as of any time with latest(), is a
+    binary search over the times of the ticker.
+
+    The other attributes (prices, tickers...) are those of the
+    wrapped price handler.
+    """
+
+    def __init__(
+            self, sentiment_dir, events_queue, price_handler,
+            init_tickers=None, column='Sentiment'
+    ):
+        """
+        Initialises the handler, taking the market events of the
+        wrapped price handler over.
+
+        :param str sentiment_dir: The directory of the CSV files.
+        :param events_queue: The Event Queue.
+        :param price_handler: The wrapped PriceHandler.
+        :param init_tickers: The tickers whose sentiment is streamed,
+                        by default those of the price handler.
+        :param str column: The column of the scores.
+        """
+        self.sentiment_dir = sentiment_dir
+        self.events_queue = events_queue
+        self.price_handler = price_handler
+        self.column = column
+        self.market_queue = queue.Queue()
+        price_handler.events_queue = self.market_queue
+        self.times = {}
+        self.values = {}
+        self.scores = {}
+        self.streamed = {}
+        if init_tickers is None:
+            init_tickers = price_handler.symbol_list
+        for ticker in init_tickers:
+            self.subscribe_ticker(ticker)
+
+    def __getattr__(self, name):
+        if name == 'price_handler':
+            raise AttributeError(name)
+        return getattr(self.price_handler, name)
+
+    def subscribe_ticker(self, ticker):
+        """
+        Loads the sentiment scores of a ticker.
+        """
+        path = os.path.join(self.sentiment_dir, '%s.csv' % ticker)
+        if not os.path.exists(path):
+            print(
+                'Could not subscribe the sentiment of symbol %s '
+                'as no sentiment CSV found.' % ticker
+            )
+            return
+        data = pd.read_csv(
+            path, usecols=['Date', self.column], parse_dates=['Date'],
+            dtype={self.column: np.float64}
+        )
+        times = pd.DatetimeIndex(data['Date'])
+        scores = data[self.column].to_numpy()
+        if not times.is_monotonic_increasing:
+            order = np.argsort(times.asi8, kind='stable')
+            times = times[order]
+            scores = scores[order]
+        self.times[ticker] = times
+        self.values[ticker] = times.as_unit('ns').asi8
+        self.scores[ticker] = scores
+        self.streamed[ticker] = -1
+
+    def _index(self, ticker, time):
+        return int(np.searchsorted(
+            self.values[ticker], pd.Timestamp(time).value, side='right'
+        )) - 1
+
+    def latest(self, ticker, time):
+        """
+        Returns the latest sentiment of a ticker as of a time.
+
+        :param str ticker: The ticker symbol.
+        :param time: The time of the lookup.
+        :return: The (time, score) of the sentiment, or None.
+        """
+        if ticker not in self.values:
+            return None
+        i = self._index(ticker, time)
+        if i < 0:
+            return None
+        return self.times[ticker][i], float(self.scores[ticker][i])
+
+    @property
+    def continue_backtest(self):
+        return self.price_handler.continue_backtest
+
+    def stream_next(self):
+        """
+        Streams the next market event of the wrapped handler onto
+        the event queue, preceded by the latest sentiment of its
+        ticker if not streamed yet.
+        """
+        self.price_handler.stream_next()
+        while True:
+            try:
+                event = self.market_queue.get(False)
+            except queue.Empty:
+                break
+            ticker = getattr(event, 'ticker', None)
+            if event.type in (EventType.BAR, EventType.TICK) and ticker in self.values:
+                i = self._index(ticker, event.time)
+                if i > self.streamed[ticker]:
+                    self.streamed[ticker] = i
+                    self.events_queue.put(SentimentEvent(
+                        ticker, self.times[ticker][i], float(self.scores[ticker][i])
+                    ))
+            self.events_queue.put(event)
+
+    def get_state(self):
+        """
+        Returns the state of the wrapped handler along with the
+        latest sentiment streamed per ticker.
+        """
+        return {
+            'price_handler': self.price_handler.get_state(),
+            'streamed': dict(self.streamed)
+        }
+
+    def set_state(self, state):
+        self.price_handler.set_state(state['price_handler'])
+        self.streamed = dict(state['streamed'])
@@ -0,0 +1,263 @@
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from event import BarEvent
+from price_handler.base import AbstractBarPriceHandler
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from price_parser import PriceParser
+
+
+class SharedBarData(object):
+    """
+    SharedBarData holds the merged and time ordered bar data of
+    several tickers as integer columns in a single shared memory
+    block: the timestamps in nanoseconds, the ticker codes, the
+    prices in PriceParser units and the volumes.
+
+    The data is loaded and converted once, then any number of
+    SharedBarPriceHandlers, in any process, stream from it without
+    copying it: pickling a SharedBarData only sends the name of
+    its block, which the receiving process attaches to.
+    """
+
+    COLUMNS = ('time', 'ticker', 'open', 'high', 'low', 'close', 'adj_close', 'volume')
+
+    def __init__(self, columns, tickers, first_bars, unit='ns'):
+        """
+        Copies the columns into a new shared memory block.
+
+        :param columns: A dict of equal length integer arrays, one
+                        per name of COLUMNS.
+        :param list tickers: The ticker symbols, by ticker code.
+        :param dict first_bars: The (timestamp, close, adj_close)
+                        of the first bar of each ticker.
+        :param str unit: The resolution of the timestamps of the
+                        BarEvents, e.g. 'us' for pandas CSV dates.
+        """
+        length = len(columns['time'])
+        self.tickers = list(tickers)
+        self.first_bars = dict(first_bars)
+        self.unit = unit
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=max(1, len(self.COLUMNS) * length * 8)
+        )
+        self.owner = True
+        self._attach(length)
+        for name, values in columns.items():
+            self.columns[name][:] = values
+
+    @classmethod
+    def from_csv(cls, csv_dir, tickers):
+        """
+        Loads the Yahoo daily CSV files of the tickers, merged and
+        sorted as by the YahooDailyCsvBarPriceHandler.
+
+        :param str csv_dir: Absolute directory path to CSV files.
+        :param list tickers: The ticker symbols to load.
+        :return: The SharedBarData.
+        """
+        handler = YahooDailyCsvBarPriceHandler(csv_dir, queue.Queue(), tickers)
+        return cls.from_bar_data(handler.bar_data, handler.symbol_list, handler.tickers)
+
+    @classmethod
+    def from_bar_data(cls, bar_data, tickers, first_bars):
+        """
+        Converts merged bar data, as held by a bar price handler.
+
+        :param bar_data: The DataFrame of bars, indexed by date.
+        :param list tickers: The ticker symbols.
+        :param dict first_bars: The initial prices of each ticker,
+                        as in the 'tickers' dict of a price handler.
+        """
+        def parse(values):
+            # Same truncation as PriceParser.parse()
+            return np.trunc(
+                values.astype(np.float64) * PriceParser.PRICE_MULTIPLIER
+            ).astype(np.int64)
+
+        codes = dict((ticker, i) for i, ticker in enumerate(tickers))
+        index = pd.DatetimeIndex(bar_data.index)
+        columns = {
+            'time': index.as_unit('ns').asi8,
+            'ticker': bar_data['Ticker'].map(codes).values.astype(np.int64),
+            'open': parse(bar_data['Open'].values),
+            'high': parse(bar_data['High'].values),
+            'low': parse(bar_data['Low'].values),
+            'close': parse(bar_data['Close'].values),
+            'adj_close': parse(bar_data['Adj Close'].values),
+            'volume': bar_data['Volume'].values.astype(np.int64)
+        }
+        first_bars = dict(
+            (ticker, (prices['timestamp'], prices['close'], prices['adj_close']))
+            for ticker, prices in first_bars.items()
+        )
+        return cls(columns, tickers, first_bars, index.unit)
+
+    def _attach(self, length):
+        self.length = length
+        self.values = np.ndarray(
+            (len(self.COLUMNS), length), dtype=np.int64, buffer=self.shm.buf
+        )
+        self.columns = dict(zip(self.COLUMNS, self.values))
+
+    def __len__(self):
+        return self.length
+
+    def __getstate__(self):
+        return {
+            'name': self.shm.name, 'length': self.length,
+            'tickers': self.tickers, 'first_bars': self.first_bars,
+            'unit': self.unit
+        }
+
+    def __setstate__(self, state):
+        self.tickers = state['tickers']
+        self.first_bars = state['first_bars']
+        self.unit = state['unit']
+        # Processes of a pool share the resource tracker of their
+        # parent, so that only the creating process unlinks it
+        self.shm = shared_memory.SharedMemory(name=state['name'])
+        self.owner = False
+        self._attach(state['length'])
+
+    def bounds(self, start_date=None, end_date=None):
+        """
+        Returns the range of rows from 'start_date' included to
+        'end_date' excluded, as the YahooDailyCsvBarPriceHandler
+        slices its data.
+        """
+        time = self.columns['time']
+        start, end = 0, self.length
+        if start_date is not None:
+            start = int(np.searchsorted(time, pd.Timestamp(start_date).as_unit('ns').value))
+        if end_date is not None:
+            end = int(np.searchsorted(time, pd.Timestamp(end_date).as_unit('ns').value))
+        return start, end
+
+    def close(self):
+        """
+        Detaches from the block, and frees it in the creating process.
+        """
+        del self.columns, self.values
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class SharedBarPriceHandler(AbstractBarPriceHandler):
+    """
+    SharedBarPriceHandler streams BarEvents from a SharedBarData,
+    in the same order and with the same prices as the
+    YahooDailyCsvBarPriceHandler would from the CSV files, but
+    without reading, merging or copying any data.
+    """
+
+    def __init__(
+            self, data, events_queue, init_tickers=None,
+            start_date=None, end_date=None
+    ):
+        """
+        Initialises the handler over the rows of the data between
+        the start and end dates.
+
+        :param data: The SharedBarData.
+        :param obj events_queue: The Event Queue.
+        :param list init_tickers: The tickers to stream, by default
+                        every ticker of the data.
+        :param start_date: The first date streamed, if any.
+        :param end_date: The date the stream stops before, if any.
+        """
+        self.data = data
+        self.events_queue = events_queue
+        self.continue_backtest = True
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tickers = {}
+        self.tickers_data = {}
+        if init_tickers is None:
+            init_tickers = data.tickers
+        for ticker in init_tickers:
+            self.subscribe_ticker(ticker)
+
+        start, end = data.bounds(start_date, end_date)
+        if len(self.tickers) == len(data.tickers):
+            self.rows = range(start, end)
+        else:
+            codes = [data.tickers.index(ticker) for ticker in self.tickers]
+            subscribed = np.isin(data.columns['ticker'][start:end], codes)
+            self.rows = (start + np.flatnonzero(subscribed)).tolist()
+        self.bar_index = 0
+
+    def subscribe_ticker(self, ticker):
+        """
+        Subscribes the price handler to a ticker of the data.
+        :param ticker:
+        :return:
+        """
+        if ticker in self.tickers:
+            print(
+                'Could not subscribe symbol %s '
+                'as is already subscribed.' % ticker
+            )
+        elif ticker not in self.data.first_bars:
+            print(
+                'Could not subscribe symbol %s '
+                'as it is not in the shared data.' % ticker
+            )
+        else:
+            timestamp, close, adj_close = self.data.first_bars[ticker]
+            self.tickers[ticker] = {
+                'close': close,
+                'adj_close': adj_close,
+                'timestamp': timestamp
+            }
+
+    def stream_next(self):
+        """
+        Place the next BarEvent onto the event queue.
+        :return:
+        """
+        if self.bar_index >= len(self.rows):
+            self.continue_backtest = False
+            return
+        row = self.rows[self.bar_index]
+        self.bar_index += 1
+        bar = self.data.values[:, row].tolist()
+        time = pd.Timestamp(bar[0]).as_unit(self.data.unit)
+        bev = BarEvent(
+            self.data.tickers[bar[1]], time, 86400,
+            bar[2], bar[3], bar[4], bar[5], bar[7], bar[6]
+        )
+        self._store_event(bev)
+        self.events_queue.put(bev)
+
+    def get_state(self):
+        """
+        Returns the state of the handler needed to resume the
+        stream, i.e. the cursor within the rows along with the
+        latest prices.
+        :return:
+        """
+        state = super(SharedBarPriceHandler, self).get_state()
+        state['bar_index'] = self.bar_index
+        state['continue_backtest'] = self.continue_backtest
+        return state
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state().
+        :param state:
+        :return:
+        """
+        super(SharedBarPriceHandler, self).set_state(state)
+        self.bar_index = state['bar_index']
+        self.continue_backtest = state['continue_backtest']
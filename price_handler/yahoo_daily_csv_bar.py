@@ -13,13 +13,19 @@ class YahooDailyCsvBarPriceHandler(AbstractBarPriceHandler):
     Yahoo Finance daily Open-High-Low-Close-Volume (OHLCV) data
     for each requested financial instrument and stream those to
     the provided events queue as BarEvents.
+
+    With CorporateActions, the bars are either adjusted for the
+    splits and dividends at load time (all of the OHLCV, not only
+    the Adj Close), or left raw while the actions are streamed as
+    CorporateActionEvents ahead of the bars of their ex-dates.
     """
 
     def __init__(
             self, csv_dir, events_queue,
             init_tickers=None,
             start_date=None, end_date=None,
-            calc_adj_returns=False
+            calc_adj_returns=False, corporate_actions=None,
+            adjust_prices=True
     ):
         """
         Takes the CSV directory, the events queue and a possible
@@ -29,18 +35,30 @@ class YahooDailyCsvBarPriceHandler(AbstractBarPriceHandler):
         :param str csv_dir: Absolute directory path to CSV files.
         :param obj events_queue: The Event Queue.
         :param dict initial_tickers: A dict of ticker symbol strings.
+        :param corporate_actions: Optional CorporateActions of the
+                        tickers.
+        :param bool adjust_prices: Whether the bars are adjusted for
+                        the corporate actions, or the actions streamed
+                        as events.
         """
         self.csv_dir = csv_dir
         self.events_queue = events_queue
         self.continue_backtest = True
         self.tickers = {}
         self.tickers_data = {}
+        self.corporate_actions = corporate_actions
+        self.adjust_prices = adjust_prices
+        self.actions = {}
+        self.action_index = {}
         if init_tickers is not None:
             for ticker in init_tickers:
                 self.subscribe_ticker(ticker)
         self.start_date = start_date
         self.end_date = end_date
-        self.bar_stream = self._merge_sort_ticker_data()
+        self.bar_data = self._merge_sort_ticker_data()
+        self._skip_early_actions()
+        self.bar_index = 0
+        self.bar_stream = self._iter_bar_data()
         self.calc_adj_returns = calc_adj_returns
         if self.calc_adj_returns:
             self.adj_close_returns = []
@@ -90,13 +108,25 @@ class YahooDailyCsvBarPriceHandler(AbstractBarPriceHandler):
         """
         ticker_path = os.path.join(self.csv_dir, '%s.csv' % ticker)
 
-        # Load the CSV file with no header information, indexed on date
-        self.tickers_data[ticker] = pd.read_csv(
-                                        ticker_path, header=0,
-                                        names=['Date', 'Open', 'High', 'Low',
-                                               'Close', 'Adj Close', 'Volume'],
-                                        index_col='Date', parse_dates=True
-                                        )
+        def load():
+            # Load the CSV file with no header information, indexed on date
+            return pd.read_csv(
+                ticker_path, header=0,
+                names=['Date', 'Open', 'High', 'Low',
+                       'Close', 'Adj Close', 'Volume'],
+                index_col='Date', parse_dates=True
+            )
+
+        if self.corporate_actions is None:
+            self.tickers_data[ticker] = load()
+        elif self.adjust_prices:
+            self.tickers_data[ticker] = self.corporate_actions.adjusted_bars(
+                ticker, ticker_path, load
+            )
+        else:
+            self.tickers_data[ticker] = load()
+            self.actions[ticker] = self.corporate_actions.events(ticker)
+            self.action_index[ticker] = 0
         self.tickers_data[ticker]['Ticker'] = ticker
 
     def _merge_sort_ticker_data(self):
@@ -122,13 +152,71 @@ class YahooDailyCsvBarPriceHandler(AbstractBarPriceHandler):
         df['colFromIndex'] = df.index
         df = df.sort_values(by=['colFromIndex', 'Ticker'])
         if start is None and end is None:
-            return df.iterrows()
+            return df
         elif start is not None and end is None:
-            return df.ix[start:].iterrows()
+            return df.iloc[start:]
         elif start is None and end is not None:
-            return df.ix[:end].iterrows()
+            return df.iloc[:end]
         else:
-            return df.ix[start:end].iterrows()
+            return df.iloc[start:end]
+
+    def _skip_early_actions(self):
+        """
+        Skips the actions of each ticker dated before its first bar
+        streamed (e.g. before the start date), which the portfolio
+        holds no position for, rather than emitting them late with
+        their old date.
+        """
+        for ticker, actions in self.actions.items():
+            dates = self.bar_data.index[self.bar_data['Ticker'] == ticker]
+            i = 0
+            while i < len(actions) and (not len(dates) or actions[i].time < dates[0]):
+                i += 1
+            self.action_index[ticker] = i
+
+    def _iter_bar_data(self):
+        """
+        Iterates over the rows of the merged bar data, starting
+        from the current cursor. The cursor always points at the
+        next row to be streamed, so that the stream can be
+        checkpointed and resumed from the same bar.
+        """
+        while self.bar_index < len(self.bar_data):
+            index = self.bar_data.index[self.bar_index]
+            row = self.bar_data.iloc[self.bar_index]
+            self.bar_index += 1
+            yield index, row
+
+    def get_state(self):
+        """
+        Returns the state of the handler needed to resume the
+        stream, i.e. the cursor within the merged bar data along
+        with the latest prices. The bar data itself is reloaded
+        from the CSV files.
+        :return:
+        """
+        state = super(YahooDailyCsvBarPriceHandler, self).get_state()
+        state['bar_index'] = self.bar_index
+        state['continue_backtest'] = self.continue_backtest
+        state['action_index'] = dict(self.action_index)
+        if self.calc_adj_returns:
+            state['adj_close_returns'] = list(self.adj_close_returns)
+        return state
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state() and resumes
+        the bar stream from the saved cursor.
+        :param state:
+        :return:
+        """
+        super(YahooDailyCsvBarPriceHandler, self).set_state(state)
+        self.bar_index = state['bar_index']
+        self.continue_backtest = state['continue_backtest']
+        self.action_index = dict(state.get('action_index', {}))
+        if 'adj_close_returns' in state:
+            self.adj_close_returns = list(state['adj_close_returns'])
+        self.bar_stream = self._iter_bar_data()
 
     def stream_next(self):
         """
@@ -147,9 +235,25 @@ class YahooDailyCsvBarPriceHandler(AbstractBarPriceHandler):
         bev = self._create_event(index, period, ticker, row)
         # Store event
         self._store_event(bev)
-        # Send event to queue
+        # Send the corporate actions up to the bar, then the bar
+        if self.actions:
+            self._stream_actions(ticker, index)
         self.events_queue.put(bev)
 
+    def _stream_actions(self, ticker, time):
+        """
+        Places the CorporateActionEvents of a ticker with an ex-date
+        up to the time of its bar onto the event queue.
+        """
+        actions = self.actions.get(ticker)
+        if not actions:
+            return
+        i = self.action_index[ticker]
+        while i < len(actions) and actions[i].time <= time:
+            self.events_queue.put(actions[i])
+            i += 1
+        self.action_index[ticker] = i
+
     def _create_event(self, index, period, ticker, row):
         """
         Obtain all elements of the bar from a row of dataframe
@@ -198,3 +302,4 @@ class YahooDailyCsvBarPriceHandler(AbstractBarPriceHandler):
         self.tickers[ticker]['close'] = event.close_price
         self.tickers[ticker]['adj_close'] = event.adj_close_price
         self.tickers[ticker]['timestamp'] = event.time
+        self._store_price(event, event.close_price)
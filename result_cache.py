@@ -0,0 +1,423 @@
+import datetime
+import enum
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import queue
+
+import numpy as np
+import pandas as pd
+
+from price_handler.shared_bar import SharedBarPriceHandler
+from sweep import summary_statistics
+
+
+# Bumped when the keys or the entries change, invalidating the cache
+VERSION = 1
+
+_source_digests = {}
+_file_digests = {}
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def source_digest(obj):
+    """
+    Returns the qualified name of a class or function along with
+    the digest of its source code (and those of the base classes),
+    so that editing the code of a strategy invalidates its results.
+    """
+    # Bound methods by their function
+    obj = getattr(obj, '__func__', obj)
+    digest = _source_digests.get(obj)
+    if digest is None:
+        classes = [
+            cls for cls in obj.__mro__ if cls.__module__ not in ('builtins', 'abc')
+        ] if isinstance(obj, type) else [obj]
+        parts = []
+        for item in classes:
+            try:
+                source = inspect.getsource(item)
+            except (OSError, TypeError):
+                source = ''
+            parts.append('%s.%s:%s' % (
+                item.__module__, item.__qualname__, _sha256(source.encode('utf-8'))
+            ))
+        digest = _source_digests[obj] = '|'.join(parts)
+    return digest
+
+
+def file_digest(path):
+    """
+    Returns the SHA-256 of the content of a file, remembered by
+    path, size and modification time.
+    """
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    signature = (path, stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(signature)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        digest = _file_digests[signature] = sha.hexdigest()
+    return digest
+
+
+def describe(obj, exclude=(), _path=None):
+    """
+    Returns a canonical, JSON serialisable description of the
+    configuration of an object: plain values as such, arrays and
+    DataFrames by the digest of their content, classes and functions
+    by source_digest(), and other objects by their class and their
+    attributes, described recursively. Queues, the objects of
+    'exclude' (e.g. the other components of a backtest) and cycles
+    are described by their class only.
+
+    A class can leave attributes out of the description of its
+    objects by naming them in 'unkeyed_attributes', e.g. the state
+    derived from the symbol ids of the process, which depend on the
+    tickers interned before, or objects not changing the results.
+
+    :param obj: The object to describe.
+    :param exclude: The objects described by their class only.
+    """
+    if _path is None:
+        _path = set(id(item) for item in exclude)
+    if obj is None or isinstance(obj, (bool, int, str)):
+        return obj
+    if isinstance(obj, float):
+        return repr(obj)
+    if isinstance(obj, enum.Enum):
+        return str(obj)
+    if isinstance(obj, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return pd.Timestamp(obj).isoformat()
+    if isinstance(obj, (np.generic,)):
+        return describe(obj.item(), exclude, _path)
+    if isinstance(obj, np.ndarray):
+        return {
+            'array': str(obj.dtype), 'shape': list(obj.shape),
+            'sha256': _sha256(np.ascontiguousarray(obj).tobytes())
+        }
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return {
+            'frame': [str(column) for column in getattr(obj, 'columns', [obj.name])],
+            'sha256': _sha256(pd.util.hash_pandas_object(obj).values.tobytes())
+        }
+    if isinstance(obj, type) or inspect.isroutine(obj):
+        return source_digest(obj)
+    if isinstance(obj, functools.partial):
+        return {
+            'partial': source_digest(obj.func),
+            'args': describe(obj.args, exclude, _path),
+            'keywords': describe(obj.keywords, exclude, _path)
+        }
+    if id(obj) in _path or isinstance(obj, queue.Queue):
+        return {'ref': type(obj).__qualname__}
+    _path.add(id(obj))
+    try:
+        if isinstance(obj, dict):
+            return sorted(
+                [json.dumps(describe(k, exclude, _path), sort_keys=True), describe(v, exclude, _path)]
+                for k, v in obj.items()
+            )
+        if isinstance(obj, (list, tuple)):
+            return [describe(item, exclude, _path) for item in obj]
+        if isinstance(obj, (set, frozenset)):
+            return sorted(
+                json.dumps(describe(item, exclude, _path), sort_keys=True) for item in obj
+            )
+        attributes = getattr(obj, '__dict__', None)
+        if attributes is None:
+            slots = getattr(type(obj), '__slots__', ())
+            attributes = dict(
+                (name, getattr(obj, name)) for name in slots if hasattr(obj, name)
+            )
+        unkeyed = getattr(type(obj), 'unkeyed_attributes', ())
+        if unkeyed:
+            attributes = dict(
+                (name, value) for name, value in attributes.items()
+                if name not in unkeyed
+            )
+        return {
+            'class': source_digest(type(obj)),
+            'attributes': describe(attributes, exclude, _path)
+        }
+    finally:
+        _path.discard(id(obj))
+
+
+def data_digest(price_handler):
+    """
+    Returns the description of the market data streamed by a price
+    handler: the content digests of its CSV files (and corporate
+    actions) and its date range for a CSV handler, of the rows in its
+    date range for a SharedBarPriceHandler, or of the handler itself
+    otherwise.
+    """
+    start_date = getattr(price_handler, 'start_date', None)
+    end_date = getattr(price_handler, 'end_date', None)
+    csv_dir = getattr(price_handler, 'csv_dir', None)
+    data = getattr(price_handler, 'data', None)
+    if csv_dir is not None:
+        tickers = sorted(price_handler.tickers)
+        digest = {
+            'files': [
+                [ticker, file_digest(os.path.join(csv_dir, '%s.csv' % ticker))]
+                for ticker in tickers
+            ]
+        }
+        corporate_actions = getattr(price_handler, 'corporate_actions', None)
+        if corporate_actions is not None:
+            digest['actions'] = [
+                [ticker, file_digest(corporate_actions.path(ticker))] for ticker in tickers
+            ]
+            digest['adjust_prices'] = price_handler.adjust_prices
+    elif data is not None and hasattr(data, 'bounds'):
+        start, end = data.bounds(start_date, end_date)
+        digest = {
+            'tickers': sorted(price_handler.tickers),
+            'shared': describe(data.values[:, start:end]),
+            'unit': data.unit
+        }
+    else:
+        digest = {'handler': describe(price_handler)}
+    digest['start_date'] = describe(start_date)
+    digest['end_date'] = describe(end_date)
+    return digest
+
+
+def backtest_key(backtest, data=None):
+    """
+    Returns the key of the results of a Backtest not run yet, from
+    the classes and configuration of the backtest (e.g. the timers of
+    its scheduler), its strategy, portfolio and execution handler,
+    and the data of its price handler.
+
+    :param backtest: The Backtest.
+    :param data: The description of its market data, if known, by
+                    default data_digest() of its price handler.
+    """
+    components = (
+        backtest.price_handler, backtest.strategy, backtest.portfolio,
+        backtest.execution_handler, backtest.events_queue
+    )
+
+    def component(obj):
+        # The other components are only referred to
+        return describe(obj, [other for other in components if other is not obj])
+
+    return key({
+        'backtest': component(backtest),
+        'strategy': component(backtest.strategy),
+        'portfolio': component(backtest.portfolio),
+        'execution_handler': component(backtest.execution_handler),
+        'data': data_digest(backtest.price_handler) if data is None else data
+    })
+
+
+def key(parts):
+    """
+    Returns the hexadecimal SHA-256 key of a description.
+    """
+    return _sha256(json.dumps(
+        [VERSION, describe(parts)], sort_keys=True
+    ).encode('utf-8'))
+
+
+class ResultCache(object):
+    """
+    ResultCache memoizes the equity curves and summary statistics
+    of backtests on disk, so that re-running an identical backtest
+    (same code, configuration and data), e.g. in CI or a notebook,
+    returns the stored results at once.
+
+    Entries are content addressed: a backtest is keyed by the source
+    code and configuration of its components and the content of its
+    market data (see backtest_key()), and stored as one pickle file
+    per key. Using an entry touches its file, and the least recently
+    used entries are evicted when the cache outgrows 'max_bytes' or
+    'max_entries'.
+
+    With 'bypass', the cache is not read: every backtest is run, and
+    its results stored, replacing the previous entry.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 2 ** 20, max_entries=None, bypass=False):
+        """
+        :param str directory: The directory of the cache.
+        :param int max_bytes: The most bytes kept on disk.
+        :param int max_entries: The most entries kept, if any.
+        :param bool bypass: Whether the cache is bypassed.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.data_digests = {}
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, '%s.pkl' % key)
+
+    def get(self, key):
+        """
+        Returns the (equity curve, statistics) stored under a key,
+        or None.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry['equity_curve'], entry['statistics']
+
+    def put(self, key, equity_curve, statistics):
+        """
+        Stores the results of a backtest under a key, then evicts the
+        least recently used entries beyond the bounds.
+        """
+        path = self._path(key)
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(
+                {'equity_curve': equity_curve, 'statistics': statistics},
+                f, pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def lookup(self, key):
+        """
+        Returns the (equity curve, statistics) stored under a key,
+        counting a hit, or None if there are none or the cache is
+        bypassed.
+        """
+        if self.bypass:
+            return None
+        results = self.get(key)
+        if results is not None:
+            self.hits += 1
+        return results
+
+    def store(self, key, equity_curve, statistics):
+        """
+        Stores the results of a backtest run for want of an entry,
+        counting a miss.
+        """
+        self.misses += 1
+        self.put(key, equity_curve, statistics)
+
+    def entries(self):
+        """
+        Returns the (last use, size, path) of the entries, least
+        recently used first.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache is
+        within its bounds.
+        """
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        count = len(entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes and (self.max_entries is None or count <= self.max_entries):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= entry_size
+            count -= 1
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+    def cached(self, key, run, periods=252):
+        """
+        Returns the results stored under a key, or runs the backtest
+        and stores its results.
+
+        :param str key: The key of the backtest.
+        :param run: A callable running the backtest and returning its
+                        equity curve.
+        :param int periods: The number of bars per year of the
+                        statistics.
+        :return: The (equity curve, statistics) of the backtest.
+        """
+        results = self.lookup(key)
+        if results is not None:
+            return results
+        equity_curve = run()
+        statistics = summary_statistics(equity_curve, periods)
+        self.store(key, equity_curve, statistics)
+        return equity_curve, statistics
+
+    def task_key(self, data, create_backtest, parameters, start_date=None, end_date=None):
+        """
+        Returns the key of a run of a ParameterSweep: the backtest of
+        the run is built, not run, so that it is keyed by the source
+        and configuration of its components (see backtest_key()) as
+        well as by its create_backtest function and parameters, the
+        rows of the SharedBarData in its date range being described
+        once.
+        """
+        start, end = data.bounds(start_date, end_date)
+        rows = (data.shm.name, start, end)
+        digest = self.data_digests.get(rows)
+        if digest is None:
+            digest = self.data_digests[rows] = {
+                'tickers': data.tickers,
+                'shared': describe(data.values[:, start:end]),
+                'unit': data.unit
+            }
+        events_queue = queue.Queue()
+        price_handler = SharedBarPriceHandler(
+            data, events_queue, start_date=start_date, end_date=end_date
+        )
+        backtest = create_backtest(price_handler, events_queue, **parameters)
+        return key({
+            'create_backtest': source_digest(create_backtest),
+            'parameters': describe(parameters),
+            'backtest': backtest_key(backtest, dict(
+                digest, start_date=describe(start_date), end_date=describe(end_date)
+            ))
+        })
+
+    def simulate_trading(self, backtest, periods=252):
+        """
+        Returns the equity curve and statistics of a Backtest, from
+        the cache if an identical backtest was run before.
+
+        :param backtest: The Backtest, not run yet.
+        :param int periods: The number of bars per year.
+        :return: The (equity curve, statistics) of the backtest.
+        """
+        return self.cached(backtest_key(backtest), backtest.simulate_trading, periods)
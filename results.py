@@ -0,0 +1,439 @@
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+NAT = np.iinfo(np.int64).min
+
+# Columns of the event tables, as (name, kind) pairs. 'time' columns
+# are stored as int64 nanoseconds, 'dictionary' columns as int32
+# codes into a dictionary of values (None being -1).
+SCHEMAS = {
+    'signals': (
+        ('datetime', 'time'), ('ticker', 'dictionary'),
+        ('direction', 'dictionary'), ('quantity', 'float64'),
+        ('order_type', 'dictionary'), ('price', 'float64'),
+        ('strategy_id', 'dictionary')
+    ),
+    'orders': (
+        ('datetime', 'time'), ('ticker', 'dictionary'),
+        ('direction', 'dictionary'), ('quantity', 'int64'),
+        ('order_type', 'dictionary'), ('price', 'float64'),
+        ('strategy_id', 'dictionary')
+    ),
+    'fills': (
+        ('datetime', 'time'), ('ticker', 'dictionary'),
+        ('exchange', 'dictionary'), ('direction', 'dictionary'),
+        ('quantity', 'int64'), ('fill_cost', 'float64'),
+        ('commission', 'float64'), ('strategy_id', 'dictionary')
+    )
+}
+
+
+def _time_value(time):
+    if time is None:
+        return NAT, None, None
+    time = pd.Timestamp(time)
+    if time is pd.NaT:
+        return NAT, None, None
+    return time.value, None if time.tz is None else str(time.tz), time.unit
+
+
+class ResultWriter(object):
+    """
+    ResultWriter streams the results of a backtest, i.e. the
+    holdings and positions snapshots of the portfolio along with its
+    signals, orders and fills, to one columnar file per table in a
+    directory, so that the memory used by the results stays flat
+    however long the run is.
+
+    Rows are buffered per column and written every 'row_group_size'
+    rows as a row group: a JSON header (number of rows, time range,
+    and the kind, compressed length and CRC32 of each column) followed
+    by the zlib-compressed columns. Tickers and the other strings are
+    dictionary-encoded per row group. A ResultReader then only
+    decompresses the selected columns of the row groups overlapping
+    the selected dates.
+
+    The columns of the snapshot tables are those of their first row,
+    e.g. 'datetime', a column per ticker, 'cash', 'commission' and
+    'total' for the holdings.
+
+    With 'resume', the tables of a previous run are kept, so that a
+    backtest restored by a Checkpointer carries on writing them: the
+    state of the writer, saved with the portfolio at each checkpoint,
+    records the row counts of the tables once flushed, and set_state()
+    truncates the tables back to them, dropping the rows written after
+    the checkpoint. Tables not restored are truncated on their first
+    write, as without 'resume'.
+    """
+
+    MAGIC = b'ADEVCOL1'
+    GROUP_HEADER = struct.Struct('<II')
+
+    def __init__(self, directory, row_group_size=10000, compression=6, resume=False):
+        """
+        Initialises the writer, truncating the tables of a previous
+        run in the same directory unless resuming it.
+
+        :param str directory: The directory of the table files.
+        :param int row_group_size: The number of rows per row group.
+        :param int compression: The zlib compression level.
+        :param bool resume: Whether the tables of a previous run are
+                        kept, to be truncated by set_state().
+        """
+        self.directory = directory
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.schemas = dict(SCHEMAS)
+        self.buffers = {}
+        self.files = {}
+        self.rows = {}
+        self.appending = set()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        if not resume:
+            for name in os.listdir(directory):
+                if name.endswith('.col'):
+                    os.remove(os.path.join(directory, name))
+
+    def path(self, table):
+        return os.path.join(self.directory, '%s.col' % table)
+
+    def write(self, table, row):
+        """
+        Appends a row to a table, writing a row group once
+        'row_group_size' rows are buffered.
+
+        :param str table: The name of the table.
+        :param row: A dict of column name to value, or a tuple
+                        of values in the order of the schema.
+        """
+        buffer = self.buffers.get(table)
+        if buffer is None:
+            if table not in self.schemas:
+                self.schemas[table] = (('datetime', 'time'),) + tuple(
+                    (name, 'float64') for name in row if name != 'datetime'
+                )
+            buffer = self.buffers[table] = [[] for _ in self.schemas[table]]
+            self.rows.setdefault(table, 0)
+        if isinstance(row, dict):
+            row = [row.get(name) for name, _ in self.schemas[table]]
+        for column, value in zip(buffer, row):
+            column.append(value)
+        self.rows[table] += 1
+        if len(buffer[0]) >= self.row_group_size:
+            self._write_row_group(table)
+
+    def write_signal(self, time, signal):
+        self.write('signals', (
+            signal.datetime if signal.datetime is not None else time,
+            signal.ticker, signal.buy_sell.upper(), signal.suggested_quantity,
+            signal.order_type, signal.price, signal.strategy_id
+        ))
+
+    def write_order(self, time, order):
+        self.write('orders', (
+            time, order.ticker, order.buy_sell, order.quantity,
+            order.order_type, order.price, order.strategy_id
+        ))
+
+    def write_fill(self, time, fill):
+        self.write('fills', (
+            fill.timeindex if fill.timeindex is not None else time,
+            fill.symbol, fill.exchange, fill.direction, fill.quantity,
+            fill.fill_cost, fill.commission, fill.strategy_id
+        ))
+
+    def _encode(self, kind, values):
+        """
+        Returns the array and the header fields of a column.
+        """
+        header = {'kind': kind}
+        if kind == 'time':
+            encoded = [_time_value(value) for value in values]
+            zones = set(tz for _, tz, _ in encoded if tz is not None)
+            if len(zones) > 1:
+                raise ValueError('Times of different time zones: %s' % sorted(zones))
+            header['tz'] = zones.pop() if zones else None
+            units = [unit for _, _, unit in encoded if unit is not None]
+            header['unit'] = units[0] if units else 'ns'
+            array = np.array([value for value, _, _ in encoded], dtype=np.int64)
+        elif kind == 'dictionary':
+            codes = {}
+            array = np.array([
+                -1 if value is None else codes.setdefault(value, len(codes))
+                for value in values
+            ], dtype=np.int32)
+            header['dictionary'] = list(codes)
+        else:
+            array = np.array(
+                [np.nan if value is None else value for value in values],
+                dtype=kind
+            )
+        return array, header
+
+    def _file(self, table):
+        f = self.files.get(table)
+        if f is None:
+            if table in self.appending:
+                f = self.files[table] = open(self.path(table), 'ab')
+            else:
+                f = self.files[table] = open(self.path(table), 'wb')
+                f.write(self.MAGIC)
+        return f
+
+    def _write_row_group(self, table):
+        buffer = self.buffers[table]
+        if not buffer[0]:
+            return
+        rows = len(buffer[0])
+        columns = []
+        blobs = []
+        for (name, kind), values in zip(self.schemas[table], buffer):
+            array, header = self._encode(kind, values)
+            blob = zlib.compress(array.tobytes(), self.compression)
+            header.update(name=name, length=len(blob), crc=zlib.crc32(blob))
+            if kind == 'time':
+                times = array[array != NAT]
+                header['min'] = int(times.min()) if len(times) else None
+                header['max'] = int(times.max()) if len(times) else None
+                header['nulls'] = rows - len(times)
+            columns.append(header)
+            blobs.append(blob)
+            del values[:]
+        header = json.dumps({
+            'rows': rows, 'columns': columns
+        }).encode('utf-8')
+
+        f = self._file(table)
+        f.write(self.GROUP_HEADER.pack(len(header), zlib.crc32(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+
+    def flush(self):
+        """
+        Writes the buffered rows of every table as a (possibly
+        smaller) row group, the event tables being created even
+        without any row.
+        """
+        for table in self.buffers:
+            self._write_row_group(table)
+        for table in SCHEMAS:
+            self._file(table)
+        for f in self.files.values():
+            f.flush()
+
+    def _truncate(self, table, rows):
+        """
+        Truncates a table after its first 'rows' rows, which must end
+        on a row group.
+        """
+        path = self.path(table)
+        with open(path, 'r+b') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError('%s is not a result table' % path)
+            count = 0
+            while count < rows:
+                fields = f.read(self.GROUP_HEADER.size)
+                if len(fields) < self.GROUP_HEADER.size:
+                    break
+                length, crc = self.GROUP_HEADER.unpack(fields)
+                header = f.read(length)
+                if len(header) < length or zlib.crc32(header) != crc:
+                    break
+                header = json.loads(header.decode('utf-8'))
+                f.seek(sum(column['length'] for column in header['columns']), os.SEEK_CUR)
+                count += header['rows']
+            if count != rows:
+                raise ValueError(
+                    'Cannot truncate %s to %d rows (%d found)' % (path, rows, count)
+                )
+            f.truncate(f.tell())
+
+    def get_state(self):
+        """
+        Flushes the tables to disk and returns their row counts,
+        along with the columns of the snapshot tables.
+        :return:
+        """
+        self.flush()
+        for f in self.files.values():
+            os.fsync(f.fileno())
+        return {
+            'rows': dict(self.rows),
+            'schemas': dict(
+                (table, schema) for table, schema in self.schemas.items()
+                if table not in SCHEMAS
+            )
+        }
+
+    def set_state(self, state):
+        """
+        Truncates the tables back to the row counts returned by
+        get_state(), dropping the rows buffered since, so that the
+        next rows are appended to them.
+        :param state:
+        :return:
+        """
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+        self.buffers = {}
+        self.schemas = dict(SCHEMAS)
+        self.schemas.update(state['schemas'])
+        self.rows = dict(state['rows'])
+        self.appending = set()
+        for table, rows in self.rows.items():
+            if rows:
+                self._truncate(table, rows)
+                self.appending.add(table)
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+    def read(self, table, columns=None, start=None, end=None):
+        """
+        Flushes the writer and reads a table back, see ResultReader.
+        """
+        self.flush()
+        return ResultReader(self.directory).read(table, columns, start, end)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ResultReader(object):
+    """
+    ResultReader reads the tables written by a ResultWriter, only
+    decompressing the selected columns of the row groups overlapping
+    the selected dates.
+    """
+
+    def __init__(self, directory):
+        """
+        :param str directory: The directory of the table files.
+        """
+        self.directory = directory
+
+    def tables(self):
+        return sorted(
+            name[:-len('.col')] for name in os.listdir(self.directory)
+            if name.endswith('.col')
+        )
+
+    def row_groups(self, table, columns=None, start=None, end=None):
+        """
+        Yields the row groups of a table overlapping the dates, as
+        DataFrames indexed by 'datetime' with the selected columns,
+        a row group at a time. Rows without a time (e.g. the initial
+        holdings) are only selected without a start date.
+
+        :param str table: The name of the table.
+        :param columns: The selected columns, all by default.
+        :param start: The first date selected, if any.
+        :param end: The last date selected (inclusive), if any.
+        """
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        path = os.path.join(self.directory, '%s.col' % table)
+        with open(path, 'rb') as f:
+            if f.read(len(ResultWriter.MAGIC)) != ResultWriter.MAGIC:
+                raise ValueError('%s is not a result table' % path)
+            while True:
+                fields = f.read(ResultWriter.GROUP_HEADER.size)
+                if len(fields) < ResultWriter.GROUP_HEADER.size:
+                    return
+                length, crc = ResultWriter.GROUP_HEADER.unpack(fields)
+                header = f.read(length)
+                if len(header) < length or zlib.crc32(header) != crc:
+                    raise ValueError('Corrupted row group in %s' % path)
+                header = json.loads(header.decode('utf-8'))
+                group = self._read_row_group(f, header, columns, start, end)
+                if group is not None:
+                    yield group
+
+    def _bound(self, time, tz):
+        if tz is not None and time.tz is None:
+            time = time.tz_localize(tz)
+        return time.value
+
+    def _read_row_group(self, f, header, columns, start, end):
+        time = header['columns'][0]
+        tz = time['tz']
+        lower = None if start is None else self._bound(start, tz)
+        upper = None if end is None else self._bound(end, tz)
+        overlaps = time['min'] is not None and not (
+            upper is not None and time['min'] > upper or
+            lower is not None and time['max'] < lower
+        )
+        if not overlaps and not (time['nulls'] and lower is None):
+            f.seek(sum(column['length'] for column in header['columns']), os.SEEK_CUR)
+            return None
+
+        data = {}
+        for column in header['columns']:
+            name = column['name']
+            if name != 'datetime' and columns is not None and name not in columns:
+                f.seek(column['length'], os.SEEK_CUR)
+                continue
+            blob = f.read(column['length'])
+            if zlib.crc32(blob) != column['crc']:
+                raise ValueError('Corrupted column %s' % name)
+            kind = column['kind']
+            dtype = {'time': np.int64, 'dictionary': np.int32}.get(kind, kind)
+            array = np.frombuffer(zlib.decompress(blob), dtype=dtype)
+            if kind == 'time':
+                data[name] = array
+            elif kind == 'dictionary':
+                values = np.array(column['dictionary'] + [None], dtype=object)
+                data[name] = values[array]
+            else:
+                data[name] = array
+
+        times = data.pop('datetime')
+        mask = np.ones(len(times), dtype=bool)
+        if lower is not None:
+            mask &= (times != NAT) & (times >= lower)
+        if upper is not None:
+            mask &= (times == NAT) | (times <= upper)
+        if not mask.any():
+            return None
+        index = pd.DatetimeIndex(
+            times[mask].view('datetime64[ns]'), name='datetime'
+        ).as_unit(time['unit'])
+        if tz is not None:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        if columns is not None:
+            names = [name for name in columns if name in data]
+        else:
+            names = list(data)
+        return pd.DataFrame(
+            dict((name, data[name][mask]) for name in names),
+            index=index, columns=names
+        )
+
+    def read(self, table, columns=None, start=None, end=None):
+        """
+        Reads the selected columns and dates of a table, see
+        row_groups().
+
+        :return: A DataFrame indexed by 'datetime'.
+        """
+        groups = list(self.row_groups(table, columns, start, end))
+        if not groups:
+            return pd.DataFrame(
+                columns=columns, index=pd.DatetimeIndex([], name='datetime')
+            )
+        return pd.concat(groups)
@@ -0,0 +1,99 @@
+from abc import ABCMeta, abstractmethod
+
+
+class AbstractRiskManager(object):
+    """
+    The AbstractRiskManager abstract class lets a sized order
+    through, modifies it or rejects it, before it is placed onto
+    the events queue by the Portfolio.
+
+    A RiskManager may also split a single order into several,
+    hence refine_orders() always returns a list of OrderEvents.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def refine_orders(self, portfolio, sized_order):
+        """
+        Checks a sized OrderEvent against the risk limits.
+
+        :param portfolio: The Portfolio object generating the order.
+        :param sized_order: The OrderEvent returned by the PositionSizer.
+        :return: A (possibly empty) list of OrderEvents.
+        """
+        raise NotImplementedError("Should implement refine_orders()")
+
+    def update_price(self, ticker, price):
+        """
+        Marks the risk state of a ticker at a new price.
+        By default risk managers do not track prices.
+
+        :param str ticker: The ticker symbol, e.g. 'GOOG'.
+        :param float price: The latest price in dollars.
+        """
+        pass
+
+    def update_fill(self, fill):
+        """
+        Reconciles the risk state with a FillEvent, i.e. with the
+        quantity actually filled. By default risk managers do not
+        track fills.
+
+        :param fill: The FillEvent.
+        """
+        pass
+
+    def cancel_order(self, order, quantity):
+        """
+        Releases the part of an approved order that will not be
+        filled, e.g. an expired or cancelled limit order.
+
+        :param order: The OrderEvent previously approved.
+        :param int quantity: The unfilled quantity to release.
+        """
+        pass
+
+    def update_corporate_action(self, event):
+        """
+        Adjusts the risk state of a ticker for a CorporateActionEvent,
+        e.g. the units held before a split. By default risk managers
+        do not track units.
+
+        :param event: The CorporateActionEvent.
+        """
+        pass
+
+    def get_state(self):
+        """
+        Returns the state of the risk manager needed to resume a
+        session, by default a copy of every attribute.
+        :return:
+        """
+        return dict(self.__dict__)
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state() in place, as the
+        execution handler may share the risk manager.
+        :param state:
+        :return:
+        """
+        self.__dict__.update(state)
+
+
+class NaiveRiskManager(AbstractRiskManager):
+    """
+    The NaiveRiskManager lets every sized order through unchanged,
+    i.e. without any exposure or order value checks.
+    """
+
+    def refine_orders(self, portfolio, sized_order):
+        """
+        Returns the sized order unchanged.
+
+        :param portfolio: The Portfolio object generating the order.
+        :param sized_order: The OrderEvent returned by the PositionSizer.
+        :return: A list containing the sized OrderEvent.
+        """
+        return [sized_order]
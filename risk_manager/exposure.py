@@ -0,0 +1,215 @@
+from math import floor
+
+from risk_manager.base import AbstractRiskManager
+
+
+class ExposureRiskManager(AbstractRiskManager):
+    """
+    The ExposureRiskManager enforces gross and net exposure,
+    per-symbol and per-sector exposure and maximum order value
+    limits on every order generated by a Portfolio.
+
+    Exposures are computed on the projected positions, i.e. the
+    filled positions plus every order already approved but not
+    yet filled, so that a burst of signals within the same bar
+    cannot exceed the limits before the fills arrive. The projected
+    positions are reconciled with the FillEvents, which move the
+    quantity filled from the pending to the filled position, and
+    with the unfilled remainders of cancelled orders, released by
+    cancel_order().
+
+    The aggregates are kept up to date incrementally: approving
+    an order or marking a ticker at a new price only replaces the
+    contribution of that ticker, thus each check is O(1) whatever
+    the number of positions held.
+
+    All limits are in dollars and any limit left to None is not
+    enforced. Orders reducing an exposure are always accepted.
+    """
+
+    def __init__(
+            self, max_gross_exposure=None, max_net_exposure=None,
+            max_symbol_exposure=None, max_sector_exposure=None,
+            max_order_value=None, sectors=None
+    ):
+        """
+        Initialises the risk manager with its limits.
+
+        :param float max_gross_exposure: Limit on the sum of the
+                        absolute market values of all positions.
+        :param float max_net_exposure: Limit on the absolute value
+                        of the sum of the signed market values.
+        :param float max_symbol_exposure: Limit on the absolute
+                        market value of any single ticker.
+        :param float max_sector_exposure: Limit on the gross market
+                        value of the tickers within any sector.
+        :param float max_order_value: Orders above this value are
+                        scaled down to the largest quantity below it.
+        :param dict sectors: A dict mapping ticker symbols to sectors.
+        """
+        self.max_gross_exposure = max_gross_exposure
+        self.max_net_exposure = max_net_exposure
+        self.max_symbol_exposure = max_symbol_exposure
+        self.max_sector_exposure = max_sector_exposure
+        self.max_order_value = max_order_value
+        self.sectors = sectors or {}
+
+        self.units = {}
+        self.filled = {}
+        self.pending = {}
+        self.prices = {}
+        self.values = {}
+        self.sector_exposures = {}
+        self.gross_exposure = 0.0
+        self.net_exposure = 0.0
+        self.rejected_orders = 0
+
+    def _mark(self, ticker, units, price):
+        """
+        Replaces the contribution of a ticker to the exposure
+        aggregates with the one of 'units' priced at 'price'.
+        """
+        old_value = self.values.get(ticker, 0.0)
+        new_value = units * price
+        self.units[ticker] = units
+        self.prices[ticker] = price
+        self.values[ticker] = new_value
+
+        delta_gross = abs(new_value) - abs(old_value)
+        self.gross_exposure += delta_gross
+        self.net_exposure += new_value - old_value
+        sector = self.sectors.get(ticker)
+        if sector is not None:
+            self.sector_exposures[sector] = (
+                self.sector_exposures.get(sector, 0.0) + delta_gross
+            )
+
+    def update_price(self, ticker, price):
+        """
+        Marks the projected position of a ticker at a new price.
+
+        :param str ticker: The ticker symbol, e.g. 'GOOG'.
+        :param float price: The latest price in dollars.
+        """
+        self._mark(ticker, self.units.get(ticker, 0), price)
+
+    def _release(self, ticker, units):
+        """
+        Removes signed 'units' from the pending units of a ticker,
+        down to zero at most, returning the new pending units.
+        """
+        pending = self.pending.get(ticker, 0)
+        if pending > 0 and units > 0:
+            pending -= min(pending, units)
+        elif pending < 0 and units < 0:
+            pending -= max(pending, units)
+        self.pending[ticker] = pending
+        return pending
+
+    def update_fill(self, fill):
+        """
+        Moves the quantity of a fill from the pending units of its
+        ticker to its filled units. Fills of orders not approved by
+        this risk manager only change the filled units.
+
+        :param fill: The FillEvent.
+        """
+        ticker = fill.symbol
+        units = fill.quantity if fill.direction == 'BUY' else -fill.quantity
+        filled = self.filled[ticker] = self.filled.get(ticker, 0) + units
+        pending = self._release(ticker, units)
+        self._mark(ticker, filled + pending, self.prices.get(ticker, 0.0))
+
+    def cancel_order(self, order, quantity):
+        """
+        Removes the unfilled part of an approved order from the
+        projected position of its ticker.
+
+        :param order: The OrderEvent previously approved.
+        :param int quantity: The unfilled quantity to release.
+        """
+        ticker = order.ticker
+        sign = 1 if order.buy_sell == 'BUY' else -1
+        pending = self._release(ticker, sign * quantity)
+        self._mark(ticker, self.filled.get(ticker, 0) + pending, self.prices.get(ticker, 0.0))
+
+    def update_corporate_action(self, event):
+        """
+        Scales the filled and pending units of the ticker of a split
+        by its ratio, truncated as the positions of the portfolio,
+        and marks them at the last price divided by the ratio.
+
+        :param event: The CorporateActionEvent.
+        """
+        ticker = event.ticker
+        if event.action != 'split' or ticker not in self.units:
+            return
+        filled = self.filled[ticker] = int(self.filled.get(ticker, 0) * event.value)
+        pending = self.pending[ticker] = int(self.pending.get(ticker, 0) * event.value)
+        self._mark(ticker, filled + pending, self.prices.get(ticker, 0.0) / event.value)
+
+    def _breaches(self, ticker, old_value, new_value):
+        """
+        Checks whether moving the market value of a ticker from
+        'old_value' to 'new_value' breaches any exposure limit.
+        Only increases of an exposure are considered breaches.
+        """
+        delta_gross = abs(new_value) - abs(old_value)
+        if self.max_symbol_exposure is not None:
+            if (abs(new_value) > self.max_symbol_exposure and
+                    abs(new_value) > abs(old_value)):
+                return True
+        if self.max_gross_exposure is not None and delta_gross > 0:
+            if self.gross_exposure + delta_gross > self.max_gross_exposure:
+                return True
+        if self.max_net_exposure is not None:
+            net = self.net_exposure + new_value - old_value
+            if (abs(net) > self.max_net_exposure and
+                    abs(net) > abs(self.net_exposure)):
+                return True
+        if self.max_sector_exposure is not None and delta_gross > 0:
+            sector = self.sectors.get(ticker)
+            if sector is not None:
+                exposure = self.sector_exposures.get(sector, 0.0)
+                if exposure + delta_gross > self.max_sector_exposure:
+                    return True
+        return False
+
+    def refine_orders(self, portfolio, sized_order):
+        """
+        Scales the order down to the maximum order value, then
+        rejects it if it breaches any of the exposure limits.
+        Approved orders are added to the projected positions.
+
+        :param portfolio: The Portfolio object generating the order.
+        :param sized_order: The OrderEvent returned by the PositionSizer.
+        :return: A list with the approved OrderEvent, or an empty
+                    list if the order was rejected.
+        """
+        ticker = sized_order.ticker
+        price = portfolio.latest_price(ticker)
+        if price is None or price <= 0 or not sized_order.quantity:
+            self.rejected_orders += 1
+            return []
+
+        if self.max_order_value is not None:
+            max_quantity = int(floor(self.max_order_value / price))
+            if sized_order.quantity > max_quantity:
+                sized_order.quantity = max_quantity
+            if sized_order.quantity <= 0:
+                self.rejected_orders += 1
+                return []
+
+        units = self.units.get(ticker, 0)
+        if self.prices.get(ticker) != price:
+            self._mark(ticker, units, price)
+
+        sign = 1 if sized_order.buy_sell == 'BUY' else -1
+        new_units = units + sign * sized_order.quantity
+        if self._breaches(ticker, units * price, new_units * price):
+            self.rejected_orders += 1
+            return []
+
+        self.pending[ticker] = self.pending.get(ticker, 0) + sign * sized_order.quantity
+        self._mark(ticker, new_units, price)
+        return [sized_order]
@@ -0,0 +1,255 @@
+import concurrent.futures
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+
+
+METHODS = ('block_bootstrap', 'shuffle', 'random_start')
+METRICS = ('total_return', 'max_drawdown', 'sharpe')
+
+
+def path_metrics(paths, periods=252):
+    """
+    Computes the metrics of a batch of paths of returns, one path
+    per row, starting from a wealth of 1.
+
+    :param paths: A 2D array of returns.
+    :param int periods: The number of returns per year.
+    :return: A dict of arrays, one value per path.
+    """
+    wealth = np.cumprod(1.0 + paths, axis=1)
+    peak = np.maximum(np.maximum.accumulate(wealth, axis=1), 1.0)
+    deviation = paths.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(
+            deviation > 0, np.sqrt(periods) * paths.mean(axis=1) / deviation, np.nan
+        )
+    return {
+        'total_return': wealth[:, -1] - 1.0,
+        'max_drawdown': (1.0 - wealth / peak).max(axis=1),
+        'sharpe': sharpe
+    }
+
+
+def resample_indices(rng, method, size, n, length, block_length):
+    """
+    Draws a (size, length) matrix of indices into n returns.
+
+    * 'block_bootstrap' concatenates blocks of 'block_length'
+      consecutive returns starting at random, wrapping around,
+    * 'shuffle' permutes the returns (length is then n),
+    * 'random_start' takes 'length' consecutive returns from a
+      random start.
+    """
+    if method == 'block_bootstrap':
+        blocks = -(-length // block_length)
+        starts = rng.integers(0, n, (size, blocks))
+        indices = (starts[:, :, None] + np.arange(block_length)) % n
+        return indices.reshape(size, blocks * block_length)[:, :length]
+    if method == 'shuffle':
+        return rng.permuted(np.tile(np.arange(n), (size, 1)), axis=1)
+    if method == 'random_start':
+        starts = rng.integers(0, n - length + 1, size)
+        return starts[:, None] + np.arange(length)
+    raise ValueError("Unknown resampling method %s." % method)
+
+
+def round_trips(fills):
+    """
+    Builds the round trips of the fills of a backtest: the trades of
+    a ticker from a flat position back to flat, a fill reversing the
+    position being split at zero (its commission pro rata). The
+    trades still open after the last fill are left out.
+
+    :param fills: The fills table of a ResultReader, or a list of
+                    FillEvents, in time order.
+    :return: A DataFrame of the ticker, close time and dollar P&L
+                    (net of commissions) of the round trips, in the
+                    order they were closed.
+    """
+    if isinstance(fills, pd.DataFrame):
+        rows = zip(
+            fills.index, fills['ticker'], fills['direction'], fills['quantity'],
+            fills['fill_cost'], fills['commission']
+        )
+    else:
+        rows = (
+            (f.timeindex, f.symbol, f.direction, f.quantity, f.fill_cost, f.commission)
+            for f in fills
+        )
+    positions = {}
+    cash = {}
+    trades = []
+    for time, ticker, direction, quantity, price, commission in rows:
+        sign = 1 if direction == 'BUY' else -1
+        position = positions.get(ticker, 0)
+        closing = min(quantity, abs(position)) if position * sign < 0 else 0
+        for part in (closing, quantity - closing):
+            if not part:
+                continue
+            cash[ticker] = cash.get(ticker, 0.0) - (
+                sign * part * price + commission * part / float(quantity)
+            )
+            position += sign * part
+            if position == 0:
+                trades.append((ticker, time, cash.pop(ticker)))
+        positions[ticker] = position
+    return pd.DataFrame(trades, columns=['ticker', 'time', 'pnl'])
+
+
+def trade_returns(fills, initial_capital=100000.0):
+    """
+    Returns the returns of the round trips of the fills, each P&L
+    over the equity before it (the initial capital plus the P&L of
+    the trades closed before), so that compounding the returns in
+    any order gives the same final equity.
+
+    :param fills: The fills, see round_trips().
+    :param float initial_capital: The initial capital of the backtest.
+    """
+    pnl = round_trips(fills)['pnl'].values
+    equity = initial_capital + np.concatenate([[0.0], np.cumsum(pnl)[:-1]])
+    return pnl / equity
+
+
+_worker_returns = None
+
+
+def _init_worker(returns):
+    global _worker_returns
+    _worker_returns = returns
+
+
+def _run_batch(task):
+    # Runs in the pool workers: a batch of paths is generated,
+    # summarised and discarded
+    seed, method, size, length, block_length, periods = task
+    rng = np.random.default_rng(seed)
+    indices = resample_indices(
+        rng, method, size, len(_worker_returns), length, block_length
+    )
+    return path_metrics(_worker_returns[indices], periods)
+
+
+class MonteCarlo(object):
+    """
+    MonteCarlo estimates the distribution of the return and the
+    drawdown of a strategy by resampling the returns of its equity
+    curve into many paths: block bootstrap of the returns, shuffles
+    of their order or windows starting at random dates. Shuffles are
+    meant for the returns of the round trips of the strategy, see
+    from_fills(): the final equity is then that of the backtest, and
+    only the order of the trades, hence the drawdown, varies.
+
+    Paths are generated and summarised in batches, many paths per
+    NumPy call, spread across a pool of worker processes. Only the
+    metrics of each path are kept, so that memory stays bounded by
+    the size of a batch in each worker whatever the number of paths.
+    The batches are seeded from a single seed, so that the results
+    do not depend on the number of workers.
+    """
+
+    def __init__(
+            self, returns, paths=10000, method='block_bootstrap',
+            block_length=20, length=None, batch_size=1000, seed=42,
+            periods=252, workers=None, start_method=None
+    ):
+        """
+        Initialises the analysis.
+
+        :param returns: The returns, or an equity curve DataFrame as
+                        returned by create_equity_curve_dataframe().
+        :param int paths: The number of resampled paths.
+        :param str method: 'block_bootstrap', 'shuffle' or 'random_start'.
+        :param int block_length: The length of the bootstrap blocks.
+        :param int length: The length of the paths, by default the
+                        number of returns, or half of it for random
+                        starts.
+        :param int batch_size: The number of paths per batch.
+        :param int seed: The seed of the random generators.
+        :param int periods: The number of returns per year.
+        :param int workers: The number of worker processes, by default
+                        the number of CPUs. With 1, the batches are run
+                        in the calling process.
+        :param str start_method: The multiprocessing start method.
+        """
+        if isinstance(returns, pd.DataFrame):
+            returns = returns['returns']
+        returns = np.asarray(returns, dtype=np.float64)
+        self.returns = returns[~np.isnan(returns)]
+        if method not in METHODS:
+            raise ValueError("Unknown resampling method %s." % method)
+        self.paths = paths
+        self.method = method
+        self.block_length = block_length
+        n = len(self.returns)
+        if method == 'shuffle':
+            length = n
+        elif length is None:
+            length = n // 2 if method == 'random_start' else n
+        self.length = min(length, n) if method == 'random_start' else length
+        self.batch_size = batch_size
+        self.seed = seed
+        self.periods = periods
+        self.workers = workers or os.cpu_count() or 1
+        self.start_method = start_method
+
+    @classmethod
+    def from_fills(cls, fills, initial_capital=100000.0, method='shuffle', **kwargs):
+        """
+        Initialises the analysis of the trade returns of a backtest,
+        shuffled by default, see trade_returns().
+
+        :param fills: The fills, see round_trips().
+        :param float initial_capital: The initial capital of the backtest.
+        :param str method: The resampling method.
+        """
+        return cls(trade_returns(fills, initial_capital), method=method, **kwargs)
+
+    def _tasks(self):
+        seeds = np.random.SeedSequence(self.seed).spawn(
+            -(-self.paths // self.batch_size)
+        )
+        for i, seed in enumerate(seeds):
+            size = min(self.batch_size, self.paths - i * self.batch_size)
+            yield (
+                seed, self.method, size, self.length,
+                self.block_length, self.periods
+            )
+
+    def run(self):
+        """
+        Generates and summarises the paths.
+
+        :return: A DataFrame of the metrics of every path.
+        """
+        tasks = list(self._tasks())
+        if self.workers == 1:
+            _init_worker(self.returns)
+            batches = [_run_batch(task) for task in tasks]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(self.workers, len(tasks)),
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker, initargs=(self.returns,)
+            ) as pool:
+                batches = list(pool.map(_run_batch, tasks))
+        return pd.DataFrame(dict(
+            (metric, np.concatenate([batch[metric] for batch in batches]))
+            for metric in METRICS
+        ))
+
+    def report(self, quantiles=(0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)):
+        """
+        Runs the analysis and reports the distribution of the metrics.
+
+        :param quantiles: The quantiles reported.
+        :return: A DataFrame of the quantiles (rows) of each metric
+                        (columns), along with their mean.
+        """
+        metrics = self.run()
+        report = metrics.quantile(list(quantiles))
+        report.loc['mean'] = metrics.mean()
+        return report
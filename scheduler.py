@@ -0,0 +1,276 @@
+import pandas as pd
+
+from event import TimerEvent
+
+
+class Timer(object):
+    """
+    A timer registered with the Scheduler, fired once at its
+    deadline or every 'interval' nanoseconds from it.
+    """
+
+    __slots__ = ('deadline', 'seq', 'callback', 'interval', 'name', 'cancelled')
+
+    def __init__(self, deadline, seq, callback, interval=None, name=None):
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.interval = interval
+        self.name = name
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Cancels the timer, which is dropped when its slot of the
+        wheel is reached.
+        """
+        self.cancelled = True
+
+
+def _nanoseconds(delta):
+    if isinstance(delta, int):
+        return delta
+    return pd.Timedelta(delta).value
+
+
+class Scheduler(object):
+    """
+    The Scheduler fires one-shot and periodic callbacks in timestamp
+    order with the market data, e.g. end-of-day marking, scheduled
+    rebalances or good-till-time order expiries.
+
+    Timers are kept in a hierarchical timer wheel of 'levels' levels
+    of 256 slots over ticks of 'resolution': a timer is stored at the
+    level of the highest 8-bit digit in which its deadline differs
+    from the current tick, in the slot of that digit. Registering a
+    timer is a constant time insertion, and when the wheel advances
+    each timer is cascaded down at most once per level before it
+    fires, whatever the number of pending timers. A bitmap of the
+    occupied slots per level lets the wheel jump over empty spans of
+    time, such as nights between daily bars.
+
+    With a simulated clock (the default), time advances with the
+    market events given to update_market(), the timers due at or
+    before an event firing before the event is handled by the other
+    components. With a wall clock, e.g. pd.Timestamp.utcnow, time
+    advances whenever poll() is called. Timers due at the same time
+    fire in the order of registration, and cancelled timers are
+    dropped lazily.
+    """
+
+    SLOT_BITS = 8
+    SLOTS = 1 << SLOT_BITS
+
+    def __init__(self, clock=None, resolution='1ms', start=None, levels=8):
+        """
+        Initialises the scheduler.
+
+        :param clock: An optional callable returning the current wall
+                        clock time, the clock being simulated otherwise.
+        :param resolution: The duration of a tick of the wheel, the
+                        timers of a tick being ordered by deadline.
+        :param start: The initial time, by default the time of the
+                        first market event (or the wall clock).
+        :param int levels: The number of levels of the wheel, 8 levels
+                        covering any 64-bit time.
+        """
+        self.clock = clock
+        self.resolution = _nanoseconds(resolution)
+        self.levels = levels
+        self.slots = [dict() for _ in range(levels)]
+        self.bitmaps = [0] * levels
+        self.tick = None
+        self.now = None
+        self.tz = None
+        self.seq = 0
+        self.pending = 0
+        if start is None and clock is not None:
+            start = clock()
+        if start is not None:
+            self._start(self._to_ns(start))
+
+    def __len__(self):
+        return self.pending
+
+    def _to_ns(self, time):
+        time = pd.Timestamp(time)
+        if self.tz is None and time.tz is not None:
+            self.tz = time.tz
+        return time.value
+
+    def _to_time(self, ns):
+        if self.tz is None:
+            return pd.Timestamp(ns)
+        return pd.Timestamp(ns, tz='UTC').tz_convert(self.tz)
+
+    def _start(self, ns):
+        self.now = ns
+        self.tick = ns // self.resolution
+
+    def _insert(self, timer):
+        tick = max(timer.deadline // self.resolution, self.tick)
+        level = ((tick ^ self.tick).bit_length() - 1) >> 3 if tick != self.tick else 0
+        if level >= self.levels:
+            raise ValueError('Timer beyond the range of the wheel')
+        slot = (tick >> (level * self.SLOT_BITS)) & (self.SLOTS - 1)
+        timers = self.slots[level].get(slot)
+        if timers is None:
+            self.slots[level][slot] = [timer]
+            self.bitmaps[level] |= 1 << slot
+        else:
+            timers.append(timer)
+
+    def _register(self, deadline, callback, interval, name):
+        if self.tick is None:
+            self._start(deadline)
+        self.seq += 1
+        timer = Timer(deadline, self.seq, callback, interval, name)
+        self._insert(timer)
+        self.pending += 1
+        return timer
+
+    def schedule(self, time, callback, name=None):
+        """
+        Registers a one-shot timer.
+
+        :param time: The deadline of the timer.
+        :param callback: The callable the TimerEvent is passed to.
+        :param name: An optional name carried by the TimerEvent.
+        :return: The Timer.
+        """
+        return self._register(self._to_ns(time), callback, None, name)
+
+    def schedule_in(self, delay, callback, name=None):
+        """
+        Registers a one-shot timer 'delay' after the current time.
+        """
+        if self.now is None:
+            raise ValueError('The scheduler has not started yet')
+        return self._register(self.now + _nanoseconds(delay), callback, None, name)
+
+    def schedule_every(self, interval, callback, start=None, name=None):
+        """
+        Registers a periodic timer, firing every 'interval' from
+        'start' (by default the current time plus 'interval').
+
+        :param interval: The period, e.g. '10min' or a pd.Timedelta.
+        :param callback: The callable the TimerEvents are passed to.
+        :param start: The first deadline.
+        :param name: An optional name carried by the TimerEvents.
+        :return: The Timer, whose cancel() stops the timer.
+        """
+        interval = _nanoseconds(interval)
+        if interval <= 0:
+            raise ValueError('The interval must be positive')
+        if start is not None:
+            deadline = self._to_ns(start)
+        elif self.now is not None:
+            deadline = self.now + interval
+        else:
+            raise ValueError('The scheduler has not started yet')
+        return self._register(deadline, callback, interval, name)
+
+    def _fire(self, timers):
+        for timer in sorted(timers, key=lambda t: (t.deadline, t.seq)):
+            if timer.cancelled:
+                self.pending -= 1
+                continue
+            if timer.interval is None:
+                self.pending -= 1
+            self.now = max(self.now, timer.deadline)
+            timer.callback(TimerEvent(self._to_time(timer.deadline), timer.name, timer))
+            if timer.interval is not None:
+                if timer.cancelled:
+                    self.pending -= 1
+                else:
+                    timer.deadline += timer.interval
+                    self._insert(timer)
+
+    def advance(self, time):
+        """
+        Advances the current time, firing the timers due at or
+        before it in deadline order.
+
+        :param time: The new current time.
+        """
+        target = self._to_ns(time)
+        if self.tick is None:
+            self._start(target)
+        if target < self.now:
+            return
+        target_tick = target // self.resolution
+        while True:
+            level = 0
+            while level < self.levels and not self.bitmaps[level]:
+                level += 1
+            if level == self.levels:
+                break
+            bitmap = self.bitmaps[level]
+            slot = (bitmap & -bitmap).bit_length() - 1
+            shift = level * self.SLOT_BITS
+            tick = (self.tick >> (shift + self.SLOT_BITS) << (shift + self.SLOT_BITS)) | (slot << shift)
+            if tick > target_tick:
+                break
+
+            timers = self.slots[level][slot]
+            if level > 0:
+                # Cascade the timers of the slot down the wheel
+                del self.slots[level][slot]
+                self.bitmaps[level] &= ~(1 << slot)
+                self.tick = tick
+                for timer in timers:
+                    if timer.cancelled:
+                        self.pending -= 1
+                    else:
+                        self._insert(timer)
+                continue
+
+            if tick == target_tick:
+                due = [timer for timer in timers if timer.deadline <= target]
+                if not due:
+                    break
+                timers = [timer for timer in timers if timer.deadline > target]
+            else:
+                due = timers
+                timers = None
+            if timers:
+                self.slots[0][slot] = timers
+            else:
+                del self.slots[0][slot]
+                self.bitmaps[0] &= ~(1 << slot)
+            self.tick = tick
+            self._fire(due)
+        self.tick = target_tick
+        self.now = target
+
+    def next_deadline(self):
+        """
+        Returns the deadline of the next timer, or None. As the
+        timers of lower levels and slots are due earlier, only the
+        earliest occupied slot is searched.
+        """
+        for level in range(self.levels):
+            for slot in sorted(self.slots[level]):
+                deadlines = [
+                    timer.deadline for timer in self.slots[level][slot]
+                    if not timer.cancelled
+                ]
+                if deadlines:
+                    return self._to_time(min(deadlines))
+        return None
+
+    def update_market(self, event):
+        """
+        Advances a simulated clock to the time of a market event.
+        Called by the Backtest before the event is handled.
+        """
+        if self.clock is None:
+            self.advance(event.time)
+
+    def poll(self):
+        """
+        Advances a wall clock to the current time. Called by the
+        Backtest every time market data is streamed.
+        """
+        if self.clock is not None:
+            self.advance(self.clock())
@@ -1,5 +1,9 @@
+import queue
+
 from abc import ABCMeta, abstractmethod
 
+from event import EventType
+
 
 class AbstractStrategy(object):
     """
@@ -12,10 +16,23 @@ class AbstractStrategy(object):
 
     This is designed to work both with historic and live data as
     the Strategy object is agnostic to the data source.
+
+    A strategy can declare the tickers and the event types it is
+    interested in, with 'subscribed_tickers' and 'subscribed_events',
+    so that a Strategies collection only calls it for those events.
+    None (the default) subscribes to every ticker or event type.
+
+    Within a Strategies collection, the signals of a strategy are
+    tagged with its 'strategy_id', by default its position in the
+    collection.
     """
 
     __metaclass__ = ABCMeta
 
+    subscribed_tickers = None
+    subscribed_events = None
+    strategy_id = None
+
     @abstractmethod
     def calculate_signals(self, event):
         """
@@ -24,14 +41,142 @@ class AbstractStrategy(object):
         """
         raise NotImplementedError("Should implement calculate_signals()")
 
+    def get_state(self):
+        """
+        Returns the state of the strategy needed to resume a
+        session. By default this is a copy of every attribute
+        but the events queue, which is checkpointed separately.
+        Strategies holding unpicklable attributes should override
+        this method along with set_state().
+        :return:
+        """
+        return dict(
+            (k, v) for k, v in self.__dict__.items()
+            if not isinstance(v, (queue.Queue, StrategyQueue))
+        )
+
+    def set_state(self, state):
+        """
+        Restores the state returned by get_state().
+        :param state:
+        :return:
+        """
+        self.__dict__.update(state)
+
+
+class StrategyQueue(object):
+    """
+    StrategyQueue stands for the events queue of a strategy within
+    a Strategies collection, tagging the signals put onto it with the
+    strategy_id of the strategy (unless already tagged), so that the
+    orders and fills they lead to can be told apart, e.g. by the
+    NettingExecutionHandler. Everything else is left to the queue.
+    """
+
+    def __init__(self, events_queue, strategy_id):
+        """
+        :param events_queue: The Queue of Event objects.
+        :param strategy_id: The identifier of the strategy.
+        """
+        self.events_queue = events_queue
+        self.strategy_id = strategy_id
+
+    def put(self, event, block=True, timeout=None):
+        if event.type == EventType.SIGNAL and event.strategy_id is None:
+            event.strategy_id = self.strategy_id
+        self.events_queue.put(event, block, timeout)
+
+    def __getattr__(self, name):
+        if name == 'events_queue':
+            raise AttributeError(name)
+        return getattr(self.events_queue, name)
+
+
+def queue_attributes(strategy):
+    """
+    Returns the names of the attributes of a strategy holding an
+    events queue, or the StrategyQueue standing for it.
+    """
+    return [
+        k for k, v in strategy.__dict__.items()
+        if isinstance(v, (queue.Queue, StrategyQueue))
+    ]
+
 
 class Strategies(AbstractStrategy):
     """
     Strategies is a collection of strategy
+
+    Events are routed through an index of the strategies subscribed
+    to each (event type, ticker) pair, so that the cost of dispatching
+    an event is proportional to the number of strategies interested
+    in it. Within a route, strategies keep their order in the
+    collection, wildcard subscribers included.
+
+    The index is built from the subscriptions declared when the
+    collection is created: call rebuild_index() after changing them.
+
+    The events queue of each strategy is replaced by a StrategyQueue
+    tagging its signals with the strategy_id of the strategy, or its
+    position in the collection if it has none.
     """
     def __init__(self, *strategies):
         self._lst_strategies = strategies
+        self._strategy_ids = []
+        for position, strategy in enumerate(strategies):
+            strategy_id = strategy.strategy_id
+            if strategy_id is None:
+                strategy_id = position
+            self._strategy_ids.append(strategy_id)
+            for attribute in queue_attributes(strategy):
+                events_queue = getattr(strategy, attribute)
+                if isinstance(events_queue, queue.Queue):
+                    setattr(strategy, attribute, StrategyQueue(events_queue, strategy_id))
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        """
+        Builds the ticker index of the subscriptions, from which the
+        routes of each (event type, ticker) pair are derived.
+        """
+        self._by_ticker = {}
+        self._wildcards = []
+        for position, strategy in enumerate(self._lst_strategies):
+            if strategy.subscribed_tickers is None:
+                self._wildcards.append(position)
+            else:
+                for ticker in strategy.subscribed_tickers:
+                    self._by_ticker.setdefault(ticker, []).append(position)
+        self._routes = {}
+
+    def _route(self, event_type, ticker):
+        """
+        Returns the strategies subscribed to an (event type, ticker)
+        pair, in collection order, and caches the route.
+        """
+        positions = self._wildcards
+        if ticker is not None:
+            positions = sorted(self._wildcards + self._by_ticker.get(ticker, []))
+        route = tuple(
+            self._lst_strategies[p] for p in positions
+            if self._lst_strategies[p].subscribed_events is None or
+            event_type in self._lst_strategies[p].subscribed_events
+        )
+        self._routes[(event_type, ticker)] = route
+        return route
 
     def calculate_signals(self, event):
-        for strategy in self._lst_strategies:
-            strategy.calculate_signals(event)
\ No newline at end of file
+        ticker = getattr(event, 'ticker', None)
+        route = self._routes.get((event.type, ticker))
+        if route is None:
+            route = self._route(event.type, ticker)
+        for strategy in route:
+            strategy.calculate_signals(event)
+
+    def get_state(self):
+        return [strategy.get_state() for strategy in self._lst_strategies]
+
+    def set_state(self, state):
+        for strategy, strategy_state in zip(self._lst_strategies, state):
+            strategy.set_state(strategy_state)
+        self.rebuild_index()
@@ -0,0 +1,209 @@
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import queue
+
+import numpy as np
+import pandas as pd
+
+from price_handler.shared_bar import SharedBarPriceHandler
+
+
+def parameter_grid(**values):
+    """
+    Returns the list of every combination of parameter values,
+    e.g. parameter_grid(short=[10, 20], long=[50, 100]).
+
+    :return: A list of dicts of parameters.
+    """
+    names = sorted(values)
+    return [
+        dict(zip(names, combination))
+        for combination in itertools.product(*[values[name] for name in names])
+    ]
+
+
+def summary_statistics(equity_curve, periods=252):
+    """
+    Computes the summary statistics of an equity curve, as
+    returned by Backtest.simulate_trading().
+
+    :param equity_curve: The equity curve DataFrame.
+    :param int periods: The number of bars per year.
+    :return: A dict of statistics.
+    """
+    total = equity_curve['total'].values
+    returns = equity_curve['returns'].values[1:]
+    deviation = np.std(returns, ddof=1) if len(returns) > 1 else 0.0
+    sharpe = np.nan
+    if deviation > 0:
+        sharpe = np.sqrt(periods) * np.mean(returns) / deviation
+    drawdown = 1.0 - total / np.maximum.accumulate(total)
+    return {
+        'total_return': total[-1] / total[0] - 1.0,
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.max(),
+        'commission': equity_curve['commission'].values[-1]
+    }
+
+
+_worker_data = None
+_worker_create_backtest = None
+
+
+def _init_worker(data, create_backtest):
+    global _worker_data, _worker_create_backtest
+    _worker_data = data
+    _worker_create_backtest = create_backtest
+
+
+def _run_backtest(data, create_backtest, parameters, start_date=None, end_date=None):
+    """
+    Runs one backtest over the shared data and returns its
+    equity curve.
+    """
+    events_queue = queue.Queue()
+    price_handler = SharedBarPriceHandler(
+        data, events_queue, start_date=start_date, end_date=end_date
+    )
+    backtest = create_backtest(price_handler, events_queue, **parameters)
+    return backtest.simulate_trading()
+
+
+def _run_task(task):
+    # Runs in the pool workers, on the data attached once per worker
+    parameters, start_date, end_date, keep_curve = task
+    try:
+        curve = _run_backtest(
+            _worker_data, _worker_create_backtest, parameters, start_date, end_date
+        )
+    except Exception as e:
+        return {'error': '%s: %s' % (type(e).__name__, e)}, None
+    return summary_statistics(curve), curve if keep_curve else None
+
+
+class ParameterSweep(object):
+    """
+    ParameterSweep runs the same backtest over many sets of
+    parameters on a pool of worker processes, and gathers their
+    summary statistics into a single results table.
+
+    The market data is loaded and converted once into a
+    SharedBarData, which every worker attaches to when it starts:
+    each run then only receives its parameters and streams the
+    shared data through its own SharedBarPriceHandler.
+
+    The backtest of a run is built by 'create_backtest', a module
+    level function (so that it can be sent to the workers) called
+    as create_backtest(price_handler, events_queue, **parameters)
+    and returning a Backtest.
+    """
+
+    def __init__(
+            self, data, create_backtest, workers=None,
+            progress=None, start_method=None, cache=None
+    ):
+        """
+        Initialises the sweep.
+
+        :param data: The SharedBarData of the market data.
+        :param create_backtest: The function creating the Backtest
+                        of a set of parameters.
+        :param int workers: The number of worker processes, by default
+                        the number of CPUs. With 1, the runs are carried
+                        out in the calling process.
+        :param progress: An optional function called as
+                        progress(completed, total, parameters) after
+                        each run.
+        :param str start_method: The multiprocessing start method,
+                        by default the platform default.
+        :param cache: An optional ResultCache of the runs, only the
+                        runs missing from it being carried out.
+        """
+        self.data = data
+        self.create_backtest = create_backtest
+        self.workers = workers or os.cpu_count() or 1
+        self.progress = progress
+        self.start_method = start_method
+        self.cache = cache
+
+    def _report(self, completed, total, parameters):
+        if self.progress is not None:
+            self.progress(completed, total, parameters)
+
+    def map(self, tasks):
+        """
+        Runs a backtest per task, on the pool of workers.
+
+        :param tasks: A list of (parameters, start_date, end_date,
+                        keep_curve) tuples, the backtest of a task only
+                        streaming the bars from 'start_date' included
+                        to 'end_date' excluded.
+        :return: The list of (summary statistics, equity curve or None)
+                        of the tasks, in the order of the list.
+        """
+        tasks = list(tasks)
+        results = [None] * len(tasks)
+        keys = {}
+        if self.cache is not None:
+            for i, task in enumerate(tasks):
+                keys[i] = self.cache.task_key(self.data, self.create_backtest, *task[:3])
+                cached = self.cache.lookup(keys[i])
+                if cached is not None:
+                    curve, statistics = cached
+                    results[i] = statistics, curve if task[3] else None
+        # The curves of the runs are kept to be cached
+        pending = [
+            (i, task if self.cache is None else tuple(task[:3]) + (True,))
+            for i, task in enumerate(tasks) if results[i] is None
+        ]
+        if self.workers == 1:
+            _init_worker(self.data, self.create_backtest)
+            for completed, (i, task) in enumerate(pending, 1):
+                results[i] = _run_task(task)
+                self._report(completed, len(pending), task[0])
+        elif pending:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(self.workers, len(pending)),
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.data, self.create_backtest)
+            ) as pool:
+                futures = dict(
+                    (pool.submit(_run_task, task), i)
+                    for i, task in pending
+                )
+                for completed, future in enumerate(
+                        concurrent.futures.as_completed(futures), 1
+                ):
+                    i = futures[future]
+                    results[i] = future.result()
+                    self._report(completed, len(pending), tasks[i][0])
+
+        if self.cache is not None:
+            for i, _ in pending:
+                statistics, curve = results[i]
+                if 'error' not in statistics:
+                    self.cache.store(keys[i], curve, statistics)
+                    results[i] = statistics, curve if tasks[i][3] else None
+
+        for task, (result, _) in zip(tasks, results):
+            if 'error' in result:
+                print("Backtest with parameters %s failed: %s" % (task[0], result['error']))
+        return results
+
+    def run(self, parameters):
+        """
+        Runs a backtest per set of parameters over the whole data.
+
+        :param parameters: A list of dicts of parameters, e.g. from
+                        parameter_grid().
+        :return: A DataFrame with a row of parameters and summary
+                        statistics per run, in the order of the list.
+        """
+        parameters = list(parameters)
+        results = self.map((p, None, None, False) for p in parameters)
+        return pd.DataFrame([
+            dict(p, **result) for p, (result, _) in zip(parameters, results)
+        ])
@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class SymbolRegistry(object):
+    """
+    SymbolRegistry interns ticker symbols into dense integer ids,
+    0, 1, 2... in order of first use, so that the components can keep
+    per-ticker data in NumPy arrays indexed by the id carried by the
+    events, the string name remaining available for display and I/O.
+
+    Ids are only meaningful within a process: events unpickled in
+    another process are interned again by name.
+    """
+
+    def __init__(self):
+        self.symbol_ids = {}
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, ticker):
+        return ticker in self.symbol_ids
+
+    def intern(self, ticker):
+        """
+        Returns the id of a ticker, registering it on first use.
+
+        :param str ticker: The ticker symbol, e.g. 'GOOG'.
+        :return: The integer id, or None for a None ticker.
+        """
+        symbol_id = self.symbol_ids.get(ticker)
+        if symbol_id is None:
+            if ticker is None:
+                return None
+            symbol_id = self.symbol_ids[ticker] = len(self.names)
+            self.names.append(ticker)
+        return symbol_id
+
+    def name(self, symbol_id):
+        return self.names[symbol_id]
+
+    def ids(self, tickers):
+        """
+        Returns the ids of tickers as an array, e.g. to gather the
+        values of a list of tickers from a SymbolArray.
+        """
+        return np.array([self.intern(ticker) for ticker in tickers], dtype=np.intp)
+
+
+# The registry of the process, used by the events
+SYMBOLS = SymbolRegistry()
+
+
+def symbol_id(ticker):
+    return SYMBOLS.intern(ticker)
+
+
+class SymbolArray(object):
+    """
+    A NumPy array of a value per symbol id, growing (by doubling)
+    as new symbols are interned, the values of the symbols not set
+    being 'fill'.
+    """
+
+    def __init__(self, dtype=np.float64, fill=np.nan, capacity=64):
+        self.dtype = dtype
+        self.fill = fill
+        self.values = np.full(capacity, fill, dtype=dtype)
+
+    def _grow(self, size):
+        capacity = len(self.values)
+        while capacity < size:
+            capacity *= 2
+        values = np.full(capacity, self.fill, dtype=self.dtype)
+        values[:len(self.values)] = self.values
+        self.values = values
+
+    def __getitem__(self, ids):
+        """
+        Returns the value of a symbol id, or the values of an array
+        of symbol ids.
+        """
+        if np.isscalar(ids):
+            if ids >= len(self.values):
+                return self.fill
+            return self.values[ids]
+        if len(ids) and ids.max() >= len(self.values):
+            self._grow(ids.max() + 1)
+        return self.values[ids]
+
+    def __setitem__(self, symbol_id, value):
+        if symbol_id >= len(self.values):
+            self._grow(symbol_id + 1)
+        self.values[symbol_id] = value
@@ -0,0 +1,112 @@
+"""
+Strategies, backtests and market data shared by the tests.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtest import Backtest
+from event import EventType, SignalEvent
+from execution import SimulatedExecutionHandler
+from portfolio import NaivePortfolio
+from strategy import AbstractStrategy, Strategies
+
+
+class CrashError(Exception):
+    pass
+
+
+class AlternatingStrategy(AbstractStrategy):
+    """
+    Enters a position every 'period' bars of a ticker and exits
+    it 'period' bars later, alternating between long and short.
+    """
+    def __init__(self, ticker, events_queue, period, crash_at=None):
+        self.ticker = ticker
+        self.events_queue = events_queue
+        self.period = period
+        self.crash_at = crash_at
+        self.bars = 0
+        self.invested = False
+        self.long = True
+
+    def calculate_signals(self, event):
+        if event.type != EventType.BAR or event.ticker != self.ticker:
+            return
+        if self.crash_at is not None and self.bars == self.crash_at:
+            raise CrashError()
+        self.bars += 1
+        if self.bars % self.period:
+            return
+        if self.invested:
+            self.events_queue.put(SignalEvent(self.ticker, 'EXIT'))
+            self.long = not self.long
+        else:
+            buy_sell = 'BUY' if self.long else 'SELL'
+            self.events_queue.put(SignalEvent(self.ticker, buy_sell, 10))
+        self.invested = not self.invested
+
+
+class PeriodicStrategy(AbstractStrategy):
+    """
+    Enters a long position on a ticker every 'period' bars and
+    exits it 'period' bars later.
+    """
+    def __init__(self, ticker, events_queue, period):
+        self.subscribed_tickers = [ticker]
+        self.ticker = ticker
+        self.events_queue = events_queue
+        self.period = period
+        self.bars = 0
+        self.invested = False
+
+    def calculate_signals(self, event):
+        self.bars += 1
+        if self.bars % self.period:
+            return
+        if self.invested:
+            self.events_queue.put(SignalEvent(self.ticker, 'EXIT'))
+        else:
+            self.events_queue.put(SignalEvent(self.ticker, 'BUY', 10))
+        self.invested = not self.invested
+
+
+def create_backtest(price_handler, events_queue, aaa_period, bbb_period):
+    strategy = Strategies(
+        PeriodicStrategy('AAA', events_queue, aaa_period),
+        PeriodicStrategy('BBB', events_queue, bbb_period)
+    )
+    portfolio = NaivePortfolio(price_handler, events_queue, None)
+    execution_handler = SimulatedExecutionHandler(events_queue, price_handler)
+    return Backtest(
+        price_handler, strategy, portfolio, execution_handler, events_queue
+    )
+
+
+def write_random_walk_csvs(csv_dir, tickers, periods, seed, select=None):
+    """
+    Writes the daily bars of a random walk of the close price for
+    each ticker, from 2017-01-02, as Yahoo CSV files of csv_dir.
+
+    :param csv_dir: The directory of the CSV files.
+    :param tickers: The tickers, drawn in order from the seed.
+    :param int periods: The number of business days.
+    :param int seed: The seed of the random walks.
+    :param dict select: Optional functions of ticker selecting the
+                    rows written, e.g. to start late or skip dates.
+    :return: The dates of the bars.
+    """
+    dates = pd.bdate_range('2017-01-02', periods=periods)
+    rnd = np.random.RandomState(seed)
+    for ticker in tickers:
+        close = 100.0 + np.cumsum(rnd.normal(0, 1, len(dates)))
+        data = pd.DataFrame({
+            'Date': dates, 'Open': close, 'High': close + 1.0,
+            'Low': close - 1.0, 'Close': close, 'Adj Close': close,
+            'Volume': 1000
+        })
+        if select is not None and ticker in select:
+            data = select[ticker](data)
+        data.to_csv(os.path.join(csv_dir, '%s.csv' % ticker), index=False)
+    return dates
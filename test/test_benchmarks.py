@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from benchmarks.pipeline import compare, run_bars
+from benchmarks.synthetic import generate_bars, generate_ticks
+
+
+class TestBenchmarks(TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_generate_bars(self):
+        first = os.path.join(self.data_dir, 'first')
+        second = os.path.join(self.data_dir, 'second')
+        os.mkdir(first)
+        os.mkdir(second)
+        self.assertEqual(generate_bars(first, tickers=2, years=1), ['T0000', 'T0001'])
+        generate_bars(second, tickers=3, years=1)
+        for ticker in ('T0000', 'T0001'):
+            with open(os.path.join(first, '%s.csv' % ticker)) as f, \
+                    open(os.path.join(second, '%s.csv' % ticker)) as g:
+                self.assertEqual(f.read(), g.read())
+        bars = pd.read_csv(os.path.join(first, 'T0000.csv'))
+        self.assertEqual(len(bars), 252)
+        self.assertTrue((bars['High'] >= bars[['Open', 'Close']].max(axis=1)).all())
+        self.assertTrue((bars['Low'] <= bars[['Open', 'Close']].min(axis=1)).all())
+
+    def test_generate_ticks(self):
+        path = os.path.join(self.data_dir, 'ticks.jsonl')
+        generate_ticks(path, instruments=3, ticks=100)
+        with open(path) as f:
+            ticks = [json.loads(line)['tick'] for line in f]
+        self.assertEqual(len(ticks), 100)
+        self.assertTrue(all(t['bid'] < t['ask'] for t in ticks))
+        times = [t['time'] for t in ticks]
+        self.assertEqual(times, sorted(times))
+
+    def test_run_bars(self):
+        tickers = generate_bars(self.data_dir, tickers=3, years=1)
+        stages = run_bars(self.data_dir, tickers, max_events=500)
+        self.assertEqual(list(stages), [
+            'csv_load', 'merge', 'stream_next', 'dispatch',
+            'update_timeindex', 'update_fill', 'equity_curve'
+        ])
+        self.assertEqual(stages['csv_load']['events'], 756)
+        self.assertEqual(stages['stream_next']['events'], 500)
+        for stage in stages.values():
+            self.assertGreater(stage['events_per_sec'], 0)
+            self.assertGreater(stage['peak_rss_mb'], 0)
+
+        comparison = compare(
+            {'stages': {'merge': {'events_per_sec': 100.0}}},
+            {'stages': {'merge': {'events_per_sec': 50.0}, 'dispatch': {}}}
+        )
+        self.assertEqual(comparison, {'merge': {'ratio': 0.5, 'regression': True}})
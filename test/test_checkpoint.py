@@ -0,0 +1,91 @@
+import os
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pandas.testing import assert_frame_equal
+
+from backtest import Backtest
+from checkpoint import Checkpointer
+from event import OrderEvent
+from execution import SimulatedExecutionHandler
+from portfolio import NaivePortfolio
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from price_parser import PriceParser
+from risk_manager.exposure import ExposureRiskManager
+
+from helpers import AlternatingStrategy, CrashError, write_random_walk_csvs
+
+
+class TestCheckpointer(TestCase):
+
+    def setUp(self):
+        self.csv_dir = tempfile.mkdtemp()
+        self.tickers = ['AAA', 'BBB']
+        write_random_walk_csvs(self.csv_dir, self.tickers, 60, 42)
+        self.path = os.path.join(self.csv_dir, 'backtest.ckpt')
+
+    def tearDown(self):
+        shutil.rmtree(self.csv_dir)
+
+    def create_backtest(self, crash_at=None, checkpointer=None, risk_manager=None):
+        events_queue = queue.Queue()
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, self.tickers
+        )
+        strategy = AlternatingStrategy('AAA', events_queue, 7, crash_at)
+        portfolio = NaivePortfolio(
+            price_handler, events_queue, None, risk_manager=risk_manager
+        )
+        execution_handler = SimulatedExecutionHandler(
+            events_queue, price_handler, risk_manager=risk_manager
+        )
+        return Backtest(
+            price_handler, strategy, portfolio, execution_handler,
+            events_queue, checkpointer=checkpointer
+        )
+
+    def test_resume(self):
+        expected = self.create_backtest().simulate_trading()
+
+        checkpointer = Checkpointer(self.path, frequency=9, compact_every=3)
+        backtest = self.create_backtest(crash_at=45, checkpointer=checkpointer)
+        self.assertRaises(CrashError, backtest.simulate_trading)
+
+        # Simulate a crash while writing the last checkpoint
+        with open(self.path, 'ab') as f:
+            f.write(b'\x00' * 11)
+
+        checkpointer = Checkpointer(self.path, frequency=9, compact_every=3)
+        backtest = self.create_backtest(checkpointer=checkpointer)
+        self.assertTrue(checkpointer.restore(backtest))
+        self.assertEqual(checkpointer.iterations, 90)
+        self.assertEqual(backtest.price_handler.bar_index, 90)
+        self.assertEqual(backtest.strategy.bars, 45)
+        backtest.strategy.crash_at = None
+        actual = backtest.simulate_trading()
+        assert_frame_equal(expected, actual)
+        self.assertNotEqual(expected['total'].iloc[-1], 100000.0)
+
+    def test_restore_without_checkpoint(self):
+        backtest = self.create_backtest()
+        self.assertFalse(Checkpointer(self.path).restore(backtest))
+
+    def test_restore_then_cancel(self):
+        backtest = self.create_backtest(risk_manager=ExposureRiskManager())
+        backtest.price_handler.stream_next()
+        order = OrderEvent('AAA', 'BUY', 100, 'LMT', PriceParser.parse(1.0))
+        [order] = backtest.portfolio.risk_manager.refine_orders(backtest.portfolio, order)
+        backtest.execution_handler.execute_order(order)
+        Checkpointer(self.path).save(backtest)
+
+        risk_manager = ExposureRiskManager()
+        backtest = self.create_backtest(risk_manager=risk_manager)
+        self.assertTrue(Checkpointer(self.path).restore(backtest))
+        self.assertIs(backtest.portfolio.risk_manager, risk_manager)
+        self.assertEqual(risk_manager.pending['AAA'], 100)
+        [resting] = backtest.execution_handler.books['AAA'].buy_limits.best_level()
+        self.assertEqual(backtest.execution_handler.cancel_order(resting), 100)
+        self.assertEqual((risk_manager.pending['AAA'], risk_manager.units['AAA']), (0, 0))
+        self.assertAlmostEqual(risk_manager.gross_exposure, 0.0)
@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+from unittest import TestCase
+
+from conflating_queue import ConflatingQueue
+from event import FillEvent, OrderEvent, SignalEvent, TickEvent
+
+
+def tick(ticker, bid):
+    return TickEvent(ticker, None, bid, bid + 1)
+
+
+class TestConflatingQueue(TestCase):
+
+    def test_conflation(self):
+        events = ConflatingQueue()
+        events.put(tick('EUR_USD', 1))
+        events.put(SignalEvent('EUR_USD', 'BUY'))
+        events.put(tick('GBP_USD', 10))
+        events.put(tick('EUR_USD', 2))
+        events.put(OrderEvent('EUR_USD', 'BUY', 100, 'MKT'))
+        events.put(tick('EUR_USD', 3))
+        self.assertEqual(events.qsize(), 4)
+        self.assertEqual(len(events.queue), 4)
+
+        first = events.get()
+        self.assertEqual((first.ticker, first.bid), ('EUR_USD', 3))
+        self.assertEqual(events.get().typename, 'SIGNAL')
+        self.assertEqual(events.get().bid, 10)
+        self.assertEqual(events.get().typename, 'ORDER')
+        events.put(tick('EUR_USD', 4))
+        self.assertEqual(events.get(False).bid, 4)
+        self.assertRaises(queue.Empty, events.get, False)
+        self.assertEqual(events.metrics(), {
+            'size': 0, 'high_water': 4, 'puts': 7, 'conflated': 2, 'dropped': 0
+        })
+
+    def test_overflow(self):
+        events = ConflatingQueue(maxsize=2, overflow='drop_oldest')
+        events.put(tick('A', 1))
+        events.put(tick('B', 1))
+        events.put(tick('C', 1))
+        events.put(tick('B', 2))
+        events.put(FillEvent(None, 'A', 'ARCA', 100, 'BUY', 1.0, 0.0))
+        self.assertEqual(
+            [(e.typename, getattr(e, 'ticker', None)) for e in events.queue],
+            [('TICK', 'B'), ('TICK', 'C'), ('FILL', None)]
+        )
+        self.assertEqual(events.dropped, 1)
+        self.assertEqual(events.conflated, 1)
+
+        events = ConflatingQueue(maxsize=1, overflow='drop_newest')
+        events.put(tick('A', 1))
+        events.put(tick('B', 1))
+        events.put(tick('A', 2))
+        self.assertEqual([e.ticker for e in events.queue], ['A'])
+        self.assertEqual(events.dropped, 1)
+        self.assertRaises(ValueError, ConflatingQueue, 1, 'drop')
+
+    def test_block(self):
+        events = ConflatingQueue(maxsize=1)
+        events.put(tick('A', 1))
+        events.put(tick('A', 2), timeout=0.01)
+        self.assertRaises(queue.Full, events.put, tick('B', 1), timeout=0.01)
+
+        def consume():
+            time.sleep(0.05)
+            events.get()
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        events.put(tick('B', 2), timeout=5.0)
+        consumer.join()
+        self.assertEqual([e.ticker for e in events.queue], ['B'])
+
+    def test_control_events(self):
+        # Control events never wait for the consumer, which puts them
+        for overflow in ('block', 'drop_oldest', 'drop_newest'):
+            events = ConflatingQueue(maxsize=1, overflow=overflow)
+            events.put(tick('A', 1))
+            events.put(SignalEvent('A', 'BUY'), block=False)
+            events.put(OrderEvent('A', 'BUY', 100, 'MKT'), timeout=0.01)
+            events.put(FillEvent(None, 'A', 'ARCA', 100, 'BUY', 1, 0), block=False)
+            self.assertEqual(
+                [e.typename for e in events.queue], ['TICK', 'SIGNAL', 'ORDER', 'FILL']
+            )
+            self.assertEqual(events.dropped, 0)
+            if overflow == 'block':
+                self.assertRaises(queue.Full, events.put, tick('B', 1), block=False)
@@ -0,0 +1,176 @@
+import os
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from backtest import Backtest
+from event import CorporateActionEvent, EventType, FillEvent, OrderEvent, SignalEvent
+from execution import SimulatedExecutionHandler
+from portfolio import NaivePortfolio
+from price_handler.corporate_actions import (
+    CorporateActions, adjustment_factors, load_corporate_actions
+)
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from price_parser import PriceParser
+from risk_manager.exposure import ExposureRiskManager
+from strategy import AbstractStrategy
+
+
+class BuyOnceStrategy(AbstractStrategy):
+    """
+    Buys 'quantity' shares of a ticker on its first bar.
+    """
+    def __init__(self, ticker, events_queue, quantity):
+        self.ticker = ticker
+        self.events_queue = events_queue
+        self.quantity = quantity
+        self.bought = False
+
+    def calculate_signals(self, event):
+        if event.type == EventType.BAR and not self.bought:
+            self.events_queue.put(SignalEvent(self.ticker, 'BUY', self.quantity))
+            self.bought = True
+
+
+class TestCorporateActions(TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.csv_dir = os.path.join(self.data_dir, 'bars')
+        self.actions_dir = os.path.join(self.data_dir, 'actions')
+        os.mkdir(self.csv_dir)
+        os.mkdir(self.actions_dir)
+        self.dates = pd.bdate_range('2017-01-02', periods=6)
+        close = np.array([100.0, 102.0, 51.0, 52.0, 50.0, 51.0])
+        pd.DataFrame({
+            'Date': self.dates, 'Open': close, 'High': close + 1.0,
+            'Low': close - 1.0, 'Close': close, 'Adj Close': close,
+            'Volume': 1000
+        }).to_csv(os.path.join(self.csv_dir, 'AAA.csv'), index=False)
+        with open(os.path.join(self.actions_dir, 'AAA.csv'), 'w') as f:
+            f.write('Date,Action,Value\n2017-01-04,split,2\n2017-01-06,Dividend,1.04\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_factors(self):
+        actions = load_corporate_actions(os.path.join(self.actions_dir, 'AAA.csv'))
+        closes = [100.0, 102.0, 51.0, 52.0, 50.0, 51.0]
+        price, volume = adjustment_factors(self.dates, closes, actions)
+        dividend = 1.0 - 1.04 / 52.0
+        np.testing.assert_allclose(price, [
+            0.5 * dividend, 0.5 * dividend, dividend, dividend, 1.0, 1.0
+        ])
+        np.testing.assert_allclose(volume, [2, 2, 1, 1, 1, 1])
+
+    def test_adjusted_bars(self):
+        cache_dir = os.path.join(self.data_dir, 'cache')
+        actions = CorporateActions(self.actions_dir, cache_dir)
+        handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, queue.Queue(), ['AAA'], corporate_actions=actions
+        )
+        bars = handler.tickers_data['AAA']
+        dividend = 1.0 - 1.04 / 52.0
+        np.testing.assert_allclose(bars['Open'].values[:2], [50.0 * dividend, 51.0 * dividend])
+        np.testing.assert_allclose(bars['High'].values[:2], [50.5 * dividend, 51.5 * dividend])
+        np.testing.assert_allclose(bars['Close'].values, bars['Adj Close'].values)
+        self.assertEqual(bars['Volume'].tolist(), [2000, 2000, 1000, 1000, 1000, 1000])
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        def load():
+            raise AssertionError('The adjusted bars should be cached')
+        cached = actions.adjusted_bars('AAA', os.path.join(self.csv_dir, 'AAA.csv'), load)
+        pd.testing.assert_frame_equal(cached, bars.drop(columns='Ticker'))
+
+    def test_events(self):
+        events_queue = queue.Queue()
+        actions = CorporateActions(self.actions_dir)
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, ['AAA'],
+            corporate_actions=actions, adjust_prices=False
+        )
+        portfolio = NaivePortfolio(price_handler, events_queue, None)
+        curve = Backtest(
+            price_handler, BuyOnceStrategy('AAA', events_queue, 101), portfolio,
+            SimulatedExecutionHandler(events_queue, price_handler, commission_model=None),
+            events_queue
+        ).simulate_trading()
+
+        # 101 shares bought at 100.0, split into 202 shares
+        self.assertEqual(portfolio.current_positions['AAA'], 202)
+        self.assertEqual([p['AAA'] for p in portfolio.all_positions[1:]], [101, 101, 202, 202, 202, 202])
+        commission = curve['commission'].iloc[-1]
+        cash = 100000.0 - 101 * 100.0 - commission + 202 * 1.04
+        self.assertAlmostEqual(curve['cash'].iloc[-1], cash)
+        self.assertAlmostEqual(curve['total'].iloc[-1], cash + 202 * 51.0)
+        # No jump in the value of the position over the split
+        self.assertAlmostEqual(curve['AAA'].iloc[3], 202 * 51.0)
+        self.assertAlmostEqual(curve['AAA'].iloc[2], 101 * 102.0)
+
+    def test_early_actions(self):
+        with open(os.path.join(self.actions_dir, 'AAA.csv'), 'w') as f:
+            f.write(
+                'Date,Action,Value\n2016-12-15,dividend,0.5\n'
+                '2017-01-04,split,2\n2017-01-06,dividend,1.04\n'
+            )
+        events_queue = queue.Queue()
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, ['AAA'], start_date=pd.Timestamp('2017-01-05'),
+            corporate_actions=CorporateActions(self.actions_dir), adjust_prices=False
+        )
+        events = []
+        while price_handler.continue_backtest:
+            price_handler.stream_next()
+            while not events_queue.empty():
+                events.append(events_queue.get())
+        # The actions before the first bar streamed are skipped
+        actions = [e for e in events if e.type == EventType.CORPORATE_ACTION]
+        self.assertEqual([(a.time, a.action) for a in actions], [
+            (pd.Timestamp('2017-01-06'), 'dividend')
+        ])
+
+        portfolio = NaivePortfolio(price_handler, events_queue, None)
+        portfolio.update_timeindex(events[-1])
+        portfolio.update_corporate_action(actions[0])
+        late = CorporateActions(self.actions_dir).events('AAA')[0]
+        portfolio.update_corporate_action(late)
+        self.assertEqual(portfolio.current_time, events[-1].time)
+
+    def test_split_orders_and_risk(self):
+        events_queue = queue.Queue()
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, ['AAA'], adjust_prices=False
+        )
+        risk_manager = ExposureRiskManager()
+        portfolio = NaivePortfolio(
+            price_handler, events_queue, None, risk_manager=risk_manager
+        )
+        execution_handler = SimulatedExecutionHandler(
+            events_queue, price_handler, risk_manager=risk_manager
+        )
+        price_handler.stream_next()
+        portfolio.update_timeindex(events_queue.get(False))
+        portfolio.update_fill(FillEvent(None, 'AAA', 'ARCA', 101, 'BUY', 100.0, 0.0))
+        order = OrderEvent('AAA', 'BUY', 51, 'LMT', PriceParser.parse(90.0))
+        [order] = risk_manager.refine_orders(portfolio, order)
+        resting = execution_handler.execute_order(order)
+
+        split = CorporateActionEvent('AAA', self.dates[2], 'split', 2.0)
+        portfolio.update_corporate_action(split)
+        execution_handler.update_corporate_action(split)
+        self.assertEqual(portfolio.current_positions['AAA'], 202)
+        self.assertEqual((risk_manager.filled['AAA'], risk_manager.pending['AAA']), (202, 102))
+        self.assertAlmostEqual(risk_manager.gross_exposure, 304 * 50.0)
+        # The resting order is adjusted to the split
+        book = execution_handler.books['AAA']
+        self.assertEqual((resting.remaining, order.quantity), (102, 102))
+        self.assertEqual(book.buy_limits.best(), PriceParser.parse(45.0))
+        self.assertEqual(len(book), 1)
+
+        self.assertEqual(execution_handler.cancel_order(resting), 102)
+        self.assertEqual((risk_manager.pending['AAA'], risk_manager.units['AAA']), (0, 202))
+        self.assertEqual(len(book), 0)
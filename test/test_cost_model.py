@@ -0,0 +1,148 @@
+import queue
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from cost_model.commission import (
+    FixedCommissionModel, IBCommissionModel, TieredCommissionModel
+)
+from cost_model.latency import RandomLatencyModel
+from cost_model.slippage import (
+    CompositeSlippageModel, SpreadSlippageModel, SquareRootImpactModel
+)
+from event import BarEvent, FillEvent, OrderEvent
+from execution import SimulatedExecutionHandler
+from price_parser import PriceParser
+
+
+class PriceHandlerMock(object):
+    def istick(self):
+        return False
+
+    def get_last_close(self, ticker):
+        return PriceParser.parse(100.0)
+
+    def get_last_timestamp(self, ticker):
+        return pd.Timestamp('2017-01-03 10:00:00')
+
+
+class CountingLatencyModel(RandomLatencyModel):
+    """
+    Records the number of delays drawn by each call.
+    """
+    def __init__(self, *args, **kwargs):
+        super(CountingLatencyModel, self).__init__(*args, **kwargs)
+        self.draws = []
+
+    def delays(self, n):
+        self.draws.append(n)
+        return super(CountingLatencyModel, self).delays(n)
+
+
+class TestCostModels(TestCase):
+
+    def setUp(self):
+        self.directions = np.array([1.0, -1.0, 1.0])
+        self.quantities = np.array([100.0, 400.0, 10000.0])
+        self.prices = np.array([100.0, 50.0, 0.1])
+
+    def test_ib_commission(self):
+        expected = [
+            FillEvent(None, 'SPY', 'ARCA', q, 'BUY', p).commission
+            for q, p in zip(self.quantities, self.prices)
+        ]
+        np.testing.assert_allclose(
+            IBCommissionModel().commissions(self.quantities, self.prices), expected
+        )
+
+    def test_fixed_commission(self):
+        np.testing.assert_allclose(
+            FixedCommissionModel(1.0, 0.01).commissions(self.quantities, self.prices),
+            [2.0, 5.0, 101.0]
+        )
+
+    def test_tiered_commission(self):
+        model = TieredCommissionModel(
+            tiers=((0, 0.01), (500, 0.005)), minimum=1.0, maximum_pct=1.0
+        )
+        commissions = model.commissions(self.quantities[:2], self.prices[:2])
+        np.testing.assert_allclose(commissions, [1.0, 4.0])
+        commissions = model.commissions(np.array([1000.0]), np.array([10.0]))
+        np.testing.assert_allclose(commissions, [5.0])
+        self.assertEqual(model.volume, 1500.0)
+
+    def test_slippage(self):
+        model = CompositeSlippageModel(
+            SpreadSlippageModel(spread_bps=10.0),
+            SquareRootImpactModel(coefficient=1.0, volatility=0.02)
+        )
+        volumes = np.array([10000.0, 40000.0, np.nan])
+        np.testing.assert_allclose(
+            model.fill_prices(self.directions, self.quantities, self.prices, volumes),
+            [100.05 * 1.002, 49.975 * 0.998, 0.10005]
+        )
+
+    def test_latency(self):
+        delays = RandomLatencyModel(0.001, 0.004, seed=1).delays(10000)
+        self.assertTrue(np.all(delays >= 0.001))
+        self.assertAlmostEqual(delays.mean(), 0.005, 3)
+        np.testing.assert_array_equal(
+            RandomLatencyModel(seed=7).delays(5), RandomLatencyModel(seed=7).delays(5)
+        )
+
+
+class TestSimulatedExecutionHandlerCosts(TestCase):
+
+    def bar(self, time):
+        price = PriceParser.parse(100.0)
+        return BarEvent(
+            'SPY', pd.Timestamp(time), 60, price, price, price, price, 10000
+        )
+
+    def test_costs_and_latency(self):
+        events_queue = queue.Queue()
+        execution_handler = SimulatedExecutionHandler(
+            events_queue, PriceHandlerMock(),
+            slippage_model=SpreadSlippageModel(spread_bps=20.0),
+            commission_model=FixedCommissionModel(2.0),
+            latency_model=RandomLatencyModel(minimum=30.0, mean_jitter=1.0, seed=0)
+        )
+        execution_handler.update_market(self.bar('2017-01-03 10:00:00'))
+        execution_handler.execute_order(OrderEvent('SPY', 'BUY', 100, 'MKT'))
+        execution_handler.update_market(self.bar('2017-01-03 10:00:00'))
+        self.assertTrue(events_queue.empty())
+        execution_handler.update_market(self.bar('2017-01-03 10:01:00'))
+        fill = events_queue.get(False)
+        self.assertEqual(fill.quantity, 100)
+        self.assertAlmostEqual(fill.fill_cost, 100.1)
+        self.assertAlmostEqual(fill.commission, 2.0)
+
+    def test_latency_batch_and_cancel(self):
+        events_queue = queue.Queue()
+        latency_model = CountingLatencyModel(minimum=30.0, mean_jitter=1.0, seed=0)
+        execution_handler = SimulatedExecutionHandler(
+            events_queue, PriceHandlerMock(), latency_model=latency_model
+        )
+        execution_handler.update_market(self.bar('2017-01-03 10:00:00'))
+        market = execution_handler.execute_order(OrderEvent('SPY', 'BUY', 100, 'MKT'))
+        limit = execution_handler.execute_order(
+            OrderEvent('SPY', 'BUY', 200, 'LMT', PriceParser.parse(101.0))
+        )
+        cancelled = execution_handler.execute_order(
+            OrderEvent('SPY', 'SELL', 300, 'LMT', PriceParser.parse(99.0))
+        )
+        execution_handler.flush()
+        self.assertEqual(latency_model.draws, [3])
+
+        # Cancelled in flight, the order never reaches the book
+        self.assertEqual(execution_handler.cancel_order(cancelled), 300)
+        execution_handler.update_market(self.bar('2017-01-03 10:01:00'))
+        fills = []
+        while not events_queue.empty():
+            fill = events_queue.get(False)
+            fills.append((fill.direction, fill.quantity))
+        self.assertEqual(fills, [('BUY', 100), ('BUY', 200)])
+        self.assertEqual((market.remaining, limit.remaining), (0, 0))
+        self.assertEqual(len(execution_handler.books['SPY']), 0)
+        self.assertEqual(execution_handler.cancel_order(market), 0)
@@ -0,0 +1,119 @@
+import queue
+from unittest import TestCase
+
+import pandas as pd
+
+from event import BarEvent, CorporateActionEvent, EventType, OrderEvent, TickEvent
+from execution import SimulatedExecutionHandler
+from price_parser import PriceParser
+
+
+class PriceHandlerMock(object):
+    def istick(self):
+        return False
+
+    def get_last_close(self, ticker):
+        return PriceParser.parse(100.0)
+
+    def get_last_timestamp(self, ticker):
+        return pd.Timestamp('2017-01-03')
+
+
+class TestSimulatedExecutionHandler(TestCase):
+
+    def setUp(self):
+        self.events_queue = queue.Queue()
+        self.execution_handler = SimulatedExecutionHandler(
+            self.events_queue, PriceHandlerMock(), volume_participation=0.1
+        )
+
+    def order(self, buy_sell, quantity, order_type, price):
+        return self.execution_handler.execute_order(OrderEvent(
+            'SPY', buy_sell, quantity, order_type, PriceParser.parse(price)
+        ))
+
+    def bar(self, open_price, high_price, low_price, volume=10000):
+        self.execution_handler.update_market(BarEvent(
+            'SPY', pd.Timestamp('2017-01-04'), 86400,
+            PriceParser.parse(open_price), PriceParser.parse(high_price),
+            PriceParser.parse(low_price), PriceParser.parse(open_price), volume
+        ))
+        fills = []
+        while not self.events_queue.empty():
+            fill = self.events_queue.get(False)
+            fills.append((fill.direction, fill.quantity, fill.fill_cost))
+        return fills
+
+    def test_market_order(self):
+        self.execution_handler.execute_order(OrderEvent('SPY', 'BUY', 100, 'MKT'))
+        fill = self.events_queue.get(False)
+        self.assertEqual(fill.type, EventType.FILL)
+        self.assertEqual(fill.quantity, 100)
+        self.assertAlmostEqual(fill.fill_cost, 100.0)
+        self.assertAlmostEqual(fill.commission, 1.3)
+
+    def test_limit_orders(self):
+        self.order('BUY', 100, 'LMT', 98.0)
+        self.order('BUY', 100, 'LMT', 99.0)
+        self.order('SELL', 100, 'LMT', 103.0)
+        self.assertEqual(self.bar(100.0, 102.0, 99.5), [])
+        # Best priced buy limit is filled first
+        self.assertEqual(self.bar(100.0, 102.0, 98.5), [('BUY', 100, 99.0)])
+        # Gapping through the limit fills at the open
+        self.assertEqual(
+            self.bar(97.0, 104.0, 96.0),
+            [('BUY', 100, 97.0), ('SELL', 100, 103.0)]
+        )
+        self.assertEqual(self.bar(97.0, 110.0, 90.0), [])
+
+    def test_stop_orders(self):
+        self.order('SELL', 100, 'STP', 95.0)
+        self.order('BUY', 100, 'STP', 105.0)
+        self.assertEqual(self.bar(100.0, 104.0, 96.0), [])
+        self.assertEqual(self.bar(106.0, 107.0, 94.0), [('BUY', 100, 106.0), ('SELL', 100, 95.0)])
+
+    def test_partial_fills(self):
+        self.order('BUY', 800, 'LMT', 99.0)
+        self.order('BUY', 500, 'LMT', 99.0)
+        self.assertEqual(self.bar(100.0, 101.0, 98.0), [('BUY', 800, 99.0), ('BUY', 200, 99.0)])
+        self.assertEqual(self.bar(100.0, 101.0, 98.0, 2000), [('BUY', 200, 99.0)])
+        self.assertEqual(self.bar(100.0, 101.0, 98.0), [('BUY', 100, 99.0)])
+        self.assertEqual(len(self.execution_handler.books['SPY']), 0)
+
+    def test_cancel_order(self):
+        resting = self.order('BUY', 100, 'LMT', 99.0)
+        self.order('BUY', 200, 'LMT', 99.0)
+        self.order('SELL', 100, 'STP', 95.0)
+        book = self.execution_handler.books['SPY']
+        # Live orders are counted, not price levels
+        self.assertEqual(len(book), 3)
+        self.assertEqual(self.execution_handler.cancel_order(resting), 100)
+        self.execution_handler.cancel_order(resting)
+        self.assertEqual(len(book), 2)
+        self.assertEqual(self.bar(100.0, 101.0, 98.0), [('BUY', 200, 99.0)])
+        self.assertEqual(len(book), 1)
+
+    def test_split(self):
+        self.order('BUY', 100, 'LMT', 99.0)
+        self.order('BUY', 3, 'LMT', 98.0)
+        self.order('SELL', 1, 'STP', 95.0)
+        book = self.execution_handler.books['SPY']
+        # 1-for-4 reverse split: the orders of 3 and 1 shares are dropped
+        self.execution_handler.update_corporate_action(CorporateActionEvent(
+            'SPY', pd.Timestamp('2017-01-04'), 'split', 0.25
+        ))
+        self.assertEqual(len(book), 1)
+        self.assertEqual(
+            self.bar(400.0, 401.0, 392.0, 1000), [('BUY', 25, 396.0)]
+        )
+        self.assertEqual(len(book), 0)
+
+    def test_ticks(self):
+        self.order('BUY', 100, 'LMT', 99.0)
+        self.execution_handler.update_market(TickEvent(
+            'SPY', pd.Timestamp('2017-01-04'),
+            PriceParser.parse(98.5), PriceParser.parse(98.75)
+        ))
+        fill = self.events_queue.get(False)
+        self.assertEqual(fill.quantity, 100)
+        self.assertAlmostEqual(fill.fill_cost, 98.75)
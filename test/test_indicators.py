@@ -0,0 +1,132 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from event import BarEvent, TickEvent
+from indicator.base import TickerIndicators
+from indicator.incremental import (
+    AverageTrueRange, ExponentialMovingAverage, RollingMaximum,
+    RollingMinimum, RollingStandardDeviation, SimpleMovingAverage
+)
+from indicator.vectorized import (
+    VectorAverageTrueRange, VectorExponentialMovingAverage,
+    VectorRollingStandardDeviation, VectorSimpleMovingAverage
+)
+from price_parser import PriceParser
+
+
+def wilder_atr(high, low, close, window):
+    previous = close.shift(1)
+    true_range = pd.concat(
+        [high - low, (high - previous).abs(), (low - previous).abs()], axis=1
+    ).max(axis=1)
+    atr = true_range.rolling(window).mean()
+    for i in range(window, len(atr)):
+        atr.iloc[i] = (atr.iloc[i - 1] * (window - 1) + true_range.iloc[i]) / window
+    return atr
+
+
+class TestIncrementalIndicators(TestCase):
+
+    def setUp(self):
+        rnd = np.random.RandomState(0)
+        self.close = pd.Series(1000.0 + np.cumsum(rnd.normal(0, 1, 300)))
+        self.high = self.close + rnd.uniform(0, 2, 300)
+        self.low = self.close - rnd.uniform(0, 2, 300)
+
+    def check(self, indicator, expected):
+        values = [indicator.update(x) for x in self.close]
+        np.testing.assert_allclose(values, expected.values, rtol=1e-9)
+
+    def test_moving_averages(self):
+        self.check(SimpleMovingAverage(20), self.close.rolling(20).mean())
+        expected = self.close.ewm(span=20, adjust=False).mean()
+        expected.iloc[:19] = np.nan
+        self.check(ExponentialMovingAverage(20), expected)
+
+    def test_rolling_standard_deviation(self):
+        self.check(RollingStandardDeviation(20), self.close.rolling(20).std())
+
+    def test_rolling_min_max(self):
+        self.check(RollingMaximum(15), self.close.rolling(15).max())
+        self.check(RollingMinimum(15), self.close.rolling(15).min())
+
+    def test_average_true_range(self):
+        indicator = AverageTrueRange(14)
+        values = [
+            indicator.update_bar(h, l, c)
+            for h, l, c in zip(self.high, self.low, self.close)
+        ]
+        np.testing.assert_allclose(
+            values, wilder_atr(self.high, self.low, self.close, 14).values, rtol=1e-9
+        )
+
+
+class TestTickerIndicators(TestCase):
+
+    def test_update(self):
+        indicators = TickerIndicators()
+        indicators.subscribe('SPY', 'sma', SimpleMovingAverage(2))
+        indicators.subscribe('SPY', 'atr', AverageTrueRange(2))
+        indicators.subscribe('EUR_USD', 'ask', RollingMaximum(2, field='ask'))
+        for i, close in enumerate([10.0, 12.0, 11.0]):
+            indicators.update(BarEvent(
+                'SPY', None, 86400, PriceParser.parse(close),
+                PriceParser.parse(close + 1), PriceParser.parse(close - 1),
+                PriceParser.parse(close), 100
+            ))
+            indicators.update(BarEvent(
+                'QQQ', None, 86400, 0, 0, 0, 0, 100
+            ))
+        self.assertAlmostEqual(indicators.value('SPY', 'sma'), 11.5)
+        self.assertAlmostEqual(indicators.value('SPY', 'atr'), 2.25)
+        for bid, ask in [(1.1, 1.2), (1.15, 1.25), (1.0, 1.1)]:
+            indicators.update(TickEvent(
+                'EUR_USD', None, PriceParser.parse(bid), PriceParser.parse(ask)
+            ))
+        self.assertAlmostEqual(indicators.value('EUR_USD', 'ask'), 1.25)
+
+
+class TestVectorizedIndicators(TestCase):
+
+    def setUp(self):
+        rnd = np.random.RandomState(1)
+        self.close = pd.DataFrame(100.0 + np.cumsum(rnd.normal(0, 1, (120, 5)), axis=0))
+        self.high = self.close + rnd.uniform(0, 2, (120, 5))
+        self.low = self.close - rnd.uniform(0, 2, (120, 5))
+        # Ticker 4 does not trade on a few bars
+        self.close.iloc[::7, 4] = np.nan
+
+    def check(self, indicator, expected):
+        values = np.array([indicator.update(x).copy() for x in self.close.values])
+        np.testing.assert_allclose(values, expected, rtol=1e-9)
+
+    def test_against_incremental(self):
+        for vector_class, scalar_class in [
+            (VectorSimpleMovingAverage, SimpleMovingAverage),
+            (VectorExponentialMovingAverage, ExponentialMovingAverage),
+            (VectorRollingStandardDeviation, RollingStandardDeviation),
+        ]:
+            expected = np.full(self.close.shape, np.nan)
+            for j in range(5):
+                indicator = scalar_class(10)
+                value = np.nan
+                for i, x in enumerate(self.close.iloc[:, j]):
+                    if not np.isnan(x):
+                        value = indicator.update(x)
+                    expected[i, j] = value
+            self.check(vector_class(10, 5), expected)
+
+    def test_average_true_range(self):
+        indicator = VectorAverageTrueRange(14, 5)
+        values = np.array([
+            indicator.update(h, l, c).copy() for h, l, c in
+            zip(self.high.values, self.low.values, self.close.values)
+        ])
+        for j in range(4):
+            np.testing.assert_allclose(
+                values[:, j],
+                wilder_atr(self.high[j], self.low[j], self.close[j], 14).values,
+                rtol=1e-9
+            )
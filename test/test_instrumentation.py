@@ -0,0 +1,109 @@
+import json
+import os
+import queue
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import numpy as np
+from pandas.testing import assert_frame_equal
+
+from backtest import Backtest
+from execution import SimulatedExecutionHandler
+from instrumentation import Instrumentation, LatencyHistogram, SamplingProfiler
+from portfolio import NaivePortfolio
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+
+from helpers import AlternatingStrategy, write_random_walk_csvs
+
+
+class TestLatencyHistogram(TestCase):
+
+    def test_percentiles(self):
+        values = np.random.RandomState(0).lognormal(10, 2, 20000).astype(np.int64)
+        histogram = LatencyHistogram()
+        for value in values.tolist():
+            histogram.record(value)
+        self.assertEqual(histogram.count, 20000)
+        self.assertEqual(histogram.max, values.max())
+        ordered = np.sort(values)
+        for q in (1, 50, 90, 99, 99.9):
+            expected = ordered[int(round(q / 100.0 * len(values))) - 1]
+            self.assertLessEqual(abs(histogram.percentile(q) - expected), expected / 64.0)
+
+        merged = LatencyHistogram()
+        merged.merge(histogram)
+        merged.merge(histogram)
+        self.assertEqual(merged.count, 40000)
+        self.assertEqual(merged.percentile(50), histogram.percentile(50))
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for value in range(256):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 127)
+        self.assertEqual(histogram.percentile(100), 255)
+
+
+class TestInstrumentation(TestCase):
+
+    def setUp(self):
+        self.csv_dir = tempfile.mkdtemp()
+        write_random_walk_csvs(self.csv_dir, ['AAA'], 50, 2)
+
+    def tearDown(self):
+        shutil.rmtree(self.csv_dir)
+
+    def run_backtest(self, instrumentation=None):
+        events_queue = queue.Queue()
+        price_handler = YahooDailyCsvBarPriceHandler(self.csv_dir, events_queue, ['AAA'])
+        strategy = AlternatingStrategy('AAA', events_queue, 5)
+        portfolio = NaivePortfolio(price_handler, events_queue, None)
+        execution_handler = SimulatedExecutionHandler(events_queue, price_handler)
+        return Backtest(
+            price_handler, strategy, portfolio, execution_handler,
+            events_queue, instrumentation=instrumentation
+        ).simulate_trading()
+
+    def test_backtest(self):
+        instrumentation = Instrumentation()
+        assert_frame_equal(self.run_backtest(), self.run_backtest(instrumentation))
+
+        report = instrumentation.report().set_index('handler')
+        self.assertEqual(report.loc['AlternatingStrategy.calculate_signals', 'count'], 50)
+        self.assertEqual(report.loc['NaivePortfolio.update_timeindex', 'count'], 50)
+        self.assertEqual(report.loc['SimulatedExecutionHandler.update_market', 'count'], 50)
+        self.assertEqual(report.loc['NaivePortfolio.update_signal', 'count'], 10)
+        self.assertEqual(report.loc['SimulatedExecutionHandler.execute_order', 'count'], 10)
+        self.assertEqual(report.loc['NaivePortfolio.update_fill', 'count'], 10)
+        self.assertEqual(report.loc['tick_to_signal', 'count'], 10)
+        self.assertEqual(report.loc['signal_to_fill', 'count'], 10)
+        self.assertEqual(instrumentation.queue_depth.count, 51)
+        self.assertEqual(max(instrumentation.queue_depths), 1)
+
+        path = os.path.join(self.csv_dir, 'report.json')
+        instrumentation.dump(path)
+        with open(path) as f:
+            dumped = json.load(f)
+        self.assertEqual(len(dumped['handlers']), len(report))
+        self.assertEqual(dumped['queue_depth']['series'], instrumentation.queue_depths.tolist())
+
+    def test_queue_depths(self):
+        instrumentation = Instrumentation(max_queue_samples=8)
+        for depth in range(100):
+            instrumentation.sample_queue(depth)
+        # Decimated down to every 16th sample
+        self.assertEqual(instrumentation.queue_depth_stride, 16)
+        self.assertEqual(instrumentation.queue_depths.tolist(), list(range(0, 100, 16)))
+        self.assertEqual(instrumentation.queue_depth.count, 100)
+
+    def test_profiler(self):
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start(duration=5.0)
+        end = time.monotonic() + 0.2
+        while time.monotonic() < end:
+            sum(range(1000))
+        profiler.stop()
+        self.assertGreater(profiler.samples, 0)
+        self.assertTrue(any('test_profiler' in stack for stack in profiler.stacks))
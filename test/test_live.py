@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from unittest import TestCase
+
+import pandas as pd
+
+from event import EventType, SignalEvent, TickEvent
+from execution import SimulatedExecutionHandler
+from live import LivePipeline, SPSCRingBuffer
+from portfolio import NaivePortfolio
+from price_handler.base import AbstractTickPriceHandler
+from price_parser import PriceParser
+from strategy import AbstractStrategy
+
+
+class FakeStreamingPriceHandler(AbstractTickPriceHandler):
+    """
+    Streams 'ticks' ticks of a ticker, then waits to be
+    disconnected as a live stream would.
+    """
+    def __init__(self, ticker, ticks, events_queue):
+        self.tickers = {ticker: {}}
+        self.tickers_data = {}
+        self.ticker = ticker
+        self.ticks = ticks
+        self.events_queue = events_queue
+        self.connected = False
+        self.streamed = threading.Event()
+
+    def run(self):
+        self.connected = True
+        start = pd.Timestamp('2017-01-02 09:30', tz='UTC')
+        for i in range(self.ticks):
+            if not self.connected:
+                break
+            bid = PriceParser.parse(1.1 + i * 0.0001)
+            event = TickEvent(self.ticker, start + pd.Timedelta(i, unit='s'), bid, bid + 100)
+            self._store_event(event)
+            self.events_queue.put(event)
+        self.streamed.set()
+        while self.connected:
+            time.sleep(0.001)
+
+    def disconnect(self):
+        self.connected = False
+
+
+class SlowStrategy(AbstractStrategy):
+    """
+    Buys every 'period' ticks and exits 'period' ticks later,
+    sleeping on every tick.
+    """
+    def __init__(self, events_queue, period, delay=0.0, crash_at=None):
+        self.events_queue = events_queue
+        self.period = period
+        self.delay = delay
+        self.crash_at = crash_at
+        self.ticks = 0
+        self.invested = False
+
+    def calculate_signals(self, event):
+        if event.type != EventType.TICK:
+            return
+        self.ticks += 1
+        if self.ticks == self.crash_at:
+            raise RuntimeError('crash')
+        if self.delay:
+            time.sleep(self.delay)
+        if self.ticks % self.period == 0:
+            self.events_queue.put(SignalEvent(
+                event.ticker, 'EXIT' if self.invested else 'BUY', 1000
+            ))
+            self.invested = not self.invested
+
+
+class TestSPSCRingBuffer(TestCase):
+
+    def test_threads(self):
+        ring = SPSCRingBuffer(capacity=8)
+        received = []
+
+        def consume():
+            while True:
+                item = ring.get()
+                if item is None:
+                    return
+                received.append(item)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for i in range(10000):
+            ring.put(i)
+        ring.put(None)
+        consumer.join()
+        self.assertEqual(received, list(range(10000)))
+        self.assertEqual(ring.high_water, 8)
+        self.assertRaises(queue.Empty, ring.get_nowait)
+        for i in range(8):
+            ring.put_nowait(i)
+        self.assertRaises(queue.Full, ring.put_nowait, 8)
+
+
+class TestLivePipeline(TestCase):
+
+    def create_pipeline(self, ticks, delay=0.0, crash_at=None, capacity=4096):
+        events_queue = queue.Queue()
+        price_handler = FakeStreamingPriceHandler('EUR_USD', ticks, None)
+        strategy = SlowStrategy(events_queue, 10, delay, crash_at)
+        portfolio = NaivePortfolio(price_handler, events_queue, None)
+        execution_handler = SimulatedExecutionHandler(None, price_handler)
+        pipeline = LivePipeline(
+            price_handler, strategy, portfolio, execution_handler,
+            events_queue, capacity, stream=price_handler.run
+        )
+        return pipeline, price_handler, portfolio
+
+    def test_pipeline(self):
+        pipeline, price_handler, portfolio = self.create_pipeline(500, delay=0.0005)
+        pipeline.start()
+        self.assertTrue(price_handler.streamed.wait(5.0))
+        pipeline.stop()
+        self.assertTrue(pipeline.join(10.0))
+
+        metrics = pipeline.metrics()
+        self.assertEqual(metrics['processed'], {
+            'ingestion': 500, 'strategy': 500, 'execution': 550
+        })
+        self.assertGreater(metrics['market']['high_water'], 1)
+        self.assertEqual(metrics['market']['backlog'], 0)
+        self.assertEqual(metrics['fills']['puts'], 50)
+        self.assertEqual(portfolio.current_positions['EUR_USD'], 0)
+        self.assertLess(portfolio.current_holdings['cash'], 100000.0)
+
+    def test_error(self):
+        pipeline, price_handler, _ = self.create_pipeline(1000, crash_at=100, capacity=16)
+        pipeline.start()
+        self.assertTrue(price_handler.streamed.wait(5.0))
+        self.assertRaises(RuntimeError, pipeline.join, 10.0)
+        self.assertFalse(any(thread.is_alive() for thread in pipeline.threads))
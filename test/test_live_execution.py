@@ -0,0 +1,52 @@
+import queue
+from unittest import TestCase
+
+from event import EventType, OrderEvent
+from live_execution import AsyncLiveExecutionHandler
+from mock_broker import MockBroker
+from price_parser import PriceParser
+
+
+class TestAsyncLiveExecutionHandler(TestCase):
+
+    def setUp(self):
+        self.broker = MockBroker(latency=0.01, fill_chunks=3, commission=1.5)
+        self.broker.set_price('SPY', 250.0)
+        port = self.broker.start()
+        self.events_queue = queue.Queue()
+        self.handler = AsyncLiveExecutionHandler(
+            self.events_queue, '127.0.0.1', port, connections=3
+        )
+        self.handler.connect()
+
+    def tearDown(self):
+        self.handler.disconnect()
+        self.broker.stop()
+
+    def test_pipelined_orders(self):
+        client_ids = []
+        for i in range(300):
+            order = OrderEvent('SPY', 'BUY' if i % 2 else 'SELL', 10 + i, 'MKT')
+            client_ids.append(self.handler.execute_order(order))
+        client_ids.append(self.handler.execute_order(
+            OrderEvent('QQQ', 'BUY', 7, 'LMT', PriceParser.parse(150.0))
+        ))
+        self.assertEqual(len(set(client_ids)), 301)
+        self.assertTrue(self.handler.wait_until_filled(timeout=10))
+
+        filled = {}
+        commission = 0.0
+        while not self.events_queue.empty():
+            fill = self.events_queue.get(False)
+            self.assertEqual(fill.type, EventType.FILL)
+            key = (fill.symbol, fill.direction, fill.fill_cost)
+            filled[key] = filled.get(key, 0) + fill.quantity
+            commission += fill.commission
+        self.assertEqual(filled[('SPY', 'SELL', 250.0)], sum(range(10, 310, 2)))
+        self.assertEqual(filled[('SPY', 'BUY', 250.0)], sum(range(11, 310, 2)))
+        self.assertEqual(filled[('QQQ', 'BUY', 150.0)], 7)
+        self.assertAlmostEqual(commission, 301 * 1.5)
+        self.assertEqual(len(self.handler.ack_latencies), 301)
+        self.assertEqual(len(self.handler.fill_latencies), 301)
+        # Orders are pipelined rather than waiting for each round trip
+        self.assertLess(max(self.handler.fill_latencies), 300 * 0.01)
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from indicator.base import TickerIndicators
+from indicator.incremental import SimpleMovingAverage
+from mock_broker import MockOandaCandleServer
+from price_handler.base import AbstractBarPriceHandler
+from price_handler.oanda_backfill import BackfillError, OandaCandleBackfill
+from price_parser import PriceParser
+
+
+class FakeBarPriceHandler(AbstractBarPriceHandler):
+    def __init__(self, tickers):
+        self.tickers = dict((ticker, {}) for ticker in tickers)
+        self.tickers_data = {}
+
+
+class TestOandaCandleBackfill(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.server = MockOandaCandleServer()
+        self.server.start()
+        self.start = pd.Timestamp('2017-01-02 00:00', tz='UTC')
+        self.end = pd.Timestamp('2017-01-02 10:00', tz='UTC')
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.cache_dir)
+
+    def _backfill(self, **kwargs):
+        kwargs.setdefault('page_size', 100)
+        kwargs.setdefault('cache_dir', self.cache_dir)
+        return OandaCandleBackfill(
+            'token', api_url=self.server.url, backoff=0.001, **kwargs
+        )
+
+    def test_pages(self):
+        with self._backfill() as backfill:
+            pages = backfill.pages('M1', self.start, self.end)
+        # Pages of 6000s aligned on the epoch
+        self.assertEqual(len(pages), 7)
+        self.assertEqual(pages[0][0], pd.Timestamp('2017-01-01 23:40', tz='UTC'))
+        self.assertEqual(pages[-1][1], pd.Timestamp('2017-01-02 11:20', tz='UTC'))
+        for (_, end), (start, _) in zip(pages[:-1], pages[1:]):
+            self.assertEqual(end, start)
+
+    def test_history(self):
+        with self._backfill(workers=3) as backfill:
+            history = backfill.history(['EUR_USD', 'USD_JPY'], 'M1', self.start, self.end)
+        self.assertEqual(len(self.server.requests), 14)
+        self.assertLessEqual(len(self.server.connections), 3)
+        for instrument in ('EUR_USD', 'USD_JPY'):
+            bars = history[instrument]
+            self.assertEqual(len(bars), 600)
+            self.assertEqual(bars.index[0], self.start)
+            self.assertTrue((bars.index.to_series().diff().iloc[1:] == pd.Timedelta('1min')).all())
+            candle = MockOandaCandleServer.candle(self.start.value // 10 ** 9 + 60 * 42, 60)
+            self.assertEqual(bars['Open'].iloc[42], candle['openMid'])
+            self.assertEqual(bars['Close'].iloc[42], candle['closeMid'])
+            self.assertEqual(bars['Volume'].iloc[42], candle['volume'])
+
+    def test_cache(self):
+        with self._backfill() as backfill:
+            first = backfill.candles('EUR_USD', 'M1', self.start, self.end)
+        self.assertEqual(len(self.server.requests), 7)
+        self.assertEqual(
+            len(os.listdir(os.path.join(self.cache_dir, 'EUR_USD', 'M1'))), 7
+        )
+        # Only the pages missing are requested again
+        with self._backfill() as backfill:
+            cached = backfill.candles('EUR_USD', 'M1', self.start, self.end)
+            wider = backfill.candles('EUR_USD', 'M1', self.start, '2017-01-02 13:00')
+            self.assertEqual(backfill.cache_hits, 14)
+        pd.testing.assert_frame_equal(first, cached)
+        self.assertEqual(len(wider), 780)
+        self.assertEqual(len(self.server.requests), 8)
+
+    def test_retries(self):
+        self.server.failures = 2
+        with self._backfill(workers=1) as backfill:
+            bars = backfill.candles('EUR_USD', 'M1', self.start, '2017-01-02 01:00')
+            self.assertEqual(backfill.retries, 2)
+        self.assertEqual(len(bars), 60)
+
+        self.server.failures = len(self.server.requests) + 1
+        self.server.failure_status = 401
+        with self._backfill(workers=1, cache_dir=None) as backfill:
+            with self.assertRaises(BackfillError) as error:
+                backfill.candles('EUR_USD', 'M1', self.start, '2017-01-02 01:00')
+            self.assertEqual(error.exception.status, 401)
+            self.assertEqual(backfill.retries, 0)
+
+    def test_warm_up(self):
+        handler = FakeBarPriceHandler(['EUR_USD'])
+        indicators = TickerIndicators()
+        sma = indicators.subscribe('EUR_USD', 'sma', SimpleMovingAverage(20))
+        with self._backfill() as backfill:
+            events = backfill.warm_up(
+                handler, ['EUR_USD', 'USD_JPY'], 'M1', self.start, self.end, indicators
+            )
+        self.assertEqual(len(events), 1200)
+        self.assertEqual(len(handler.tickers_data['EUR_USD']), 600)
+        closes = handler.tickers_data['EUR_USD']['Close']
+        self.assertEqual(handler.get_last_close('EUR_USD'), PriceParser.parse(closes.iloc[-1]))
+        self.assertEqual(handler.get_last_timestamp('EUR_USD'), closes.index[-1])
+        self.assertNotIn('USD_JPY', handler.tickers)
+        self.assertAlmostEqual(sma.value, closes.iloc[-20:].mean(), places=6)
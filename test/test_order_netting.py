@@ -0,0 +1,126 @@
+import queue
+import threading
+from unittest import TestCase
+
+import pandas as pd
+
+from event import EventType, FillEvent, OrderEvent
+from execution import SimulatedExecutionHandler
+from order_netting import NettingExecutionHandler
+from price_parser import PriceParser
+
+
+class PriceHandlerMock(object):
+    def istick(self):
+        return False
+
+    def get_last_close(self, ticker):
+        return PriceParser.parse(200.0)
+
+    def get_last_timestamp(self, ticker):
+        return pd.Timestamp('2017-01-03')
+
+
+class RecordingExecutionHandler(object):
+    def __init__(self):
+        self.orders = []
+
+    def execute_order(self, event):
+        self.orders.append(event)
+
+    def flush(self):
+        pass
+
+
+class TestNettingExecutionHandler(TestCase):
+
+    def setUp(self):
+        self.events_queue = queue.Queue()
+        price_handler = PriceHandlerMock()
+        self.simulated = SimulatedExecutionHandler(self.events_queue, price_handler)
+        self.handler = NettingExecutionHandler(
+            self.simulated, self.events_queue, price_handler
+        )
+
+    def fills(self):
+        fills = []
+        while not self.events_queue.empty():
+            fill = self.events_queue.get(False)
+            self.assertEqual(fill.type, EventType.FILL)
+            fills.append((
+                fill.strategy_id, fill.symbol, fill.direction, fill.quantity,
+                fill.exchange, round(fill.commission, 6)
+            ))
+        return sorted(fills)
+
+    def test_net_and_split(self):
+        self.handler.execute_order(OrderEvent('SPY', 'BUY', 100, 'MKT', strategy_id='A'))
+        self.handler.execute_order(OrderEvent('SPY', 'SELL', 80, 'MKT', strategy_id='B'))
+        self.handler.execute_order(OrderEvent('SPY', 'BUY', 30, 'MKT', strategy_id='C'))
+        self.handler.execute_order(OrderEvent('QQQ', 'SELL', 10, 'MKT', strategy_id='A'))
+        self.assertTrue(self.events_queue.empty())
+
+        self.handler.flush()
+        self.assertEqual(self.handler.orders_received, 4)
+        self.assertEqual(self.handler.orders_sent, 2)
+        self.assertEqual(self.handler.quantity_crossed, 80)
+        # The net order of 50 SPY pays 1.3, split 20/30 between A and C
+        self.assertEqual(self.fills(), [
+            ('A', 'QQQ', 'SELL', 10, 'ARCA', 1.3),
+            ('A', 'SPY', 'BUY', 20, 'ARCA', 0.52),
+            ('A', 'SPY', 'BUY', 80, 'INTERNAL', 0.0),
+            ('B', 'SPY', 'SELL', 80, 'INTERNAL', 0.0),
+            ('C', 'SPY', 'BUY', 30, 'ARCA', 0.78),
+        ])
+        self.assertEqual(self.handler.allocations, {})
+
+    def test_fully_crossed(self):
+        self.handler.execute_order(OrderEvent('SPY', 'BUY', 50, 'MKT', strategy_id='A'))
+        self.handler.execute_order(OrderEvent('SPY', 'SELL', 50, 'MKT', strategy_id='B'))
+        self.handler.flush()
+        self.assertEqual(self.handler.orders_sent, 0)
+        self.assertEqual(self.fills(), [
+            ('A', 'SPY', 'BUY', 50, 'INTERNAL', 0.0),
+            ('B', 'SPY', 'SELL', 50, 'INTERNAL', 0.0),
+        ])
+
+    def test_limit_orders_pass_through(self):
+        self.handler.execute_order(
+            OrderEvent('SPY', 'BUY', 50, 'LMT', PriceParser.parse(190.0), 'A')
+        )
+        self.handler.flush()
+        self.assertEqual(self.handler.orders_sent, 1)
+        self.assertEqual(len(self.simulated.books['SPY']), 1)
+
+    def test_fills_from_another_thread(self):
+        # The fills of the net orders are put by another thread (e.g.
+        # the event loop of a live handler) while orders are netted
+        recorder = RecordingExecutionHandler()
+        self.handler.execution_handler = recorder
+        orders = 200
+        for _ in range(orders):
+            self.handler.execute_order(OrderEvent('SPY', 'BUY', 10, 'MKT', strategy_id='A'))
+            self.handler.execute_order(OrderEvent('SPY', 'BUY', 5, 'MKT', strategy_id='B'))
+            self.handler.flush()
+        net_orders = list(recorder.orders)
+
+        def fill():
+            for order in net_orders:
+                for _ in range(3):
+                    self.handler.put(FillEvent(
+                        None, 'SPY', 'ARCA', 5, 'BUY', 200.0, 0.3, order.strategy_id
+                    ))
+        thread = threading.Thread(target=fill)
+        thread.start()
+        while thread.is_alive():
+            self.handler.execute_order(OrderEvent('QQQ', 'SELL', 1, 'MKT', strategy_id='C'))
+            self.handler.flush()
+        thread.join()
+
+        quantities = {}
+        while not self.events_queue.empty():
+            fill = self.events_queue.get(False)
+            quantities[fill.strategy_id] = quantities.get(fill.strategy_id, 0) + fill.quantity
+        self.assertEqual(quantities, {'A': 10 * orders, 'B': 5 * orders})
+        for order in net_orders:
+            self.assertNotIn(order.strategy_id, self.handler.allocations)
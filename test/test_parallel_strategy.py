@@ -0,0 +1,162 @@
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from backtest import Backtest
+from event import BarEvent, EventType, SentimentEvent, SignalEvent, TickEvent
+from execution import SimulatedExecutionHandler
+from parallel_strategy import MarketDataRing, ProcessStrategies
+from portfolio import NaivePortfolio
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from strategy import Strategies, AbstractStrategy
+
+from helpers import write_random_walk_csvs
+
+
+class PeriodicStrategy(AbstractStrategy):
+    """
+    Enters a long position on a ticker every 'period' bars and
+    exits it 'period' bars later.
+    """
+    def __init__(self, ticker, events_queue, period):
+        self.subscribed_tickers = [ticker]
+        self.subscribed_events = [EventType.BAR]
+        self.ticker = ticker
+        self.events_queue = events_queue
+        self.period = period
+        self.bars = 0
+        self.invested = False
+
+    def calculate_signals(self, event):
+        self.bars += 1
+        if self.bars % self.period:
+            return
+        if self.invested:
+            self.events_queue.put(SignalEvent(self.ticker, 'EXIT'))
+        else:
+            self.events_queue.put(SignalEvent(self.ticker, 'BUY', 10))
+        self.invested = not self.invested
+
+
+class SentimentStrategy(AbstractStrategy):
+    """
+    Buys a ticker on a positive sentiment score.
+    """
+    def __init__(self, ticker, events_queue):
+        self.subscribed_tickers = [ticker]
+        self.subscribed_events = [EventType.SENTIMENT]
+        self.ticker = ticker
+        self.events_queue = events_queue
+        self.scores = []
+
+    def calculate_signals(self, event):
+        self.scores.append(event.sentiment)
+        if event.sentiment > 0:
+            self.events_queue.put(SignalEvent(self.ticker, 'BUY', 10))
+
+
+class TestMarketDataRing(TestCase):
+
+    def test_read_published_events(self):
+        ring = MarketDataRing(capacity=2)
+        reader = MarketDataRing(capacity=2, name=ring.name)
+        try:
+            time = pd.Timestamp('2017-01-03 16:00')
+            bar = BarEvent('SPY', time, 86400, 1, 3, 0, 2, 1000, 2)
+            tick = TickEvent('EUR_USD', time.tz_localize('UTC'), 10, 11)
+            self.assertEqual(ring.publish(bar), 0)
+            self.assertEqual(ring.publish(tick), 1)
+
+            actual = reader.read(0)
+            self.assertEqual(actual.type, EventType.BAR)
+            self.assertEqual(
+                (actual.ticker, actual.time, actual.period, actual.open_price,
+                 actual.high_price, actual.low_price, actual.close_price,
+                 actual.volume, actual.adj_close_price),
+                ('SPY', time, 86400, 1, 3, 0, 2, 1000, 2)
+            )
+            actual = reader.read(1)
+            self.assertEqual(actual.type, EventType.TICK)
+            self.assertEqual(
+                (actual.ticker, actual.time, actual.bid, actual.ask),
+                ('EUR_USD', tick.time, 10, 11)
+            )
+            # Without an adjusted close
+            ring.publish(BarEvent('SPY', time, 86400, 1, 3, 0, 2, 1000))
+            actual = reader.read(2)
+            self.assertEqual((actual.close_price, actual.adj_close_price), (2, None))
+        finally:
+            reader.close()
+            ring.close()
+
+
+class TestProcessStrategies(TestCase):
+
+    def setUp(self):
+        self.csv_dir = tempfile.mkdtemp()
+        self.tickers = ['AAA', 'BBB', 'CCC']
+        write_random_walk_csvs(self.csv_dir, self.tickers, 60, 7)
+
+    def tearDown(self):
+        shutil.rmtree(self.csv_dir)
+
+    def run_backtest(self, parallel):
+        events_queue = queue.Queue()
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, self.tickers
+        )
+        strategies = [
+            PeriodicStrategy('AAA', events_queue, 5),
+            PeriodicStrategy('BBB', events_queue, 3),
+            PeriodicStrategy('CCC', events_queue, 4),
+            PeriodicStrategy('AAA', events_queue, 7)
+        ]
+        if parallel:
+            strategy = ProcessStrategies(events_queue, strategies, processes=2)
+        else:
+            strategy = Strategies(*strategies)
+        portfolio = NaivePortfolio(price_handler, events_queue, None)
+        execution_handler = SimulatedExecutionHandler(events_queue, price_handler)
+        backtest = Backtest(
+            price_handler, strategy, portfolio, execution_handler, events_queue
+        )
+        try:
+            return backtest.simulate_trading(), strategies
+        finally:
+            if parallel:
+                strategy.close()
+
+    def test_same_results_as_single_process(self):
+        expected, _ = self.run_backtest(parallel=False)
+        actual, strategies = self.run_backtest(parallel=True)
+        assert_frame_equal(expected, actual)
+        self.assertNotEqual(actual['total'].iloc[-1], 100000.0)
+        # The state of the workers is read back on close()
+        self.assertEqual([s.bars for s in strategies], [60, 60, 60, 60])
+
+    def test_sentiment_events(self):
+        events_queue = queue.Queue()
+        strategies = [
+            PeriodicStrategy('AAA', events_queue, 1),
+            SentimentStrategy('AAA', events_queue),
+            SentimentStrategy('BBB', events_queue)
+        ]
+        strategy = ProcessStrategies(events_queue, strategies, processes=2)
+        try:
+            time = pd.Timestamp('2017-01-02')
+            strategy.calculate_signals(SentimentEvent('AAA', time, 0.5))
+            strategy.calculate_signals(SentimentEvent('BBB', time, -0.5))
+            strategy.calculate_signals(SentimentEvent('CCC', time, 0.5))
+        finally:
+            strategy.close()
+        signal = events_queue.get(False)
+        self.assertEqual((signal.ticker, signal.buy_sell), ('AAA', 'BUY'))
+        # Tagged with the position of the strategy in the collection
+        self.assertEqual(signal.strategy_id, 1)
+        self.assertTrue(events_queue.empty())
+        self.assertEqual([s.scores for s in strategies[1:]], [[0.5], [-0.5]])
+        self.assertEqual(strategies[0].bars, 0)
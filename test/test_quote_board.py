@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+import pickle
+import queue
+import subprocess
+import sys
+from unittest import TestCase
+
+import pandas as pd
+
+from event import BarEvent, TickEvent
+from price_handler.base import AbstractTickPriceHandler
+from price_handler.quote_board import QuoteBoard
+
+
+def _write_quotes(name, count):
+    """
+    Writes quotes whose bid and ask are equal from another process.
+    """
+    board = QuoteBoard(name=name)
+    for i in range(count):
+        board.update('AAA', bid=i, ask=i)
+    board.close()
+
+
+def _read_quotes(name, results):
+    board = QuoteBoard(name=name)
+    results.put((board.get_best_bid_ask('AAA'), board.get_last_timestamp('AAA'), board.tickers))
+    board.close()
+
+
+class FakeTickPriceHandler(AbstractTickPriceHandler):
+    def __init__(self, events_queue):
+        self.events_queue = events_queue
+        self.tickers = {'AAA': {}}
+
+    def stream(self, event):
+        self._store_event(event)
+        self.events_queue.put(event)
+
+
+class TestQuoteBoard(TestCase):
+
+    def setUp(self):
+        self.board = QuoteBoard(capacity=16)
+
+    def tearDown(self):
+        self.board.close()
+
+    def test_update(self):
+        time = pd.Timestamp('2017-01-02 10:00', tz='UTC')
+        self.assertIsNone(self.board.quote('AAA'))
+        self.board.update('AAA', time, bid=100, ask=102)
+        self.board.publish(BarEvent('BBB', pd.Timestamp('2017-01-02'), 86400, 1, 3, 1, 2, 10, 2))
+        self.assertEqual(self.board.get_best_bid_ask('AAA'), (100, 102))
+        self.assertIsNone(self.board.get_last_close('AAA'))
+        self.assertEqual(self.board.get_last_timestamp('AAA'), time)
+        self.assertEqual(self.board.get_best_bid_ask('BBB'), (None, None))
+        self.assertEqual(self.board.get_last_close('BBB'), 2)
+        self.assertEqual(self.board.get_last_timestamp('BBB'), pd.Timestamp('2017-01-02'))
+        # The fields not given are kept
+        self.board.update('AAA', last=101)
+        self.assertEqual(self.board.get_best_bid_ask('AAA'), (100, 102))
+        self.assertEqual(self.board.get_last_close('AAA'), 101)
+        self.assertEqual(self.board.quote('AAA')[0], 4)
+        self.assertEqual(self.board.tickers, ['AAA', 'BBB'])
+
+    def test_capacity(self):
+        for i in range(16):
+            self.board.update('T%d' % i, last=i)
+        with self.assertRaises(ValueError):
+            self.board.update('T16', last=16)
+        with self.assertRaises(ValueError):
+            self.board.update('X' * 33, last=0)
+
+    def test_attach(self):
+        self.board.update('AAA', bid=1, ask=2)
+        reader = pickle.loads(pickle.dumps(self.board))
+        self.assertEqual(reader.get_best_bid_ask('AAA'), (1, 2))
+        # Symbols added later are found by the reader
+        self.board.update('BBB', last=3)
+        self.assertEqual(reader.get_last_close('BBB'), 3)
+        with self.assertRaises(ValueError):
+            reader.update('CCC', last=4)
+        reader.close()
+
+    def test_price_handler(self):
+        events_queue = queue.Queue()
+        handler = FakeTickPriceHandler(events_queue)
+        handler.quote_board = self.board
+        time = pd.Timestamp('2017-01-02 10:00', tz='UTC')
+        handler.stream(TickEvent('AAA', time, 100, 102))
+
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_read_quotes, args=(self.board.name, results))
+        process.start()
+        self.assertEqual(results.get(timeout=10), ((100, 102), time, ['AAA']))
+        process.join()
+
+    def test_consistency(self):
+        self.board.update('AAA', bid=0, ask=0)
+        count = 200000
+        process = multiprocessing.Process(target=_write_quotes, args=(self.board.name, count))
+        process.start()
+        reads = 0
+        while True:
+            bid, ask = self.board.get_best_bid_ask('AAA')
+            self.assertEqual(bid, ask)
+            reads += 1
+            if bid == count - 1 or not process.is_alive() and reads > count:
+                break
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertGreater(reads, 1)
+        self.assertEqual(self.board.quote('AAA')[0], 2 * (count + 1))
+
+    def test_independent_readers(self):
+        self.board.update('AAA', bid=1, ask=2)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = (
+            'from price_handler.quote_board import QuoteBoard\n'
+            'board = QuoteBoard(name=%r)\n'
+            'print(board.get_best_bid_ask("AAA"))\n'
+            'board.close()\n' % self.board.name
+        )
+        env = dict(os.environ, PYTHONPATH=root)
+        # The board outlives the readers exiting
+        for _ in range(2):
+            reader = subprocess.run(
+                [sys.executable, '-c', script], cwd=root, env=env,
+                capture_output=True, text=True, timeout=60
+            )
+            self.assertEqual(reader.returncode, 0, reader.stderr)
+            self.assertEqual(reader.stdout.strip(), '(1, 2)')
+            self.assertNotIn('leaked', reader.stderr)
+        attached = QuoteBoard(name=self.board.name)
+        self.assertEqual(attached.get_best_bid_ask('AAA'), (1, 2))
+        attached.close()
@@ -0,0 +1,206 @@
+import os
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from backtest import Backtest
+from event import SignalEvent
+from execution import SimulatedExecutionHandler
+from portfolio import NaivePortfolio
+from price_handler.shared_bar import SharedBarData
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from result_cache import ResultCache, backtest_key
+from scheduler import Scheduler
+from strategy import Strategies
+from sweep import ParameterSweep, parameter_grid, summary_statistics
+from symbols import SYMBOLS
+
+from helpers import PeriodicStrategy, create_backtest, write_random_walk_csvs
+
+
+# The strategy class of create_strategy_backtest(), swapped by the tests
+strategy_class = PeriodicStrategy
+
+
+class HoldingStrategy(PeriodicStrategy):
+    """
+    Enters a long position on a ticker after 'period' bars and holds it.
+    """
+    def calculate_signals(self, event):
+        self.bars += 1
+        if self.bars == self.period:
+            self.events_queue.put(SignalEvent(self.ticker, 'BUY', 10))
+
+
+def create_strategy_backtest(price_handler, events_queue, period):
+    strategy = strategy_class('AAA', events_queue, period)
+    portfolio = NaivePortfolio(price_handler, events_queue, None)
+    execution_handler = SimulatedExecutionHandler(events_queue, price_handler)
+    return Backtest(
+        price_handler, strategy, portfolio, execution_handler, events_queue
+    )
+
+
+class TestResultCache(TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.csv_dir = os.path.join(self.data_dir, 'bars')
+        self.cache_dir = os.path.join(self.data_dir, 'cache')
+        os.mkdir(self.csv_dir)
+        write_random_walk_csvs(self.csv_dir, ['AAA', 'BBB'], 40, 5)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def _backtest(self, aaa_period=3, initial_capital=100000.0, scheduler=None):
+        events_queue = queue.Queue()
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, ['AAA', 'BBB']
+        )
+        strategy = Strategies(
+            PeriodicStrategy('AAA', events_queue, aaa_period),
+            PeriodicStrategy('BBB', events_queue, 5)
+        )
+        portfolio = NaivePortfolio(
+            price_handler, events_queue, None, initial_capital=initial_capital
+        )
+        execution_handler = SimulatedExecutionHandler(events_queue, price_handler)
+        return Backtest(
+            price_handler, strategy, portfolio, execution_handler, events_queue,
+            scheduler=scheduler
+        )
+
+    def test_key(self):
+        key = backtest_key(self._backtest())
+        self.assertEqual(backtest_key(self._backtest()), key)
+        self.assertNotEqual(backtest_key(self._backtest(aaa_period=4)), key)
+        self.assertNotEqual(backtest_key(self._backtest(initial_capital=50000.0)), key)
+        # Same content, new file
+        path = os.path.join(self.csv_dir, 'AAA.csv')
+        with open(path) as f:
+            content = f.read()
+        os.remove(path)
+        with open(path, 'w') as f:
+            f.write(content)
+        self.assertEqual(backtest_key(self._backtest()), key)
+        with open(path, 'a') as f:
+            f.write('2017-03-01,1,1,1,1,1,1000\n')
+        self.assertNotEqual(backtest_key(self._backtest()), key)
+
+    def test_key_interned_symbols(self):
+        key = backtest_key(self._backtest())
+        # As in a process having interned other symbols first, giving
+        # other ids and grown symbol arrays
+        symbol_ids, names = SYMBOLS.symbol_ids, SYMBOLS.names
+        SYMBOLS.symbol_ids, SYMBOLS.names = {}, []
+        try:
+            SYMBOLS.ids(['ZZZ%d' % i for i in range(100)])
+            self.assertEqual(backtest_key(self._backtest()), key)
+        finally:
+            SYMBOLS.symbol_ids, SYMBOLS.names = symbol_ids, names
+
+    def test_key_scheduler(self):
+        key = backtest_key(self._backtest())
+
+        def scheduled(aaa_period, interval):
+            backtest = self._backtest(
+                aaa_period, scheduler=Scheduler(start='2017-01-02')
+            )
+            backtest.scheduler.schedule_every(
+                interval, backtest.strategy.calculate_signals
+            )
+            return backtest_key(backtest)
+
+        scheduled_key = scheduled(3, '1D')
+        self.assertNotEqual(scheduled_key, key)
+        self.assertEqual(scheduled(3, '1D'), scheduled_key)
+        self.assertNotEqual(scheduled(3, '2D'), scheduled_key)
+        self.assertNotEqual(scheduled(4, '1D'), scheduled_key)
+
+    def test_simulate_trading(self):
+        cache = ResultCache(self.cache_dir)
+        curve, statistics = cache.simulate_trading(self._backtest())
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+        backtest = self._backtest()
+        cached_curve, cached_statistics = cache.simulate_trading(backtest)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        assert_frame_equal(cached_curve, curve)
+        self.assertEqual(cached_statistics, statistics)
+        self.assertEqual(cached_statistics, summary_statistics(curve))
+        # Not run
+        self.assertTrue(backtest.price_handler.continue_backtest)
+
+        cache.simulate_trading(self._backtest(aaa_period=4))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        cache.bypass = True
+        bypassed_curve, _ = cache.simulate_trading(self._backtest())
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        assert_frame_equal(bypassed_curve, curve)
+        self.assertEqual(len(cache.entries()), 2)
+
+    def test_eviction(self):
+        cache = ResultCache(self.cache_dir, max_entries=2)
+        curve = pd.DataFrame({'total': [1.0, 2.0]})
+        cache.put('a', curve, {})
+        cache.put('b', curve, {})
+        os.utime(cache._path('a'), ns=(1, 1))
+        os.utime(cache._path('b'), ns=(2, 2))
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('c', curve, {})
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+        size = os.path.getsize(cache._path('a'))
+        cache.max_bytes = 2 * size
+        cache.max_entries = None
+        os.utime(cache._path('c'), ns=(1, 1))
+        cache.put('d', curve, {})
+        self.assertEqual(
+            sorted(os.path.basename(path) for _, _, path in cache.entries()),
+            ['a.pkl', 'd.pkl']
+        )
+
+    def test_sweep(self):
+        cache = ResultCache(self.cache_dir)
+        parameters = parameter_grid(aaa_period=[2, 3], bbb_period=[4])
+        with SharedBarData.from_csv(self.csv_dir, ['AAA', 'BBB']) as data:
+            sweep = ParameterSweep(data, create_backtest, workers=1, cache=cache)
+            results = sweep.run(parameters)
+            self.assertEqual((cache.hits, cache.misses), (0, 2))
+            runs = []
+            sweep.progress = lambda completed, total, p: runs.append(p)
+            assert_frame_equal(sweep.run(parameters), results)
+            self.assertEqual((cache.hits, cache.misses), (2, 2))
+            self.assertEqual(runs, [])
+            [(statistics, curve)] = sweep.map([(parameters[0], None, '2017-02-01', True)])
+            self.assertEqual((cache.hits, cache.misses), (2, 3))
+            self.assertEqual(sweep.map([(parameters[0], None, '2017-02-01', True)])[0][0], statistics)
+            assert_frame_equal(
+                sweep.map([(parameters[0], None, '2017-02-01', True)])[0][1], curve
+            )
+
+    def test_sweep_components(self):
+        global strategy_class
+        cache = ResultCache(self.cache_dir)
+        parameters = [{'period': 3}]
+        with SharedBarData.from_csv(self.csv_dir, ['AAA', 'BBB']) as data:
+            sweep = ParameterSweep(data, create_strategy_backtest, workers=1, cache=cache)
+            results = sweep.run(parameters)
+            sweep.run(parameters)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            # Same create_backtest source, another strategy class
+            strategy_class = HoldingStrategy
+            try:
+                swapped = sweep.run(parameters)
+            finally:
+                strategy_class = PeriodicStrategy
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+            self.assertFalse(results.equals(swapped))
@@ -0,0 +1,128 @@
+import os
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from backtest import Backtest
+from checkpoint import Checkpointer
+from execution import SimulatedExecutionHandler
+from portfolio import NaivePortfolio
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from results import ResultReader, ResultWriter
+from strategy import Strategies
+
+from helpers import AlternatingStrategy, CrashError, write_random_walk_csvs
+
+
+class TestResultWriter(TestCase):
+
+    def setUp(self):
+        self.csv_dir = tempfile.mkdtemp()
+        self.results_dir = os.path.join(self.csv_dir, 'results')
+        self.tickers = ['AAA', 'BBB']
+        write_random_walk_csvs(self.csv_dir, self.tickers, 100, 7)
+
+    def tearDown(self):
+        shutil.rmtree(self.csv_dir)
+
+    def run_backtest(self, result_writer=None, checkpointer=None, crash_at=None):
+        events_queue = queue.Queue()
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, self.tickers
+        )
+        strategy = Strategies(
+            AlternatingStrategy('AAA', events_queue, 3, crash_at),
+            AlternatingStrategy('BBB', events_queue, 4)
+        )
+        portfolio = NaivePortfolio(
+            price_handler, events_queue, None, result_writer=result_writer
+        )
+        execution_handler = SimulatedExecutionHandler(events_queue, price_handler)
+        backtest = Backtest(
+            price_handler, strategy, portfolio, execution_handler, events_queue,
+            checkpointer=checkpointer
+        )
+        if checkpointer is not None and checkpointer.restore(backtest):
+            backtest.strategy._lst_strategies[0].crash_at = None
+        curve = backtest.simulate_trading()
+        return portfolio, curve
+
+    def test_backtest(self):
+        expected_portfolio, expected = self.run_backtest()
+        with ResultWriter(self.results_dir, row_group_size=16) as writer:
+            portfolio, curve = self.run_backtest(writer)
+            self.assertEqual(len(portfolio.all_holdings), 1)
+            self.assertEqual(len(portfolio.all_positions), 1)
+            self.assertTrue(all(
+                len(buffer[0]) < 16 for buffer in writer.buffers.values()
+            ))
+        assert_frame_equal(curve, expected, check_freq=False)
+
+        reader = ResultReader(self.results_dir)
+        self.assertEqual(
+            reader.tables(), ['fills', 'holdings', 'orders', 'positions', 'signals']
+        )
+        positions = reader.read('positions')
+        self.assertEqual(len(positions), len(expected_portfolio.all_positions))
+        self.assertEqual(
+            positions['AAA'].tolist(),
+            [p['AAA'] for p in expected_portfolio.all_positions]
+        )
+
+        fills = reader.read('fills')
+        self.assertEqual(len(fills), 58)
+        self.assertEqual(sorted(set(fills['ticker'])), self.tickers)
+        self.assertEqual(len(reader.read('orders')), len(fills))
+        self.assertEqual(len(reader.read('signals')), len(fills))
+
+    def test_read_columns_and_dates(self):
+        with ResultWriter(self.results_dir, row_group_size=16) as writer:
+            self.run_backtest(writer)
+        reader = ResultReader(self.results_dir)
+        holdings = reader.read('holdings')
+        selected = reader.read(
+            'holdings', columns=['total', 'cash'],
+            start='2017-02-01', end='2017-02-28'
+        )
+        self.assertEqual(list(selected.columns), ['total', 'cash'])
+        self.assertEqual(len(selected), 20)
+        assert_frame_equal(
+            selected, holdings.iloc[1:].loc['2017-02-01':'2017-02-28', ['total', 'cash']]
+        )
+
+        groups = list(reader.row_groups('holdings', start=holdings.index[-1]))
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(len(groups[0]), 1)
+        self.assertTrue(reader.read('fills', start='2018-01-01').empty)
+
+    def test_encoding(self):
+        with ResultWriter(self.results_dir, row_group_size=3) as writer:
+            times = pd.date_range('2017-01-02 09:30', periods=7, freq='min', tz='US/Eastern')
+            for i, time in enumerate(times):
+                writer.write('quotes', {'datetime': time, 'mid': i + 0.5})
+        quotes = ResultReader(self.results_dir).read('quotes', start=times[2], end=times[4])
+        self.assertEqual(list(quotes.index), list(times[2:5]))
+        self.assertEqual(quotes['mid'].tolist(), [2.5, 3.5, 4.5])
+
+    def test_resume(self):
+        with ResultWriter(self.results_dir, row_group_size=16) as writer:
+            _, expected = self.run_backtest(writer)
+        reader = ResultReader(self.results_dir)
+        expected_tables = dict((table, reader.read(table)) for table in reader.tables())
+
+        path = os.path.join(self.csv_dir, 'backtest.ckpt')
+        with ResultWriter(self.results_dir, row_group_size=16) as writer:
+            self.assertRaises(
+                CrashError, self.run_backtest, writer, Checkpointer(path, frequency=25), 70
+            )
+        # The rows flushed after the last checkpoint are dropped on resume
+        self.assertLess(len(reader.read('holdings')), len(expected_tables['holdings']))
+        with ResultWriter(self.results_dir, row_group_size=16, resume=True) as writer:
+            _, curve = self.run_backtest(writer, Checkpointer(path, frequency=25))
+        assert_frame_equal(curve, expected)
+        for table, frame in expected_tables.items():
+            assert_frame_equal(reader.read(table), frame)
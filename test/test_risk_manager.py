@@ -0,0 +1,120 @@
+import queue
+from unittest import TestCase
+
+from event import FillEvent, OrderEvent, SignalEvent
+from execution import SimulatedExecutionHandler
+from portfolio import NaivePortfolio
+from price_parser import PriceParser
+from risk_manager.exposure import ExposureRiskManager
+
+
+class PriceHandlerMock(object):
+    def __init__(self, prices):
+        self.symbol_list = list(prices)
+        self.prices = prices
+
+    def istick(self):
+        return False
+
+    def get_last_close(self, ticker):
+        return PriceParser.parse(self.prices[ticker])
+
+
+class TestExposureRiskManager(TestCase):
+    """
+    Prices are $100 for AAA and BBB (sector 'Tech')
+    and $50 for CCC (sector 'Energy').
+    """
+    def setUp(self):
+        self.events_queue = queue.Queue()
+        self.bars = PriceHandlerMock({'AAA': 100.0, 'BBB': 100.0, 'CCC': 50.0})
+        self.risk_manager = ExposureRiskManager(
+            max_gross_exposure=50000.0, max_net_exposure=30000.0,
+            max_symbol_exposure=20000.0, max_sector_exposure=30000.0,
+            max_order_value=15000.0,
+            sectors={'AAA': 'Tech', 'BBB': 'Tech', 'CCC': 'Energy'}
+        )
+        self.portfolio = NaivePortfolio(
+            self.bars, self.events_queue, None,
+            risk_manager=self.risk_manager
+        )
+
+    def refine(self, ticker, buy_sell, quantity):
+        order = OrderEvent(ticker, buy_sell, quantity, 'MKT')
+        return self.risk_manager.refine_orders(self.portfolio, order)
+
+    def test_max_order_value(self):
+        orders = self.refine('AAA', 'BUY', 500)
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(orders[0].quantity, 150)
+        self.assertAlmostEqual(self.risk_manager.gross_exposure, 15000.0)
+
+    def test_symbol_and_sector_limits(self):
+        self.assertEqual(len(self.refine('AAA', 'BUY', 150)), 1)
+        # AAA would reach $30,000 > $20,000
+        self.assertEqual(self.refine('AAA', 'BUY', 150), [])
+        self.assertEqual(len(self.refine('BBB', 'BUY', 150)), 1)
+        # Tech would reach $31,000 > $30,000
+        self.assertEqual(self.refine('BBB', 'BUY', 10), [])
+        # Reducing an exposure is always allowed
+        self.assertEqual(len(self.refine('BBB', 'SELL', 10)), 1)
+        self.assertAlmostEqual(self.risk_manager.sector_exposures['Tech'], 29000.0)
+        self.assertEqual(self.risk_manager.rejected_orders, 2)
+
+    def test_gross_and_net_limits(self):
+        self.assertEqual(len(self.refine('AAA', 'BUY', 150)), 1)
+        self.assertEqual(len(self.refine('CCC', 'BUY', 300)), 1)
+        # Net would reach $35,000 > $30,000
+        self.assertEqual(self.refine('BBB', 'BUY', 50), [])
+        self.assertEqual(len(self.refine('BBB', 'SELL', 150)), 1)
+        self.assertAlmostEqual(self.risk_manager.net_exposure, 15000.0)
+        self.assertAlmostEqual(self.risk_manager.gross_exposure, 45000.0)
+        self.assertEqual(len(self.refine('CCC', 'BUY', 100)), 1)
+        # Gross would reach $51,000 > $50,000
+        self.risk_manager.max_sector_exposure = None
+        self.assertEqual(self.refine('AAA', 'BUY', 10), [])
+
+    def test_update_price(self):
+        self.refine('AAA', 'BUY', 100)
+        self.refine('BBB', 'SELL', 100)
+        self.risk_manager.update_price('AAA', 110.0)
+        self.assertAlmostEqual(self.risk_manager.gross_exposure, 21000.0)
+        self.assertAlmostEqual(self.risk_manager.net_exposure, 1000.0)
+        self.assertAlmostEqual(self.risk_manager.sector_exposures['Tech'], 21000.0)
+
+    def test_update_signal(self):
+        self.portfolio.update_signal(SignalEvent('AAA', 'BUY', 120))
+        self.portfolio.update_signal(SignalEvent('BBB', 'BUY'))
+        order = self.events_queue.get(False)
+        self.assertEqual((order.ticker, order.buy_sell, order.quantity), ('AAA', 'BUY', 120))
+        order = self.events_queue.get(False)
+        self.assertEqual((order.ticker, order.buy_sell, order.quantity), ('BBB', 'BUY', 100))
+        self.assertTrue(self.events_queue.empty())
+
+    def test_fills_and_cancels(self):
+        execution_handler = SimulatedExecutionHandler(
+            self.events_queue, self.bars, risk_manager=self.risk_manager
+        )
+        order = OrderEvent('AAA', 'BUY', 150, 'LMT', PriceParser.parse(95.0))
+        self.assertEqual(self.risk_manager.refine_orders(self.portfolio, order), [order])
+        resting = execution_handler.execute_order(order)
+        self.assertAlmostEqual(self.risk_manager.gross_exposure, 15000.0)
+
+        # A partial fill moves 50 shares from pending to filled
+        resting.remaining -= 50
+        self.risk_manager.update_fill(FillEvent(None, 'AAA', 'ARCA', 50, 'BUY', 95.0, 0.0))
+        self.assertEqual((self.risk_manager.filled['AAA'], self.risk_manager.pending['AAA']), (50, 100))
+        self.assertAlmostEqual(self.risk_manager.gross_exposure, 15000.0)
+
+        # The unfilled remainder of the cancelled order is released
+        self.assertEqual(execution_handler.cancel_order(resting), 100)
+        execution_handler.cancel_order(resting)
+        self.assertEqual(self.risk_manager.units['AAA'], 50)
+        self.assertAlmostEqual(self.risk_manager.gross_exposure, 5000.0)
+        self.assertEqual(len(self.refine('AAA', 'BUY', 150)), 1)
+
+        # Fills of orders not approved only change the filled units
+        self.risk_manager.update_fill(FillEvent(None, 'AAA', 'ARCA', 200, 'SELL', 100.0, 0.0))
+        self.risk_manager.update_fill(FillEvent(None, 'AAA', 'ARCA', 150, 'BUY', 100.0, 0.0))
+        self.assertEqual((self.risk_manager.filled['AAA'], self.risk_manager.pending['AAA']), (0, 0))
+        self.assertAlmostEqual(self.risk_manager.gross_exposure, 0.0)
@@ -0,0 +1,94 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from event import FillEvent
+from robustness import MonteCarlo, path_metrics, round_trips, trade_returns
+
+
+class TestMonteCarlo(TestCase):
+
+    def setUp(self):
+        rnd = np.random.RandomState(1)
+        self.returns = rnd.normal(0.0005, 0.01, 250)
+        total = 100000.0 * np.cumprod(np.concatenate([[1.0], 1.0 + self.returns]))
+        self.curve = pd.DataFrame({'total': total})
+        self.curve['returns'] = self.curve['total'].pct_change()
+
+    def test_path_metrics(self):
+        metrics = path_metrics(np.array([[0.1, -0.5, 0.2], [-0.1, 0.0, 0.0]]))
+        np.testing.assert_allclose(metrics['total_return'], [1.1 * 0.5 * 1.2 - 1.0, -0.1])
+        np.testing.assert_allclose(metrics['max_drawdown'], [0.5, 0.1])
+
+    def test_independent_of_workers(self):
+        parallel = MonteCarlo(self.curve, paths=2500, batch_size=300, workers=3).run()
+        serial = MonteCarlo(self.curve, paths=2500, batch_size=300, workers=1).run()
+        self.assertEqual(len(parallel), 2500)
+        assert_frame_equal(parallel, serial)
+
+    def test_resampling_methods(self):
+        total_return = np.prod(1.0 + self.returns) - 1.0
+
+        # Shuffles and full length circular blocks keep the total return
+        for monte_carlo in (
+                MonteCarlo(self.returns, paths=100, method='shuffle', workers=1),
+                MonteCarlo(self.returns, paths=100, block_length=250, workers=1)
+        ):
+            metrics = monte_carlo.run()
+            np.testing.assert_allclose(metrics['total_return'], total_return)
+            self.assertGreater(metrics['max_drawdown'].std(), 0.0)
+
+        metrics = MonteCarlo(
+            self.returns, paths=100, method='random_start', length=50, workers=1
+        ).run()
+        windows = np.array([
+            np.prod(1.0 + self.returns[i:i + 50]) - 1.0 for i in range(201)
+        ])
+        for value in metrics['total_return']:
+            self.assertTrue(np.isclose(windows, value).any())
+
+    def test_report(self):
+        report = MonteCarlo(self.returns, paths=1000, workers=1).report()
+        self.assertEqual(list(report.columns), ['total_return', 'max_drawdown', 'sharpe'])
+        self.assertEqual(report.index[-1], 'mean')
+        self.assertTrue((report['max_drawdown'] >= 0.0).all())
+        self.assertLess(report.loc[0.05, 'total_return'], report.loc[0.95, 'total_return'])
+
+    def test_round_trips(self):
+        times = pd.bdate_range('2017-01-02', periods=6)
+        fills = pd.DataFrame({
+            'ticker': ['AAA', 'BBB', 'AAA', 'BBB', 'BBB', 'AAA'],
+            'direction': ['BUY', 'SELL', 'SELL', 'BUY', 'SELL', 'BUY'],
+            'quantity': [10, 5, 10, 10, 5, 5],
+            'fill_cost': [100.0, 50.0, 110.0, 40.0, 45.0, 100.0],
+            'commission': [1.0, 0.0, 1.0, 2.0, 0.0, 1.0]
+        }, index=pd.DatetimeIndex(times, name='datetime'))
+        trades = round_trips(fills)
+        # The BBB buy reverses the short position, the last AAA buy is open
+        self.assertEqual(list(trades['ticker']), ['AAA', 'BBB', 'BBB'])
+        self.assertEqual(list(trades['time']), [times[2], times[3], times[4]])
+        np.testing.assert_allclose(trades['pnl'], [98.0, 49.0, 24.0])
+
+        events = [
+            FillEvent(time, row.ticker, 'ARCA', row.quantity, row.direction,
+                      row.fill_cost, row.commission)
+            for time, row in fills.iterrows()
+        ]
+        assert_frame_equal(round_trips(events), trades)
+        np.testing.assert_allclose(
+            trade_returns(fills, 1000.0), [98.0 / 1000.0, 49.0 / 1098.0, 24.0 / 1147.0]
+        )
+
+    def test_shuffled_trades(self):
+        rnd = np.random.RandomState(3)
+        fills = []
+        for pnl in rnd.normal(50.0, 500.0, 40):
+            fills.append(FillEvent(None, 'AAA', 'ARCA', 10, 'BUY', 100.0, 0.0))
+            fills.append(FillEvent(None, 'AAA', 'ARCA', 10, 'SELL', 100.0 + pnl / 10.0, 0.0))
+        pnl = round_trips(fills)['pnl'].sum()
+        metrics = MonteCarlo.from_fills(fills, 100000.0, paths=200, workers=1).run()
+        # Only the order of the trades changes, not the final equity
+        np.testing.assert_allclose(metrics['total_return'], pnl / 100000.0)
+        self.assertGreater(metrics['max_drawdown'].std(), 0.0)
@@ -0,0 +1,129 @@
+import os
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from backtest import Backtest
+from event import EventType
+from execution import SimulatedExecutionHandler
+from portfolio import NaivePortfolio
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from scheduler import Scheduler
+from strategy import AbstractStrategy
+
+
+class RecordingStrategy(AbstractStrategy):
+    """
+    Records the market events and the timers it is given.
+    """
+    def __init__(self, log):
+        self.log = log
+
+    def calculate_signals(self, event):
+        self.log.append(('bar', event.time))
+
+
+class TestScheduler(TestCase):
+
+    def test_order(self):
+        scheduler = Scheduler(start='2017-01-02')
+        fired = []
+        deadlines = pd.Timestamp('2017-01-02') + pd.to_timedelta(
+            np.random.RandomState(3).randint(0, 10 ** 12, 2000), unit='us'
+        )
+        for i, deadline in enumerate(deadlines):
+            scheduler.schedule(deadline, lambda e: fired.append(e.time), name=i)
+        self.assertEqual(len(scheduler), 2000)
+
+        middle = deadlines.sort_values()[999]
+        scheduler.advance(middle)
+        self.assertEqual(len(fired), 1000)
+        scheduler.advance('2017-03-01')
+        self.assertEqual(fired, sorted(deadlines))
+        self.assertEqual(len(scheduler), 0)
+        self.assertIsNone(scheduler.next_deadline())
+
+    def test_periodic_and_cancel(self):
+        scheduler = Scheduler(start='2017-01-02 09:30')
+        fired = []
+
+        def expire(event):
+            fired.append(('expire', event.time))
+
+        def every(event):
+            fired.append((event.name, event.time))
+            if len(fired) == 3:
+                event.timer.cancel()
+
+        timer = scheduler.schedule_in('5min', expire)
+        scheduler.schedule_every('10min', every, name='every')
+        scheduler.schedule_in('5min', expire, name='other').cancel()
+        self.assertEqual(scheduler.next_deadline(), pd.Timestamp('2017-01-02 09:35'))
+        scheduler.advance('2017-01-02 12:00')
+        self.assertEqual(fired, [
+            ('expire', pd.Timestamp('2017-01-02 09:35')),
+            ('every', pd.Timestamp('2017-01-02 09:40')),
+            ('every', pd.Timestamp('2017-01-02 09:50'))
+        ])
+        self.assertEqual(len(scheduler), 0)
+        self.assertEqual(timer.name, None)
+
+    def test_same_tick(self):
+        scheduler = Scheduler(start='2017-01-02', resolution='1s')
+        fired = []
+        start = pd.Timestamp('2017-01-02 00:00:01')
+        for offset in (300, 100, 200, 100):
+            scheduler.schedule(
+                start + pd.Timedelta(offset, unit='ms'), fired.append, name=offset
+            )
+        scheduler.advance(start + pd.Timedelta(150, unit='ms'))
+        self.assertEqual([e.name for e in fired], [100, 100])
+        scheduler.advance(start + pd.Timedelta(1, unit='s'))
+        self.assertEqual([e.name for e in fired], [100, 100, 200, 300])
+
+    def test_wall_clock(self):
+        now = [pd.Timestamp('2017-01-02 09:30', tz='UTC')]
+        scheduler = Scheduler(clock=lambda: now[0])
+        fired = []
+        scheduler.schedule_every('1min', fired.append)
+        now[0] += pd.Timedelta('150s')
+        scheduler.poll()
+        self.assertEqual([e.time for e in fired], [
+            pd.Timestamp('2017-01-02 09:31', tz='UTC'),
+            pd.Timestamp('2017-01-02 09:32', tz='UTC')
+        ])
+
+    def test_backtest(self):
+        csv_dir = tempfile.mkdtemp()
+        try:
+            dates = pd.bdate_range('2017-01-02', periods=5)
+            close = 100.0 + np.arange(len(dates))
+            pd.DataFrame({
+                'Date': dates, 'Open': close, 'High': close, 'Low': close,
+                'Close': close, 'Adj Close': close, 'Volume': 1000
+            }).to_csv(os.path.join(csv_dir, 'AAA.csv'), index=False)
+            events_queue = queue.Queue()
+            price_handler = YahooDailyCsvBarPriceHandler(csv_dir, events_queue, ['AAA'])
+            log = []
+            scheduler = Scheduler()
+            scheduler.schedule_every(
+                '1D', lambda e: log.append(('timer', e.time)),
+                start='2017-01-03 16:00'
+            )
+            portfolio = NaivePortfolio(price_handler, events_queue, None)
+            Backtest(
+                price_handler, RecordingStrategy(log), portfolio,
+                SimulatedExecutionHandler(events_queue, price_handler),
+                events_queue, scheduler=scheduler
+            ).simulate_trading()
+        finally:
+            shutil.rmtree(csv_dir)
+        self.assertEqual([kind for kind, _ in log], [
+            'bar', 'bar', 'timer', 'bar', 'timer', 'bar', 'timer', 'bar'
+        ])
+        self.assertEqual(log[2][1], pd.Timestamp('2017-01-03 16:00'))
+        self.assertEqual(EventType.TIMER.name, 'TIMER')
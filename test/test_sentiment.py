@@ -0,0 +1,126 @@
+import os
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from backtest import Backtest
+from event import EventType, SignalEvent
+from execution import SimulatedExecutionHandler
+from portfolio import NaivePortfolio
+from price_handler.sentiment import SentimentHandler
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from strategy import AbstractStrategy
+
+
+class SentimentStrategy(AbstractStrategy):
+    """
+    Holds a share of a ticker while its latest sentiment is positive,
+    recording the events seen.
+    """
+    def __init__(self, events_queue):
+        self.events_queue = events_queue
+        self.sentiment = {}
+        self.seen = []
+
+    def calculate_signals(self, event):
+        if event.type == EventType.SENTIMENT:
+            self.sentiment[event.ticker] = event.sentiment
+            self.seen.append(('sentiment', event.ticker, event.time, event.sentiment))
+        elif event.type == EventType.BAR:
+            self.seen.append(('bar', event.ticker, event.time, None))
+            sentiment = self.sentiment.get(event.ticker, 0.0)
+            if sentiment > 0.0:
+                self.events_queue.put(SignalEvent(event.ticker, 'BUY', 1))
+            elif sentiment < 0.0:
+                self.events_queue.put(SignalEvent(event.ticker, 'EXIT'))
+
+
+class TestSentimentHandler(TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.csv_dir = os.path.join(self.data_dir, 'bars')
+        self.sentiment_dir = os.path.join(self.data_dir, 'sentiment')
+        os.mkdir(self.csv_dir)
+        os.mkdir(self.sentiment_dir)
+        dates = pd.bdate_range('2017-01-02', periods=4)
+        close = np.array([10.0, 11.0, 12.0, 13.0])
+        for ticker in ('AAA', 'BBB'):
+            pd.DataFrame({
+                'Date': dates, 'Open': close, 'High': close, 'Low': close,
+                'Close': close, 'Adj Close': close, 'Volume': 100
+            }).to_csv(os.path.join(self.csv_dir, '%s.csv' % ticker), index=False)
+        # Unsorted, with two scores between the bars of the 3rd and
+        # 4th of January, and an extra column not loaded
+        with open(os.path.join(self.sentiment_dir, 'AAA.csv'), 'w') as f:
+            f.write(
+                'Date,Source,Sentiment\n'
+                '2017-01-03 14:00:00,news,-0.3\n'
+                '2017-01-01 09:00:00,news,0.5\n'
+                '2017-01-03 16:00:00,news,0.2\n'
+                '2017-01-05 00:00:00,news,-0.1\n'
+            )
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def _handler(self, events_queue):
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, ['AAA', 'BBB']
+        )
+        return SentimentHandler(self.sentiment_dir, events_queue, price_handler)
+
+    def test_latest(self):
+        handler = self._handler(queue.Queue())
+        self.assertIsNone(handler.latest('AAA', pd.Timestamp('2016-12-31')))
+        self.assertIsNone(handler.latest('BBB', pd.Timestamp('2017-01-04')))
+        self.assertEqual(
+            handler.latest('AAA', pd.Timestamp('2017-01-03 15:00')),
+            (pd.Timestamp('2017-01-03 14:00'), -0.3)
+        )
+        self.assertEqual(
+            handler.latest('AAA', pd.Timestamp('2017-01-05')),
+            (pd.Timestamp('2017-01-05'), -0.1)
+        )
+        # Same answers as a scan of the scores
+        scores = [
+            (pd.Timestamp('2017-01-01 09:00'), 0.5), (pd.Timestamp('2017-01-03 14:00'), -0.3),
+            (pd.Timestamp('2017-01-03 16:00'), 0.2), (pd.Timestamp('2017-01-05'), -0.1)
+        ]
+        for time in pd.date_range('2016-12-31', '2017-01-06', freq='h'):
+            expected = [score for score in scores if score[0] <= time]
+            self.assertEqual(handler.latest('AAA', time), expected[-1] if expected else None)
+
+    def test_backtest(self):
+        events_queue = queue.Queue()
+        handler = self._handler(events_queue)
+        strategy = SentimentStrategy(events_queue)
+        portfolio = NaivePortfolio(handler, events_queue, None)
+        Backtest(
+            handler, strategy, portfolio,
+            SimulatedExecutionHandler(events_queue, handler, commission_model=None),
+            events_queue
+        ).simulate_trading()
+
+        seen = [(kind, ticker, str(time.date()), score) for kind, ticker, time, score in strategy.seen]
+        self.assertEqual(seen, [
+            ('sentiment', 'AAA', '2017-01-01', 0.5),
+            ('bar', 'AAA', '2017-01-02', None),
+            ('bar', 'BBB', '2017-01-02', None),
+            ('bar', 'AAA', '2017-01-03', None),
+            ('bar', 'BBB', '2017-01-03', None),
+            ('sentiment', 'AAA', '2017-01-03', 0.2),
+            ('bar', 'AAA', '2017-01-04', None),
+            ('bar', 'BBB', '2017-01-04', None),
+            ('sentiment', 'AAA', '2017-01-05', -0.1),
+            ('bar', 'AAA', '2017-01-05', None),
+            ('bar', 'BBB', '2017-01-05', None)
+        ])
+        # Bought on the 2nd, sold on the 5th
+        self.assertEqual([p['AAA'] for p in portfolio.all_positions[1:]], [1, 1, 1, 0])
+        self.assertEqual(portfolio.current_positions['BBB'], 0)
+        self.assertEqual(handler.get_state()['streamed'], {'AAA': 3})
@@ -0,0 +1,100 @@
+import queue
+from unittest import TestCase
+
+from event import BarEvent, EventType, SignalEvent, TickEvent
+from strategy import AbstractStrategy, Strategies, StrategyQueue
+
+
+class RecordingStrategy(AbstractStrategy):
+    """
+    Records the events it receives, along with its name, in a
+    list shared by several strategies.
+    """
+    def __init__(self, name, received, tickers=None, events=None):
+        self.name = name
+        self.received = received
+        self.subscribed_tickers = tickers
+        self.subscribed_events = events
+
+    def calculate_signals(self, event):
+        self.received.append((self.name, event.ticker))
+
+
+class SignalStrategy(AbstractStrategy):
+    """
+    Puts a BUY signal of its ticker on every event.
+    """
+    def __init__(self, ticker, events_queue, strategy_id=None):
+        self.ticker = ticker
+        self.events_queue = events_queue
+        if strategy_id is not None:
+            self.strategy_id = strategy_id
+
+    def calculate_signals(self, event):
+        self.events_queue.put(SignalEvent(self.ticker, 'BUY', 10))
+
+
+def bar(ticker):
+    return BarEvent(ticker, None, 86400, 1, 1, 1, 1, 100, 1)
+
+
+def tick(ticker):
+    return TickEvent(ticker, None, 1, 2)
+
+
+class TestStrategies(TestCase):
+
+    def setUp(self):
+        self.received = []
+        self.strategies = Strategies(
+            RecordingStrategy('spy', self.received, tickers=['SPY']),
+            RecordingStrategy('all', self.received),
+            RecordingStrategy('qqq_ticks', self.received, tickers=['QQQ'],
+                              events=[EventType.TICK]),
+            RecordingStrategy('spy_qqq', self.received, tickers=['SPY', 'QQQ'])
+        )
+
+    def test_routes_by_ticker_in_collection_order(self):
+        self.strategies.calculate_signals(bar('SPY'))
+        self.strategies.calculate_signals(bar('QQQ'))
+        self.strategies.calculate_signals(bar('IWM'))
+        self.assertEqual(self.received, [
+            ('spy', 'SPY'), ('all', 'SPY'), ('spy_qqq', 'SPY'),
+            ('all', 'QQQ'), ('spy_qqq', 'QQQ'),
+            ('all', 'IWM')
+        ])
+
+    def test_routes_by_event_type(self):
+        self.strategies.calculate_signals(tick('QQQ'))
+        self.assertEqual(self.received, [
+            ('all', 'QQQ'), ('qqq_ticks', 'QQQ'), ('spy_qqq', 'QQQ')
+        ])
+
+    def test_rebuild_index(self):
+        self.strategies.calculate_signals(bar('IWM'))
+        self.strategies._lst_strategies[0].subscribed_tickers = ['IWM']
+        self.strategies.rebuild_index()
+        self.strategies.calculate_signals(bar('IWM'))
+        self.assertEqual(self.received, [
+            ('all', 'IWM'), ('spy', 'IWM'), ('all', 'IWM')
+        ])
+
+    def test_strategy_ids(self):
+        events_queue = queue.Queue()
+        strategies = Strategies(
+            SignalStrategy('SPY', events_queue),
+            SignalStrategy('QQQ', events_queue, strategy_id='momentum'),
+            SignalStrategy('IWM', events_queue)
+        )
+        strategies.calculate_signals(bar('SPY'))
+        signals = [events_queue.get(False) for _ in range(3)]
+        self.assertEqual(
+            [(s.ticker, s.strategy_id) for s in signals],
+            [('SPY', 0), ('QQQ', 'momentum'), ('IWM', 2)]
+        )
+        # The queue is not part of the state, nor wrapped twice
+        first = strategies._lst_strategies[0]
+        self.assertIsInstance(first.events_queue, StrategyQueue)
+        self.assertNotIn('events_queue', first.get_state())
+        Strategies(first)
+        self.assertIs(first.events_queue.events_queue, events_queue)
@@ -0,0 +1,75 @@
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pandas.testing import assert_frame_equal
+
+from price_handler.shared_bar import SharedBarData, SharedBarPriceHandler
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from sweep import ParameterSweep, parameter_grid, summary_statistics
+
+from helpers import create_backtest, write_random_walk_csvs
+
+
+class TestParameterSweep(TestCase):
+
+    def setUp(self):
+        self.csv_dir = tempfile.mkdtemp()
+        self.tickers = ['BBB', 'AAA']
+        write_random_walk_csvs(
+            self.csv_dir, self.tickers, 60, 11,
+            select={'BBB': lambda data: data.iloc[5:]}
+        )
+        self.data = SharedBarData.from_csv(self.csv_dir, self.tickers)
+
+    def tearDown(self):
+        self.data.close()
+        shutil.rmtree(self.csv_dir)
+
+    def run_csv_backtest(self, **parameters):
+        events_queue = queue.Queue()
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, self.tickers
+        )
+        return create_backtest(price_handler, events_queue, **parameters).simulate_trading()
+
+    def test_shared_handler_matches_csv_handler(self):
+        for start_date in (None, '2017-01-20'):
+            expected = self.run_csv_backtest(aaa_period=4, bbb_period=3)
+            if start_date is not None:
+                events_queue = queue.Queue()
+                price_handler = YahooDailyCsvBarPriceHandler(
+                    self.csv_dir, events_queue, self.tickers, start_date=start_date
+                )
+                expected = create_backtest(
+                    price_handler, events_queue, aaa_period=4, bbb_period=3
+                ).simulate_trading()
+            events_queue = queue.Queue()
+            price_handler = SharedBarPriceHandler(
+                self.data, events_queue, start_date=start_date
+            )
+            actual = create_backtest(
+                price_handler, events_queue, aaa_period=4, bbb_period=3
+            ).simulate_trading()
+            assert_frame_equal(expected, actual, check_exact=True)
+
+    def test_sweep(self):
+        grid = parameter_grid(aaa_period=[3, 5], bbb_period=[2, 4, 6])
+        self.assertEqual(len(grid), 6)
+        reported = []
+        results = ParameterSweep(
+            self.data, create_backtest, workers=2,
+            progress=lambda completed, total, p: reported.append((completed, total))
+        ).run(grid)
+        self.assertEqual(sorted(reported), [(i, 6) for i in range(1, 7)])
+        self.assertEqual(
+            results[['aaa_period', 'bbb_period']].to_dict('records'), grid
+        )
+        for row, parameters in zip(results.to_dict('records'), grid):
+            expected = summary_statistics(self.run_csv_backtest(**parameters))
+            for name, value in expected.items():
+                self.assertAlmostEqual(row[name], value)
+
+        serial = ParameterSweep(self.data, create_backtest, workers=1).run(grid)
+        assert_frame_equal(results, serial)
@@ -0,0 +1,69 @@
+import pickle
+import queue
+from unittest import TestCase
+
+import numpy as np
+
+from event import FillEvent, TickEvent
+from portfolio import NaivePortfolio
+from price_handler.base import AbstractTickPriceHandler
+from symbols import SYMBOLS, SymbolArray, SymbolRegistry
+
+
+class TestSymbolRegistry(TestCase):
+
+    def test_intern(self):
+        registry = SymbolRegistry()
+        self.assertEqual(registry.intern('GOOG'), 0)
+        self.assertEqual(registry.intern('MSFT'), 1)
+        self.assertEqual(registry.intern('GOOG'), 0)
+        self.assertIsNone(registry.intern(None))
+        self.assertEqual(registry.ids(['MSFT', 'AAPL', 'GOOG']).tolist(), [1, 2, 0])
+        self.assertEqual(registry.name(2), 'AAPL')
+        self.assertEqual(len(registry), 3)
+        self.assertIn('AAPL', registry)
+
+    def test_symbol_array(self):
+        values = SymbolArray(np.int64, 0, capacity=2)
+        values[5] = 7
+        self.assertEqual(len(values.values), 8)
+        self.assertEqual(values[5], 7)
+        self.assertEqual(values[100], 0)
+        self.assertEqual(values[np.array([5, 1, 20])].tolist(), [7, 0, 0])
+        self.assertTrue(np.isnan(SymbolArray()[3]))
+
+    def test_events(self):
+        tick = TickEvent('EUR_USD', None, 1, 2)
+        fill = FillEvent(None, 'EUR_USD', 'OANDA', 100, 'BUY', 1.0, 0.0)
+        self.assertEqual(tick.symbol_id, SYMBOLS.intern('EUR_USD'))
+        self.assertEqual(fill.symbol_id, tick.symbol_id)
+
+        # Ids are interned again by name when unpickled
+        fill.symbol_id = -1
+        self.assertEqual(pickle.loads(pickle.dumps(fill)).symbol_id, tick.symbol_id)
+
+
+class TestPortfolioArrays(TestCase):
+
+    def test_valuation(self):
+        class Prices(AbstractTickPriceHandler):
+            def __init__(self):
+                self.tickers = {'AAA': {}, 'BBB': {}, 'CCC': {}}
+
+        prices = Prices()
+        portfolio = NaivePortfolio(prices, queue.Queue(), None)
+        for ticker, bid in (('AAA', 100), ('BBB', 200)):
+            tick = TickEvent(ticker, 1, bid * 10 ** 7, (bid + 2) * 10 ** 7)
+            prices._store_event(tick)
+            portfolio.update_timeindex(tick)
+        portfolio.update_fill(FillEvent(1, 'AAA', 'ARCA', 10, 'BUY', 101.0, 1.0))
+        portfolio.update_fill(FillEvent(1, 'BBB', 'ARCA', 5, 'SELL', 201.0, 1.0))
+        portfolio.append_current_records()
+
+        self.assertEqual(portfolio.all_positions[-1], {
+            'AAA': 10, 'BBB': -5, 'CCC': 0, 'datetime': 1
+        })
+        holdings = portfolio.all_holdings[-1]
+        self.assertEqual((holdings['AAA'], holdings['BBB'], holdings['CCC']), (1010.0, -1005.0, 0))
+        self.assertEqual(holdings['total'], 100000.0 - 2.0)
+        self.assertEqual(portfolio.get_state()['marks'], {'AAA': 101.0, 'BBB': 201.0})
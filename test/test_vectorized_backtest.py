@@ -0,0 +1,96 @@
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from backtest import Backtest
+from event import SignalEvent
+from execution import SimulatedExecutionHandler
+from portfolio import NaivePortfolio
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from strategy import AbstractStrategy, Strategies
+from vectorized_backtest import VectorizedBacktest, targets_from_signals
+
+from helpers import write_random_walk_csvs
+
+
+class PeriodicStrategy(AbstractStrategy):
+    """
+    Enters a position of 'quantity' units on a ticker every
+    'period' bars and exits it 'period' bars later.
+    """
+    def __init__(self, ticker, events_queue, period, quantity):
+        self.subscribed_tickers = [ticker]
+        self.ticker = ticker
+        self.events_queue = events_queue
+        self.period = period
+        self.quantity = quantity
+        self.bars = 0
+        self.invested = False
+
+    def calculate_signals(self, event):
+        self.bars += 1
+        if self.bars % self.period:
+            return
+        if self.invested:
+            self.events_queue.put(SignalEvent(self.ticker, 'EXIT'))
+        else:
+            buy_sell = 'BUY' if self.quantity > 0 else 'SELL'
+            self.events_queue.put(SignalEvent(self.ticker, buy_sell, abs(self.quantity)))
+        self.invested = not self.invested
+
+
+class TestVectorizedBacktest(TestCase):
+
+    def setUp(self):
+        self.csv_dir = tempfile.mkdtemp()
+        self.strategies = [('AAA', 5, 10), ('BBB', 3, -700), ('CCC', 4, 300)]
+        write_random_walk_csvs(
+            self.csv_dir, [ticker for ticker, _, _ in self.strategies], 80, 3,
+            # Missing bars: starts late and skips some dates
+            select={'BBB': lambda data: data.iloc[10:].drop(data.index[[20, 21, 40]])}
+        )
+        self.tickers = ['CCC', 'AAA', 'BBB']
+
+    def tearDown(self):
+        shutil.rmtree(self.csv_dir)
+
+    def create_price_handler(self, events_queue=None):
+        return YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue or queue.Queue(), self.tickers
+        )
+
+    def test_same_equity_curve_as_event_driven(self):
+        events_queue = queue.Queue()
+        price_handler = self.create_price_handler(events_queue)
+        strategy = Strategies(*[
+            PeriodicStrategy(ticker, events_queue, period, quantity)
+            for ticker, period, quantity in self.strategies
+        ])
+        portfolio = NaivePortfolio(price_handler, events_queue, None)
+        execution_handler = SimulatedExecutionHandler(events_queue, price_handler)
+        expected = Backtest(
+            price_handler, strategy, portfolio, execution_handler, events_queue
+        ).simulate_trading()
+
+        backtest = VectorizedBacktest(self.create_price_handler())
+        prices = backtest.prices()
+        targets = {}
+        for ticker, period, quantity in self.strategies:
+            bars = prices[ticker].dropna()
+            count = np.arange(1, len(bars) + 1)
+            invested = (count // period) % 2 == 1
+            targets[ticker] = pd.Series(np.where(invested, quantity, 0), bars.index)
+        actual = backtest.simulate_trading(pd.DataFrame(targets))
+
+        assert_frame_equal(expected, actual, check_exact=True)
+        self.assertNotEqual(actual['commission'].iloc[-1], 0.0)
+
+    def test_targets_from_signals(self):
+        signals = pd.DataFrame({'AAA': [np.nan, 1, np.nan, 0, -1]})
+        targets = targets_from_signals(signals, 10)
+        self.assertEqual(targets['AAA'].tolist(), [0, 10, 10, 0, -10])
@@ -0,0 +1,86 @@
+import queue
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from price_handler.shared_bar import SharedBarData
+from price_handler.yahoo_daily_csv_bar import YahooDailyCsvBarPriceHandler
+from sweep import parameter_grid, summary_statistics
+from walk_forward import WalkForward
+
+from helpers import create_backtest, write_random_walk_csvs
+
+
+class TestWalkForward(TestCase):
+
+    def setUp(self):
+        self.csv_dir = tempfile.mkdtemp()
+        self.tickers = ['AAA', 'BBB']
+        self.dates = write_random_walk_csvs(self.csv_dir, self.tickers, 120, 5)
+        self.data = SharedBarData.from_csv(self.csv_dir, self.tickers)
+        self.grid = parameter_grid(aaa_period=[2, 5], bbb_period=[3, 7])
+        self.runs = []
+        self.walk_forward = WalkForward(
+            self.data, create_backtest, self.grid, train_length=40,
+            test_length=20, workers=2,
+            progress=lambda completed, total, p: self.runs.append(p)
+        )
+
+    def tearDown(self):
+        self.data.close()
+        shutil.rmtree(self.csv_dir)
+
+    def run_csv_backtest(self, parameters, start_date, end_date):
+        events_queue = queue.Queue()
+        price_handler = YahooDailyCsvBarPriceHandler(
+            self.csv_dir, events_queue, self.tickers,
+            start_date=start_date, end_date=end_date
+        )
+        return create_backtest(price_handler, events_queue, **parameters).simulate_trading()
+
+    def test_windows(self):
+        windows = self.walk_forward.windows()
+        self.assertEqual(windows, [
+            (self.dates[0], self.dates[40], self.dates[60]),
+            (self.dates[20], self.dates[60], self.dates[80]),
+            (self.dates[40], self.dates[80], self.dates[100]),
+            (self.dates[60], self.dates[100], None)
+        ])
+
+    def test_run(self):
+        windows, curve = self.walk_forward.run()
+        self.assertEqual(len(windows), 4)
+        # 4 windows x 4 parameter sets in sample, plus 4 out of sample
+        # runs less those already run in sample over the same dates
+        self.assertLessEqual(len(self.runs), 20)
+
+        returns = []
+        for _, window in windows.iterrows():
+            scores = [
+                summary_statistics(self.run_csv_backtest(
+                    p, window['train_start'], window['test_start']
+                ))['sharpe'] for p in self.grid
+            ]
+            self.assertEqual(window['parameters'], self.grid[int(np.argmax(scores))])
+            self.assertAlmostEqual(window['in_sample'], max(scores))
+            test_curve = self.run_csv_backtest(
+                window['parameters'], window['test_start'], window['test_end']
+            )
+            returns.extend(test_curve['returns'].iloc[1:].tolist())
+
+        self.assertEqual(list(curve.index), list(self.dates[40:]))
+        np.testing.assert_allclose(curve['returns'].values, returns)
+        np.testing.assert_allclose(
+            curve['total'].values, 100000.0 * np.cumprod(1.0 + np.array(returns))
+        )
+
+        # Nothing is run again, and only out of sample runs for
+        # another objective
+        runs = len(self.runs)
+        self.walk_forward.run()
+        self.assertEqual(len(self.runs), runs)
+        self.walk_forward.objective = 'total_return'
+        self.walk_forward.run()
+        self.assertLessEqual(len(self.runs), runs + len(windows))
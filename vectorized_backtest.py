@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from cost_model.commission import IBCommissionModel
+from price_parser import PriceParser
+
+
+def targets_from_signals(signals, quantity=100):
+    """
+    Converts a matrix of signals into a matrix of target positions:
+    1 for long, -1 for short and 0 for flat 'quantity' units, NaN
+    keeping the previous target.
+
+    :param signals: A DataFrame of signals, dates by tickers.
+    :param int quantity: The quantity of each position.
+    :return: A DataFrame of target positions.
+    """
+    return (signals.ffill().fillna(0) * quantity).astype(np.int64)
+
+
+class VectorizedBacktest(object):
+    """
+    Computes a whole-history backtest with array operations, for
+    strategies which can be expressed as a matrix of target
+    positions (dates by tickers) known at the close of each bar.
+
+    Positions are traded at the close of the bars where their
+    target changes, with a single market order each, and costed
+    with the same cost models as the SimulatedExecutionHandler
+    (the Interactive Brokers fees by default). Holdings are valued
+    and recorded as the NaivePortfolio does, so that the equity
+    curve is the same as the one of an event-driven Backtest of
+    the same strategy.
+
+    The bar data is the merged data loaded by a bar price handler,
+    such as the YahooDailyCsvBarPriceHandler.
+    """
+
+    def __init__(
+            self, price_handler, initial_capital=100000.0, start_date=None,
+            slippage_model=None, commission_model=None
+    ):
+        """
+        Initialises the backtest, pivoting the bar data into a
+        dates by tickers matrix of closing prices.
+
+        :param price_handler: The bar PriceHandler holding the data.
+        :param initial_capital: The starting capital in USD.
+        :param start_date: The date of the initial record of the
+                        equity curve, as in the NaivePortfolio.
+        :param slippage_model: An optional SlippageModel.
+        :param commission_model: An optional CommissionModel, an
+                        IBCommissionModel by default.
+        """
+        self.symbol_list = price_handler.symbol_list
+        self.initial_capital = initial_capital
+        self.start_date = start_date
+        self.slippage_model = slippage_model
+        self.commission_model = commission_model or IBCommissionModel()
+
+        bar_data = price_handler.bar_data
+        close = bar_data.pivot(columns='Ticker', values='Close')
+        # Fills are processed in the order bars are streamed
+        self.tickers = sorted(self.symbol_list)
+        close = close.reindex(columns=self.tickers)
+        self.has_bar = close.notnull().values
+        # Same truncation as PriceParser.parse()
+        parsed = np.trunc(close.values * PriceParser.PRICE_MULTIPLIER)
+        self.close = pd.DataFrame(
+            parsed / float(PriceParser.PRICE_MULTIPLIER),
+            index=close.index, columns=self.tickers
+        )
+        self.marks = self.close.ffill()
+        self.equity_curve = None
+
+    def prices(self):
+        """
+        Returns the matrix of closing prices in dollars, NaN where
+        a ticker has no bar, from which the strategy computes its
+        targets.
+        """
+        return self.close
+
+    def simulate_trading(self, target_positions):
+        """
+        Trades towards the target positions and returns the
+        equity curve, in the format of the NaivePortfolio.
+
+        :param target_positions: A DataFrame of target positions,
+                        dates by tickers, in units. Targets of a ticker
+                        are only acted upon on the dates it has a bar,
+                        missing tickers and NaN keeping the previous
+                        target.
+        :return: The equity curve DataFrame.
+        """
+        targets = target_positions.reindex(
+            index=self.close.index, columns=self.tickers
+        ).where(self.has_bar).ffill().fillna(0).values.astype(np.int64)
+        trades = np.diff(targets, axis=0, prepend=0)
+
+        # Costs of every fill, in streaming order
+        dates, columns = np.nonzero(trades)
+        quantities = np.abs(trades[dates, columns]).astype(np.float64)
+        directions = np.sign(trades[dates, columns]).astype(np.float64)
+        prices = self.close.values[dates, columns]
+        if self.slippage_model is not None:
+            volumes = np.full(len(quantities), np.nan)
+            prices = self.slippage_model.fill_prices(
+                directions, quantities, prices, volumes
+            )
+        commissions = self.commission_model.commissions(quantities, prices)
+        costs = directions * prices * quantities
+
+        flows = np.zeros(trades.shape)
+        flows[dates, columns] = -(costs + commissions)
+        fees = np.zeros(trades.shape)
+        fees[dates, columns] = commissions
+        # Cumulated fill by fill, then read at the last fill of each date
+        cash = np.cumsum(
+            np.concatenate([[self.initial_capital], flows.ravel()])
+        )[1:].reshape(trades.shape)[:, -1]
+        commission = np.cumsum(fees.ravel()).reshape(trades.shape)[:, -1]
+
+        # Market values, summed in the order of the portfolio symbols
+        market_values = np.nan_to_num(targets * self.marks.values)
+        total = cash.copy()
+        holdings = {}
+        for s in self.symbol_list:
+            holdings[s] = market_values[:, self.tickers.index(s)]
+            total += holdings[s]
+
+        records = dict(
+            (s, np.concatenate([[0], values])) for s, values in holdings.items()
+        )
+        records['datetime'] = [self.start_date] + list(self.close.index)
+        records['cash'] = np.concatenate([[self.initial_capital], cash])
+        records['commission'] = np.concatenate([[0], commission])
+        records['total'] = np.concatenate([[self.initial_capital], total])
+        curve = pd.DataFrame(records)
+        curve.set_index('datetime', inplace=True)
+        curve['returns'] = curve['total'].pct_change()
+        curve['equity_curve'] = (1.0+curve['returns']).cumprod()
+        self.equity_curve = curve
+        return curve
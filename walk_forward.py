@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+from sweep import ParameterSweep
+
+
+class WalkForward(object):
+    """
+    WalkForward carries out a rolling walk-forward analysis: the
+    dates of the data are split into consecutive train and test
+    windows, the parameters maximising an objective over each train
+    window (in sample) are backtested over the following test window
+    (out of sample), and the out of sample equity curves are stitched
+    into a single curve.
+
+    Every backtest streams its window straight out of the shared
+    SharedBarData, without copying it, and the in sample runs of
+    all the windows are carried out concurrently by a ParameterSweep.
+    Results are cached by (parameters, start, end), so that identical
+    windows shared by several analyses, e.g. with other test lengths
+    or objectives, are only ever backtested once.
+
+    Each backtest starts flat with a fresh strategy at the start of
+    its window: strategies needing a warm up should be given a train
+    window long enough for it. For the same reason, windows which
+    merely overlap (e.g. train windows with a step shorter than their
+    length) are backtested in full, their shared dates being replayed
+    from another starting state.
+    """
+
+    def __init__(
+            self, data, create_backtest, parameters, train_length,
+            test_length, step=None, objective='sharpe', workers=None,
+            progress=None, start_method=None
+    ):
+        """
+        Initialises the analysis.
+
+        :param data: The SharedBarData of the market data.
+        :param create_backtest: The module level function creating the
+                        Backtest of a set of parameters, as for a
+                        ParameterSweep.
+        :param parameters: The list of dicts of parameters tried in
+                        each train window.
+        :param int train_length: The number of dates of a train window.
+        :param int test_length: The number of dates of a test window.
+        :param int step: The number of dates between the starts of two
+                        windows, test_length by default so that the test
+                        windows follow each other.
+        :param str objective: The summary statistic maximised in sample.
+        :param int workers: The number of worker processes.
+        :param progress: An optional progress function, as for a
+                        ParameterSweep.
+        :param str start_method: The multiprocessing start method.
+        """
+        self.data = data
+        self.parameters = list(parameters)
+        self.train_length = train_length
+        self.test_length = test_length
+        self.step = step or test_length
+        self.objective = objective
+        self.sweep = ParameterSweep(
+            data, create_backtest, workers, progress, start_method
+        )
+        self.cache = {}
+
+    def windows(self, start_date=None, end_date=None):
+        """
+        Returns the (train start, test start, test end) dates of the
+        windows between the start and end dates, the end dates being
+        excluded and None standing for the end of the data.
+        """
+        start, end = self.data.bounds(start_date, end_date)
+        times = np.unique(self.data.columns['time'][start:end])
+        dates = [pd.Timestamp(t) for t in times.tolist()] + [end_date]
+        windows = []
+        first = 0
+        while first + self.train_length < len(times):
+            test = first + self.train_length
+            last = min(test + self.test_length, len(times))
+            windows.append((dates[first], dates[test], dates[last]))
+            first += self.step
+        return windows
+
+    @staticmethod
+    def _key(parameters, start_date, end_date):
+        return tuple(sorted(parameters.items())), start_date, end_date
+
+    def _run(self, tasks):
+        """
+        Runs the backtests of the (parameters, start, end) tasks
+        missing from the cache, keeping their equity curves.
+        """
+        missing = []
+        for parameters, start_date, end_date in tasks:
+            key = self._key(parameters, start_date, end_date)
+            if key not in self.cache:
+                self.cache[key] = None
+                missing.append((parameters, start_date, end_date, True))
+        for task, result in zip(missing, self.sweep.map(missing)):
+            self.cache[self._key(*task[:3])] = result
+
+    def _best(self, train_start, test_start):
+        """
+        Returns the parameters maximising the objective in sample,
+        along with their score.
+        """
+        best, best_score = None, None
+        for parameters in self.parameters:
+            statistics, _ = self.cache[self._key(parameters, train_start, test_start)]
+            score = statistics.get(self.objective, np.nan)
+            if not np.isnan(score) and (best is None or score > best_score):
+                best, best_score = parameters, score
+        return best, best_score
+
+    def run(self, start_date=None, end_date=None, initial_capital=100000.0):
+        """
+        Carries out the walk-forward analysis between the start and
+        end dates.
+
+        :param start_date: The first date of the analysis, if any.
+        :param end_date: The date the analysis stops before, if any.
+        :param float initial_capital: The starting capital of the
+                        stitched curve.
+        :return: A (windows, curve) tuple: a DataFrame with the dates,
+                        best parameters, in sample score and out of
+                        sample statistics of each window, and the
+                        stitched out of sample equity curve DataFrame.
+        """
+        windows = self.windows(start_date, end_date)
+        self._run(
+            (parameters, train_start, test_start)
+            for train_start, test_start, _ in windows
+            for parameters in self.parameters
+        )
+        best = [self._best(train_start, test_start) for train_start, test_start, _ in windows]
+        self._run(
+            (parameters, test_start, test_end)
+            for (_, test_start, test_end), (parameters, _) in zip(windows, best)
+            if parameters is not None
+        )
+
+        rows = []
+        segments = []
+        for i, ((train_start, test_start, test_end), (parameters, score)) in enumerate(
+                zip(windows, best)
+        ):
+            row = {
+                'train_start': train_start, 'test_start': test_start,
+                'test_end': test_end, 'parameters': parameters,
+                'in_sample': score
+            }
+            if parameters is not None:
+                statistics, curve = self.cache[self._key(parameters, test_start, test_end)]
+                row.update(statistics)
+                if curve is not None:
+                    # The first record is the initial capital, and test
+                    # windows overlapping the next one are cut short
+                    segment = curve[['returns']].iloc[1:]
+                    if i + 1 < len(windows):
+                        segment = segment[segment.index < windows[i + 1][1]]
+                    segment = segment.copy()
+                    segment['window'] = i
+                    segments.append(segment)
+            rows.append(row)
+
+        curve = pd.DataFrame(columns=['returns', 'window'])
+        if segments:
+            curve = pd.concat(segments)
+        curve['equity_curve'] = (1.0 + curve['returns'].fillna(0.0)).cumprod()
+        curve['total'] = initial_capital * curve['equity_curve']
+        return pd.DataFrame(rows), curve